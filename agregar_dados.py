@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Agregações pré-calculadas dos dashboards
+Central de Serviços - Open Finance Brasil
+
+Lê os snapshots exportados (dados-incidentes.json / dados-mudancas.json) e
+grava arquivos de resumo pequenos com as contagens que os dashboards hoje
+calculam no navegador: por status, prioridade, sistema, time e mês, taxa de
+violação de SLA e MTTR.
+
+Uso:
+    python agregar_dados.py                 # incidentes e mudanças
+    python agregar_dados.py incidentes      # apenas um dataset
+"""
+import sys
+import json
+import argparse
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sync_incidentes import parse_data_jira
+from publicacao import publicar_json
+
+STATUS_CONCLUIDOS = {'Concluído com Sucesso', 'Concluído com Falha', 'Fechada', 'Resolvido', 'Concluído'}
+STATUS_CANCELADOS = {'Cancelado'}
+
+DATASETS = {
+    'incidentes': ('dados-incidentes.json', 'dados-incidentes-resumo.json'),
+    'mudancas': ('dados-mudancas.json', 'dados-mudancas-resumo.json'),
+}
+
+
+def mes(valor):
+    """'2026-08-21T19:29:58.595-0300' -> '2026-08'."""
+    return valor[:7] if valor else ''
+
+
+def horas_resolucao(item):
+    """Horas entre created e resolutiondate, ou None se não resolvido."""
+    criado = parse_data_jira(item.get('created'))
+    resolvido = parse_data_jira(item.get('resolutiondate'))
+    if not criado or not resolvido:
+        return None
+    return (resolvido - criado).total_seconds() / 3600
+
+
+def media(valores):
+    return round(sum(valores) / len(valores), 2) if valores else None
+
+
+def contagem(itens, campo, vazio='Não informado'):
+    """Contagem por valor do campo, do mais frequente para o menos frequente."""
+    return dict(Counter((i.get(campo) or vazio) for i in itens).most_common())
+
+
+def mttr_por(itens, campo, vazio='Não informado'):
+    """MTTR médio (horas) agrupado pelo valor do campo."""
+    grupos = defaultdict(list)
+    for item in itens:
+        horas = horas_resolucao(item)
+        if horas is not None:
+            grupos[item.get(campo) or vazio].append(horas)
+    return {chave: media(valores) for chave, valores in sorted(grupos.items())}
+
+
+def agregar_incidentes(incidentes):
+    por_mes = defaultdict(lambda: {'total': 0, 'resolvidos': 0, 'sla_violados': 0, 'mttr_horas': []})
+    for item in incidentes:
+        m = por_mes[mes(item.get('created'))]
+        m['total'] += 1
+        if item.get('resolutiondate'):
+            m['resolvidos'] += 1
+        if item.get('sla_breached'):
+            m['sla_violados'] += 1
+        horas = horas_resolucao(item)
+        if horas is not None:
+            m['mttr_horas'].append(horas)
+
+    for m in por_mes.values():
+        m['mttr_horas'] = media(m['mttr_horas'])
+
+    abertos = [i for i in incidentes
+               if i.get('status') not in STATUS_CONCLUIDOS | STATUS_CANCELADOS and not i.get('resolutiondate')]
+    violados = sum(1 for i in incidentes if i.get('sla_breached'))
+    resolucoes = [h for h in (horas_resolucao(i) for i in incidentes) if h is not None]
+
+    return {
+        'total': len(incidentes),
+        'abertos': len(abertos),
+        'por_status': contagem(incidentes, 'status'),
+        'por_prioridade': contagem(incidentes, 'priority'),
+        'por_sistema': contagem(incidentes, 'sistema_afetado'),
+        'por_time': contagem(incidentes, 'assignee'),
+        'por_impacto': contagem(incidentes, 'impacto'),
+        'por_mes': dict(sorted(por_mes.items())),
+        'sla': {
+            'violados': violados,
+            'taxa_violacao': round(violados / len(incidentes), 4) if incidentes else 0,
+            'abertos_violados': sum(1 for i in abertos if i.get('sla_breached')),
+        },
+        'mttr_horas': {
+            'geral': media(resolucoes),
+            'por_prioridade': mttr_por(incidentes, 'priority'),
+            'por_sistema': mttr_por(incidentes, 'sistema_afetado'),
+            'por_time': mttr_por(incidentes, 'assignee'),
+        },
+    }
+
+
+def agregar_mudancas(mudancas):
+    por_mes = defaultdict(lambda: {'total': 0, 'sucesso': 0, 'falha': 0, 'emergenciais': 0})
+    for item in mudancas:
+        m = por_mes[mes(item.get('created'))]
+        m['total'] += 1
+        if item.get('status') == 'Concluído com Sucesso':
+            m['sucesso'] += 1
+        elif item.get('status') == 'Concluído com Falha':
+            m['falha'] += 1
+        if item.get('categoria') == 'Emergencial':
+            m['emergenciais'] += 1
+
+    concluidas = [i for i in mudancas if i.get('status') in ('Concluído com Sucesso', 'Concluído com Falha')]
+    sucesso = sum(1 for i in concluidas if i.get('status') == 'Concluído com Sucesso')
+
+    return {
+        'total': len(mudancas),
+        'por_status': contagem(mudancas, 'status'),
+        'por_categoria': contagem(mudancas, 'categoria'),
+        'por_prioridade': contagem(mudancas, 'priority'),
+        'por_responsavel': contagem(mudancas, 'assignee'),
+        'por_mes': dict(sorted(por_mes.items())),
+        'causaram_incidente': sum(1 for i in mudancas if i.get('causouIncidente')),
+        'taxa_sucesso': round(sucesso / len(concluidas), 4) if concluidas else None,
+    }
+
+
+AGREGADORES = {
+    'incidentes': agregar_incidentes,
+    'mudancas': agregar_mudancas,
+}
+
+
+def gerar_resumo(dataset):
+    entrada, saida = DATASETS[dataset]
+    with open(entrada, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+
+    resumo = {
+        'ultima_atualizacao': dados.get('ultima_atualizacao') or datetime.now().isoformat(),
+        **AGREGADORES[dataset](dados.get(dataset, []))
+    }
+
+    if publicar_json(saida, resumo):
+        print(f'✓ Resumo de {dataset} gravado em {saida}')
+    else:
+        print(f'= Resumo de {dataset} sem alterações')
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera os arquivos de resumo dos dashboards')
+    parser.add_argument('datasets', nargs='*', help=f'Datasets a agregar: {", ".join(DATASETS)} (padrão: todos)')
+    args = parser.parse_args()
+
+    for dataset in args.datasets or list(DATASETS):
+        if dataset not in DATASETS:
+            parser.error(f'dataset desconhecido: {dataset}')
+        try:
+            gerar_resumo(dataset)
+        except (OSError, ValueError) as e:
+            print(f'✗ Erro ao agregar {dataset}: {e}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
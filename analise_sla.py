@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Análise de SLA e MTTR dos incidentes
+Central de Serviços - Open Finance Brasil
+
+O snapshot guarda apenas os textos "amigáveis" do Jira para o SLA
+(sla_elapsed/sla_remaining, ex.: "16h"), que envelhecem assim que são
+gravados e não servem para ordenar nem agregar. Este script carrega
+dados-incidentes.json em um DataFrame (pandas/NumPy), converte created,
+resolutiondate e sla_breach_time em datas e calcula, de forma vetorizada:
+  - tempo restante de SLA e violação em relação ao momento da execução
+  - percentis de MTTR (p50/p90/p99) geral e por sistema, prioridade e responsável
+  - séries semanais de abertos, resolvidos, violados e MTTR
+
+O resultado é publicado em dados-incidentes-sla.json (com os derivados
+.min/.gz/.br). Para os abertos é publicado o prazo (ISO, ordenável) em vez do
+tempo restante, que o navegador calcula: assim o arquivo só muda quando os
+dados mudam, e não a cada execução.
+
+Requer pandas e NumPy (requirements-scripts.txt).
+
+Uso:
+    python analise_sla.py
+    python analise_sla.py --entrada dados-incidentes.json --saida dados-incidentes-sla.json
+"""
+import sys
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from fluxo_json import iterar_itens
+from publicacao import publicar_json
+from agregar_dados import STATUS_CONCLUIDOS, STATUS_CANCELADOS
+
+ENTRADA = 'dados-incidentes.json'
+SAIDA = 'dados-incidentes-sla.json'
+
+FORMATO_DATA_JIRA = '%Y-%m-%dT%H:%M:%S.%f%z'
+FUSO = 'America/Sao_Paulo'
+PERCENTIS = (0.5, 0.9, 0.99)
+VAZIO = 'Não informado'
+
+COLUNAS = ('key', 'status', 'priority', 'assignee', 'sistema_afetado',
+           'created', 'resolutiondate', 'sla_breach_time', 'sla_breached')
+AGRUPAMENTOS = {
+    'por_sistema': 'sistema_afetado',
+    'por_prioridade': 'priority',
+    'por_time': 'assignee',
+}
+
+
+def carregar(caminho=ENTRADA):
+    """
+    DataFrame com uma linha por incidente e as colunas de COLUNAS, lido em
+    stream do snapshot. Retorna também a 'ultima_atualizacao' do arquivo.
+    """
+    cabecalho = {}
+    registros = ([item.get(c) for c in COLUNAS] for item in iterar_itens(caminho, 'incidentes', cabecalho))
+    df = pd.DataFrame.from_records(registros, columns=list(COLUNAS))
+    return preparar(df), cabecalho.get('ultima_atualizacao')
+
+
+def preparar(df):
+    """Converte as datas do Jira (ex.: '2026-08-21T19:29:58.595-0300') e normaliza os campos de agrupamento."""
+    df = df.copy()
+    for coluna in ('created', 'resolutiondate', 'sla_breach_time'):
+        df[coluna] = pd.to_datetime(df[coluna], format=FORMATO_DATA_JIRA, utc=True, errors='coerce')
+    for coluna in AGRUPAMENTOS.values():
+        df[coluna] = df[coluna].replace('', None).fillna(VAZIO)
+    df['sla_breached'] = df['sla_breached'].fillna(False).astype(bool)
+    df['status'] = df['status'].fillna('')
+
+    df['aberto'] = df['resolutiondate'].isna() & ~df['status'].isin(STATUS_CONCLUIDOS | STATUS_CANCELADOS)
+    df['mttr_horas'] = (df['resolutiondate'] - df['created']) / pd.Timedelta(hours=1)
+    return df
+
+
+def calcular_sla(df, agora):
+    """
+    Acrescenta `sla_restante_horas` (só para abertos com prazo; negativo se
+    vencido) e `sla_violado`: marcado pelo Jira, resolvido depois do prazo ou
+    aberto com o prazo já vencido em `agora`.
+    """
+    prazo = df['sla_breach_time']
+    com_prazo = prazo.notna()
+    restante = (prazo - agora) / pd.Timedelta(hours=1)
+    df['sla_restante_horas'] = restante.where(df['aberto'] & com_prazo)
+    df['sla_violado'] = (
+        df['sla_breached']
+        | (com_prazo & df['resolutiondate'].notna() & (df['resolutiondate'] > prazo))
+        | (com_prazo & df['aberto'] & (restante < 0))
+    )
+    return df
+
+
+def _numero(valor, casas=2):
+    """Float JSON-compatível (NaN -> None)."""
+    if valor is None or pd.isna(valor):
+        return None
+    return round(float(valor), casas)
+
+
+def _percentis(serie):
+    valores = serie.dropna().to_numpy()
+    if not len(valores):
+        return {'n': 0, 'media': None, **{f'p{int(p * 100)}': None for p in PERCENTIS}}
+    calculados = np.quantile(valores, PERCENTIS)
+    return {
+        'n': int(len(valores)),
+        'media': _numero(valores.mean()),
+        **{f'p{int(p * 100)}': _numero(v) for p, v in zip(PERCENTIS, calculados)},
+    }
+
+
+def mttr_percentis(df):
+    """Percentis de MTTR (horas) no geral e por cada agrupamento."""
+    resolvidos = df[df['mttr_horas'].notna()]
+    resultado = {'geral': _percentis(resolvidos['mttr_horas'])}
+    for nome, coluna in AGRUPAMENTOS.items():
+        grupos = resolvidos.groupby(coluna)['mttr_horas']
+        tabela = grupos.quantile(list(PERCENTIS)).unstack()
+        tabela['n'] = grupos.size()
+        tabela['media'] = grupos.mean()
+        resultado[nome] = {
+            chave: {
+                'n': int(linha['n']),
+                'media': _numero(linha['media']),
+                **{f'p{int(p * 100)}': _numero(linha[p]) for p in PERCENTIS},
+            }
+            for chave, linha in tabela.sort_index().iterrows()
+        }
+    return resultado
+
+
+def _semana(datas):
+    """Segunda-feira (AAAA-MM-DD, horário de Brasília) da semana de cada data."""
+    locais = datas.dt.tz_convert(FUSO).dt.normalize()
+    return (locais - pd.to_timedelta(locais.dt.weekday, unit='D')).dt.strftime('%Y-%m-%d')
+
+
+def tendencia_semanal(df):
+    """Série por semana: abertos e violados (pela criação), resolvidos e MTTR (pela resolução)."""
+    criacao = _semana(df['created'])
+    resolucao = _semana(df['resolutiondate'])
+    tabela = pd.DataFrame({
+        'abertos': df.groupby(criacao).size(),
+        'violados': df['sla_violado'].groupby(criacao).sum(),
+        'resolvidos': df.groupby(resolucao).size(),
+        'mttr_p50_horas': df['mttr_horas'].groupby(resolucao).median(),
+    }).sort_index()
+    contagens = ['abertos', 'violados', 'resolvidos']
+    tabela[contagens] = tabela[contagens].fillna(0).astype(int)
+    return [
+        {'semana': semana, **{c: int(linha[c]) for c in contagens},
+         'mttr_p50_horas': _numero(linha['mttr_p50_horas'])}
+        for semana, linha in tabela.iterrows()
+    ]
+
+
+def resumo_sla(df):
+    abertos = df[df['aberto']]
+    restante = abertos['sla_restante_horas']
+    violados = int(df['sla_violado'].sum())
+    return {
+        'com_prazo': int(df['sla_breach_time'].notna().sum()),
+        'violados': violados,
+        'taxa_violacao': round(violados / len(df), 4) if len(df) else 0,
+        'abertos': int(len(abertos)),
+        'abertos_violados': int(abertos['sla_violado'].sum()),
+        'abertos_vencem_24h': int(((restante >= 0) & (restante < 24)).sum()),
+    }
+
+
+def prazos_abertos(df):
+    """Abertos com prazo, do mais urgente para o menos urgente."""
+    abertos = df[df['aberto'] & df['sla_breach_time'].notna()].sort_values('sla_breach_time')
+    prazos = abertos['sla_breach_time'].dt.tz_convert(FUSO).dt.strftime('%Y-%m-%dT%H:%M:%S%z')
+    return [
+        {'key': key, 'prazo': prazo, 'violado': bool(violado)}
+        for key, prazo, violado in zip(abertos['key'], prazos, abertos['sla_violado'])
+    ]
+
+
+def analisar(df, agora=None):
+    """Todas as métricas de SLA/MTTR de `df` (saída de `carregar`/`preparar`)."""
+    agora = pd.Timestamp(agora or datetime.now().astimezone()).tz_convert('UTC')
+    df = calcular_sla(df, agora)
+    return {
+        'total': int(len(df)),
+        'sla': resumo_sla(df),
+        'mttr_horas': mttr_percentis(df),
+        'tendencia_semanal': tendencia_semanal(df),
+        'abertos': prazos_abertos(df),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Métricas de SLA e MTTR dos incidentes')
+    parser.add_argument('--entrada', default=ENTRADA, help=f'Snapshot de incidentes (padrão: {ENTRADA})')
+    parser.add_argument('--saida', default=SAIDA, help=f'Arquivo publicado (padrão: {SAIDA})')
+    args = parser.parse_args()
+
+    try:
+        df, ultima_atualizacao = carregar(args.entrada)
+    except (OSError, ValueError) as e:
+        print(f'✗ Erro ao ler {args.entrada}: {e}')
+        sys.exit(1)
+
+    resultado = {
+        'ultima_atualizacao': ultima_atualizacao or datetime.now().isoformat(),
+        **analisar(df),
+    }
+
+    sla = resultado['sla']
+    print(f"✓ {resultado['total']} incidentes: {sla['violados']} com SLA violado, "
+          f"{sla['abertos_violados']} abertos violados, {sla['abertos_vencem_24h']} vencem em 24h")
+    if publicar_json(args.saida, resultado):
+        print(f'✓ Análise de SLA gravada em {args.saida}')
+    else:
+        print('= Análise de SLA sem alterações')
+
+
+if __name__ == '__main__':
+    main()
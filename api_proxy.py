@@ -3,11 +3,23 @@
 Proxy API para Jira - Resolve problema de CORS
 Central de Serviços - Open Finance Brasil
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import requests
 from requests.auth import HTTPBasicAuth
 import sys
+import os
+import json
+import time
+import hmac
+import hashlib
+import secrets
+import threading
+
+import jira_client
+import metricas
+import projecao
+from cache_ttl import CacheTTL
+from indice_dados import IndiceDataset, FILTROS, parse_data_filtro
 
 # Fix encoding
 if sys.platform == 'win32':
@@ -15,17 +27,127 @@ if sys.platform == 'win32':
 
 app = Flask(__name__)
 CORS(app)
+metricas.instrumentar(app, 'api_proxy')
+
+# Configurável para apontar para outra instância (ex.: o Jira falso de benchmarks/)
+JIRA_URL = os.environ.get('JIRA_URL', 'https://openfinancebrasil.atlassian.net').rstrip('/')
+
+CAMPOS_TICKETS = 'summary,description,status,priority,created,assignee,reporter'
+
+# Cache das buscas de /api/tickets: muitos usuários consultam o mesmo projeto
+# em poucos segundos, então uma única chamada ao Jira atende a todos
+tickets_cache = CacheTTL(
+    ttl=float(os.environ.get('TICKETS_CACHE_TTL', '30')),
+    max_itens=int(os.environ.get('TICKETS_CACHE_MAX', '256'))
+)
+
+
+# Snapshots publicados pelos workflows, indexados em memória para /api/incidentes
+# e /api/mudancas (recarregados quando o arquivo muda)
+DADOS_DIR = os.environ.get('DADOS_DIR', os.path.dirname(os.path.abspath(__file__)))
+indices = {
+    'incidentes': IndiceDataset(os.path.join(DADOS_DIR, 'dados-incidentes.json'), 'incidentes'),
+    'mudancas': IndiceDataset(os.path.join(DADOS_DIR, 'dados-mudancas.json'), 'mudancas'),
+}
+
+
+# Cache da validação de credenciais (/rest/api/3/myself): guarda só o perfil
+# retornado, indexado pela impressão digital do par email/token. Respostas 401
+# ficam em cache por menos tempo; um token revogado ainda é aceito por no
+# máximo VALIDACAO_CACHE_TTL segundos.
+credenciais_cache = CacheTTL(
+    ttl=float(os.environ.get('VALIDACAO_CACHE_TTL', '120')),
+    max_itens=int(os.environ.get('VALIDACAO_CACHE_MAX', '2048'))
+)
+VALIDACAO_NEGATIVA_TTL = float(os.environ.get('VALIDACAO_NEGATIVA_TTL', '30'))
+
+metricas.REGISTRO.registrar_cache('tickets', tickets_cache)
+metricas.REGISTRO.registrar_cache('credenciais', credenciais_cache)
+
+# Sal das impressões digitais: aleatório por processo, a menos que definido
+# (ex.: para compartilhar chaves entre workers)
+SAL_CREDENCIAIS = (os.environ.get('CREDENCIAIS_SAL') or secrets.token_hex(32)).encode('utf-8')
+
+
+def fingerprint_credenciais(email, token):
+    """Identifica o par email/token (HMAC com sal) sem manter o token em memória."""
+    return hmac.new(SAL_CREDENCIAIS, f'{email}\0{token}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def consultar_usuario(auth):
+    """Consulta /myself e retorna (status_code, perfil ou mensagem de erro)."""
+    url = f'{JIRA_URL}/rest/api/3/myself'
+    response = jira_client.get(url, auth=auth, headers={'Accept': 'application/json'})
+
+    if response.status_code == 200:
+        user_data = response.json()
+        return 200, {
+            'displayName': user_data.get('displayName'),
+            'emailAddress': user_data.get('emailAddress'),
+            'avatarUrl': user_data.get('avatarUrls', {}).get('48x48', '')
+        }
+    if response.status_code == 401:
+        return 401, 'Credenciais inválidas'
+    return response.status_code, f'Erro {response.status_code}'
+
+
+def validar_credenciais(email, token):
+    """
+    (status_code, perfil ou erro) das credenciais, com cache: 200 por
+    VALIDACAO_CACHE_TTL e 401 por VALIDACAO_NEGATIVA_TTL segundos; outros
+    erros (ex.: Jira fora do ar) não são guardados.
+    """
+    return credenciais_cache.obter_ou_calcular(
+        fingerprint_credenciais(email, token),
+        lambda: consultar_usuario(HTTPBasicAuth(email, token)),
+        armazenar=lambda resultado: resultado[0] in (200, 401),
+        ttl_para=lambda resultado: VALIDACAO_NEGATIVA_TTL if resultado[0] == 401 else None
+    )
+
+
+def credenciais_recusadas(fingerprint):
+    """True se essas credenciais receberam 401 há pouco (sem consultar o Jira)."""
+    # Sem contar nas métricas: a validação logo em seguida já conta acerto/falha
+    resultado = credenciais_cache.consultar(fingerprint)
+    return resultado is not None and resultado[0] == 401
+
 
-JIRA_URL = "https://openfinancebrasil.atlassian.net"
+def registrar_recusa(fingerprint):
+    credenciais_cache.set(fingerprint, (401, 'Credenciais inválidas'), VALIDACAO_NEGATIVA_TTL)
+
+
+def buscar_tickets(auth, project, fields, formato=projecao.FORMATO_PADRAO, limite=projecao.DESCRICAO_MAX,
+                   next_page_token=None):
+    """
+    Consulta uma página (até 100 issues) de /search/jql e retorna
+    (status_code, corpo), com o corpo já projetado em `formato`. A página
+    seguinte é pedida com o nextPageToken da resposta.
+    """
+    jql = f'project = {project} ORDER BY created DESC'
+    try:
+        corpo = jira_client.buscar_pagina(JIRA_URL, auth, jql, fields.split(','), 100, next_page_token)
+    except jira_client.ErroJira as e:
+        return e.status_code, e.detalhes
+    return 200, projecao.projetar_busca(corpo, formato, limite)
 
 
 @app.route('/api/tickets', methods=['POST'])
 def get_tickets():
     """
     POST /api/tickets
-    Body JSON: {"email": "xxx", "token": "xxx", "project": "105"}
+    Body JSON: {"email": "xxx", "token": "xxx", "project": "105", "fields": "summary,status"}
     Retorna lista de tickets do Jira Service Desk.
     Token trafega no body, nunca na URL.
+    Respostas ficam em cache por TICKETS_CACHE_TTL segundos.
+
+    "formato": "reduzido" (padrão), "compacto" ou "jira" (ver projecao.py) e
+    "descricao_max": caracteres da descrição em texto (0 = sem limite).
+
+    Sem stream, responde uma página de até 100 issues; "nextPageToken" (da
+    resposta anterior) pede a página seguinte, até "isLast": true.
+
+    Com "stream": true percorre todas as páginas (nextPageToken) e responde em
+    NDJSON (application/x-ndjson), uma issue por linha, sem limite de resultados.
     """
     try:
         data = request.get_json()
@@ -35,34 +157,61 @@ def get_tickets():
         email = data.get('email')
         token = data.get('token')
         project = data.get('project', '105')
+        fields = data.get('fields') or CAMPOS_TICKETS
+        if isinstance(fields, list):
+            fields = ','.join(fields)
 
         if not email or not token:
             return jsonify({'error': 'Email e token são obrigatórios'}), 400
 
+        formato = data.get('formato') or projecao.FORMATO_PADRAO
+        if formato not in projecao.FORMATOS:
+            return jsonify({'error': f'Formato inválido (use: {", ".join(projecao.FORMATOS)})'}), 400
+        try:
+            limite = int(data.get('descricao_max', projecao.DESCRICAO_MAX))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'descricao_max deve ser um número'}), 400
+        if limite < 0:
+            return jsonify({'error': 'descricao_max deve ser >= 0'}), 400
+
         auth = HTTPBasicAuth(email, token)
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json'
-        }
+        fingerprint = fingerprint_credenciais(email, token)
 
-        jql = f'project = {project} ORDER BY created DESC'
-        url = f'{JIRA_URL}/rest/api/3/search'
-        params = {
-            'jql': jql,
-            'maxResults': 100,
-            'fields': 'summary,description,status,priority,created,assignee,reporter'
-        }
+        # Credenciais recusadas há pouco (login ou busca anterior): nem chega ao Jira
+        if credenciais_recusadas(fingerprint):
+            return jsonify({'error': 'Erro na API do Jira: 401', 'details': 'Credenciais inválidas'}), 401
+
+        if data.get('stream'):
+            jql = f'project = {project} ORDER BY created DESC'
+            paginas = jira_client.paginar_busca(JIRA_URL, auth, jql, fields.split(','))
+            return jira_client.resposta_ndjson(projecao.projetar_issues(pagina, formato, limite) for pagina in paginas)
+
+        next_page_token = data.get('nextPageToken')
+        chave = (fingerprint, str(project), fields, formato, limite, next_page_token)
 
-        response = requests.get(url, auth=auth, headers=headers, params=params)
+        status_code, corpo = tickets_cache.obter_ou_calcular(
+            chave,
+            lambda: buscar_tickets(auth, project, fields, formato, limite, next_page_token),
+            armazenar=lambda resultado: resultado[0] == 200
+        )
+        if status_code == 401:
+            registrar_recusa(fingerprint)
 
-        if response.status_code == 200:
-            return jsonify(response.json())
+        if status_code == 200:
+            return jsonify(corpo)
         else:
             return jsonify({
-                'error': f'Erro na API do Jira: {response.status_code}',
-                'details': response.text
-            }), response.status_code
+                'error': f'Erro na API do Jira: {status_code}',
+                'details': corpo
+            }), status_code
 
+    except jira_client.ErroJira as e:
+        if e.status_code == 401:
+            registrar_recusa(fingerprint_credenciais(email, token))
+        return jsonify({
+            'error': f'Erro na API do Jira: {e.status_code}',
+            'details': e.detalhes
+        }), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -73,6 +222,7 @@ def validate_credentials():
     POST /api/validate
     Body JSON: {"email": "xxx", "token": "xxx"}
     Valida credenciais do Jira. Token trafega no body, nunca na URL.
+    Resultados ficam em cache (ver validar_credenciais).
     """
     try:
         data = request.get_json()
@@ -85,31 +235,156 @@ def validate_credentials():
         if not email or not token:
             return jsonify({'error': 'Email e token são obrigatórios'}), 400
 
-        auth = HTTPBasicAuth(email, token)
-        headers = {'Accept': 'application/json'}
+        status_code, resultado = validar_credenciais(email, token)
 
-        url = f'{JIRA_URL}/rest/api/3/myself'
-        response = requests.get(url, auth=auth, headers=headers)
-
-        if response.status_code == 200:
-            user_data = response.json()
-            return jsonify({
-                'success': True,
-                'user': {
-                    'displayName': user_data.get('displayName'),
-                    'emailAddress': user_data.get('emailAddress'),
-                    'avatarUrl': user_data.get('avatarUrls', {}).get('48x48', '')
-                }
-            })
-        elif response.status_code == 401:
-            return jsonify({'success': False, 'error': 'Credenciais inválidas'}), 401
-        else:
-            return jsonify({'success': False, 'error': f'Erro {response.status_code}'}), response.status_code
+        if status_code == 200:
+            return jsonify({'success': True, 'user': resultado})
+        return jsonify({'success': False, 'error': resultado}), status_code
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def consultar_dataset(dataset):
+    """
+    Filtros via query string (valores múltiplos separados por vírgula):
+      q=texto  status=  priority=  sistema=  assignee=  categoria=
+      desde=2026-08-01  ate=2026-09-01  (created, intervalo [desde, ate))
+      limite=50  cursor=<proximo_cursor>  campos=key,summary,status
+    """
+    args = request.args
+    try:
+        filtros = {
+            parametro: [v for v in args.get(parametro, '').split(',') if v]
+            for parametro in FILTROS
+        }
+        resultado = indices[dataset].buscar(
+            q=args.get('q'),
+            desde=parse_data_filtro(args.get('desde')),
+            ate=parse_data_filtro(args.get('ate')),
+            cursor=args.get('cursor'),
+            limite=args.get('limite', type=int),
+            campos=[c for c in args.get('campos', '').split(',') if c] or None,
+            **filtros
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetro inválido: {e}'}), 400
+
+    return jsonify(resultado)
+
+
+# Frequência de verificação do snapshot e de envio de keep-alive no SSE (segundos)
+INTERVALO_SSE = float(os.environ.get('SSE_INTERVALO', '2'))
+INTERVALO_KEEPALIVE = 25
+
+# Cada stream ocupa um worker (ou greenlet) enquanto aberto: a conexão é
+# encerrada após SSE_DURACAO_MAX segundos (o EventSource reconecta sozinho,
+# retomando pelo Last-Event-ID) e cada processo aceita no máximo
+# SSE_MAX_CONEXOES streams simultâneos (os demais recebem 503)
+DURACAO_MAX_SSE = float(os.environ.get('SSE_DURACAO_MAX', '300'))
+MAX_CONEXOES_SSE = int(os.environ.get('SSE_MAX_CONEXOES', '50'))
+RECONEXAO_SSE_MS = 3000
+vagas_sse = threading.BoundedSemaphore(MAX_CONEXOES_SSE)
+
+
+def evento_sse(tipo, dados, id_evento=None):
+    linhas = [f'event: {tipo}']
+    if id_evento:
+        linhas.append(f'id: {id_evento}')
+    linhas.append(f'data: {json.dumps(dados, ensure_ascii=False)}')
+    return '\n'.join(linhas) + '\n\n'
+
+
+def stream_dataset(dataset):
+    """
+    Server-Sent Events: envia a versão atual (`snapshot`) e depois apenas as
+    diferenças (`diff`: adicionados/alterados/removidos) a cada nova versão.
+    A versão é o hash do conteúdo; com ?versao=<hash> ou Last-Event-ID o
+    cliente retoma de onde parou. `reset` indica que o cliente deve recarregar
+    o arquivo completo (versão fora do histórico).
+    A conexão dura no máximo DURACAO_MAX_SSE segundos; o cliente reconecta
+    com Last-Event-ID e só recebe o que mudou nesse intervalo.
+    """
+    if not vagas_sse.acquire(blocking=False):
+        return jsonify({'error': 'Limite de streams simultâneos atingido'}), 503, {
+            'Retry-After': str(RECONEXAO_SSE_MS // 1000)
+        }
+
+    liberada = threading.Event()
+
+    def liberar():
+        if not liberada.is_set():
+            liberada.set()
+            vagas_sse.release()
+
+    try:
+        indice = indices[dataset]
+        indice.recarregar_se_mudou()
+    except Exception:
+        liberar()
+        raise
+    versao_cliente = request.args.get('versao') or request.headers.get('Last-Event-ID')
+
+    def gerar():
+        yield f'retry: {RECONEXAO_SSE_MS}\n\n'
+        versao = versao_cliente or indice.hash
+        if versao_cliente is None:
+            yield evento_sse('snapshot', {
+                'versao': indice.hash,
+                'ultima_atualizacao': indice.ultima_atualizacao,
+                'total': len(indice.itens)
+            }, indice.hash)
+
+        ultimo_envio = inicio = time.monotonic()
+        while time.monotonic() - inicio < DURACAO_MAX_SSE:
+            indice.recarregar_se_mudou()
+            if versao != indice.hash:
+                diferencas = indice.diferencas_desde(versao)
+                if diferencas is None:
+                    yield evento_sse('reset', {'versao': indice.hash}, indice.hash)
+                else:
+                    for anterior, nova, diferenca in diferencas:
+                        yield evento_sse('diff', {'de': anterior, 'para': nova, **diferenca}, nova)
+                versao = indice.hash
+                ultimo_envio = time.monotonic()
+            elif time.monotonic() - ultimo_envio >= INTERVALO_KEEPALIVE:
+                yield ': keep-alive\n\n'
+                ultimo_envio = time.monotonic()
+            time.sleep(INTERVALO_SSE)
+
+    resposta = Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Chamado quando a resposta termina ou o cliente desconecta
+    resposta.call_on_close(liberar)
+    return resposta
+
+
+@app.route('/api/stream/incidentes', methods=['GET'])
+def stream_incidentes():
+    """GET /api/stream/incidentes - SSE com as alterações de dados-incidentes.json"""
+    return stream_dataset('incidentes')
+
+
+@app.route('/api/stream/mudancas', methods=['GET'])
+def stream_mudancas():
+    """GET /api/stream/mudancas - SSE com as alterações de dados-mudancas.json"""
+    return stream_dataset('mudancas')
+
+
+@app.route('/api/incidentes', methods=['GET'])
+def listar_incidentes():
+    """GET /api/incidentes - busca paginada em dados-incidentes.json (ver consultar_dataset)"""
+    return consultar_dataset('incidentes')
+
+
+@app.route('/api/mudancas', methods=['GET'])
+def listar_mudancas():
+    """GET /api/mudancas - busca paginada em dados-mudancas.json (ver consultar_dataset)"""
+    return consultar_dataset('mudancas')
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check"""
@@ -126,8 +401,13 @@ if __name__ == '__main__':
     print()
     print("📋 ENDPOINTS:")
     print("   GET  /api/health    - Health check")
-    print("   POST /api/tickets   - Listar tickets (token no body, não na URL)")
+    print("   GET  /metrics       - Métricas (formato Prometheus)")
+    print("   POST /api/tickets   - Listar tickets (token no body, não na URL; \"stream\": true para NDJSON)")
     print("   POST /api/validate  - Validar credenciais")
+    print("   GET  /api/incidentes - Buscar incidentes (filtros, paginação)")
+    print("   GET  /api/mudancas   - Buscar mudanças (filtros, paginação)")
+    print("   GET  /api/stream/incidentes - SSE com alterações dos incidentes")
+    print("   GET  /api/stream/mudancas   - SSE com alterações das mudanças")
     print()
     print("⚠️  PARA PARAR: Ctrl+C")
     print("=" * 80)
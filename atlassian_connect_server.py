@@ -3,15 +3,23 @@
 Atlassian Connect App Server
 Central de Serviços - Open Finance Brasil
 """
-from flask import Flask, request, jsonify, send_file, render_template_string
+from flask import Flask, request, jsonify, send_file, render_template_string, g
 from flask_cors import CORS
 import jwt
-import requests
 import json
 import sys
 import os
 import hmac
 import hashlib
+import time
+from urllib.parse import quote
+
+import jira_client
+import metricas
+import projecao
+from cache_ttl import CacheTTL
+from instalacoes import criar_store
+from webhook_jira import IngestorWebhook
 
 # Fix encoding
 if sys.platform == 'win32':
@@ -19,13 +27,35 @@ if sys.platform == 'win32':
 
 app = Flask(__name__)
 CORS(app)
+metricas.instrumentar(app, 'atlassian_connect')
 
-# Armazenar informações de instalação (em produção, use banco de dados)
-installations = {}
+# Instalações persistidas (SQLite por padrão, compartilhado entre workers)
+installations = criar_store()
+if hasattr(installations, 'cache'):
+    metricas.REGISTRO.registrar_cache('instalacoes', installations.cache)
 
 # Jira Configuration
 JIRA_URL = "https://openfinancebrasil.atlassian.net"
 
+CAMPOS_TICKETS = 'summary,description,status,priority,created,assignee,reporter'
+
+# Webhooks de issues atualizam os snapshots em DADOS_DIR quase em tempo real
+DADOS_DIR = os.environ.get('DADOS_DIR', os.path.dirname(os.path.abspath(__file__)))
+ingestor_webhook = IngestorWebhook(DADOS_DIR)
+
+# Tokens já verificados, por (hash do token, clientKey), válidos até o `exp`
+# de cada um. O qsh é conferido a cada requisição, então um token em cache não
+# autoriza outra URL além daquela para a qual foi emitido.
+# O cache é local a cada worker: /installed e /uninstalled só limpam o do
+# worker que os recebeu; nos demais, um token da instalação removida ou com
+# sharedSecret antigo ainda vale até o próprio `exp` (no máximo alguns minutos).
+tokens_verificados = CacheTTL(ttl=180, max_itens=int(os.environ.get('JWT_CACHE_MAX', '1024')))
+metricas.REGISTRO.registrar_cache('tokens_jwt', tokens_verificados)
+
+# qsh usado pelos tokens de contexto (AP.context.getToken), que não são
+# vinculados a uma URL específica
+QSH_CONTEXTO = 'context-qsh'
+
 
 def verify_jwt(token, client_key):
     """
@@ -57,6 +87,63 @@ def verify_jwt(token, client_key):
         return None, f"Token JWT inválido: {str(e)}"
 
 
+def _codificar(valor):
+    """Percent-encoding RFC 3986 exigido pelo canonical request do Atlassian."""
+    return quote(valor, safe='~')
+
+
+def calcular_qsh(method, path, args):
+    """
+    Query string hash (qsh) do Atlassian Connect:
+    SHA-256 de METHOD&path&query canônica (parâmetros ordenados, sem `jwt`).
+    """
+    caminho = path.rstrip('/') or '/'
+    caminho = caminho.replace('&', '%26')
+
+    parametros = []
+    for chave in sorted(k for k in args.keys() if k != 'jwt'):
+        valores = ','.join(_codificar(v) for v in sorted(args.getlist(chave)))
+        parametros.append(f'{_codificar(chave)}={valores}')
+
+    canonico = f"{method.upper()}&{caminho}&{'&'.join(parametros)}"
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def client_key_do_token(token):
+    """Lê o `iss` (clientKey da instalação) sem verificar a assinatura."""
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+    return claims.get('iss')
+
+
+def verificar_token(token, client_key):
+    """
+    Verifica o JWT usando o cache de tokens já validados.
+    Retorna (claims, erro) como verify_jwt.
+    """
+    chave = (hashlib.sha256(token.encode('utf-8')).hexdigest(), client_key)
+    decoded = tokens_verificados.get(chave)
+    if decoded is not None:
+        if decoded.get('exp', 0) <= time.time():
+            tokens_verificados.invalidar(chave)
+            return None, "Token JWT expirado"
+        return decoded, None
+
+    decoded, error = verify_jwt(token, client_key)
+    if decoded:
+        restante = decoded.get('exp', 0) - time.time()
+        if restante > 0:
+            tokens_verificados.set(chave, decoded, ttl=restante)
+    return decoded, error
+
+
+def esquecer_tokens(client_key):
+    """Descarta os tokens em cache de uma instalação (ex.: segredo trocado ou app removido)."""
+    return tokens_verificados.invalidar_se(lambda chave: chave[1] == client_key)
+
+
 def require_jwt(f):
     """Decorator para proteger endpoints que exigem JWT válido do Atlassian."""
     from functools import wraps
@@ -68,18 +155,21 @@ def require_jwt(f):
         if not jwt_token:
             return jsonify({'error': 'Token JWT obrigatório'}), 401
 
-        # Tentar validar contra todas as instalações se clientKey não informado
+        # Sem clientKey explícito, a instalação é a indicada no `iss` do token
         if not client_key:
-            for ck in installations:
-                decoded, error = verify_jwt(jwt_token, ck)
-                if decoded:
-                    return f(*args, **kwargs)
-            return jsonify({'error': 'Token JWT inválido ou instalação não encontrada'}), 401
+            client_key = client_key_do_token(jwt_token)
+            if not client_key:
+                return jsonify({'error': 'Token JWT inválido ou instalação não encontrada'}), 401
 
-        decoded, error = verify_jwt(jwt_token, client_key)
+        decoded, error = verificar_token(jwt_token, client_key)
         if not decoded:
             return jsonify({'error': error}), 401
 
+        qsh = decoded.get('qsh')
+        if qsh != QSH_CONTEXTO and qsh != calcular_qsh(request.method, request.path, request.args):
+            return jsonify({'error': 'Token JWT não corresponde a esta requisição (qsh)'}), 401
+
+        g.client_key = client_key
         return f(*args, **kwargs)
     return decorated
 
@@ -97,12 +187,29 @@ def installed():
     data = request.get_json()
 
     client_key = data.get('clientKey')
-    installations[client_key] = {
+
+    # Reinstalação (mesmo clientKey ou mesmo site): o Jira assina o callback com
+    # o sharedSecret atual, então só ele pode trocar o segredo ou o clientKey
+    existente = installations.get(client_key) or installations.get_por_base_url(data.get('baseUrl'))
+    if existente:
+        jwt_token = request.headers.get('Authorization', '').replace('JWT ', '')
+        decoded, error = verify_jwt(jwt_token, existente['clientKey'])
+        if not decoded:
+            return jsonify({'error': error}), 401
+        if decoded.get('qsh') != calcular_qsh(request.method, request.path, request.args):
+            return jsonify({'error': 'Token JWT não corresponde a esta requisição (qsh)'}), 401
+        if existente['clientKey'] != client_key:
+            esquecer_tokens(existente['clientKey'])
+            installations.remover(existente['clientKey'])
+
+    installations.salvar({
         'baseUrl': data.get('baseUrl'),
         'sharedSecret': data.get('sharedSecret'),
         'clientKey': client_key,
         'publicKey': data.get('publicKey')
-    }
+    })
+    # Reinstalação pode trocar o sharedSecret: tokens validados com o antigo saem do cache
+    esquecer_tokens(client_key)
 
     print(f"✅ App instalado para: {data.get('baseUrl')}")
     return jsonify({'status': 'installed'}), 200
@@ -114,13 +221,33 @@ def uninstalled():
     data = request.get_json()
     client_key = data.get('clientKey')
 
-    if client_key in installations:
-        del installations[client_key]
+    # Tokens emitidos por esta instalação deixam de valer imediatamente
+    esquecer_tokens(client_key)
+    if installations.remover(client_key):
         print(f"❌ App desinstalado: {client_key}")
 
     return jsonify({'status': 'uninstalled'}), 200
 
 
+@app.route('/webhook/jira', methods=['POST'])
+@require_jwt
+def webhook_jira():
+    """Webhook de issues (criada/atualizada/excluída) — protegido por JWT"""
+    # Qualquer um pode instalar o app no próprio site: só eventos da instância
+    # configurada alteram os snapshots
+    instalacao = installations.get(g.client_key) or {}
+    if (instalacao.get('baseUrl') or '').rstrip('/') != JIRA_URL:
+        return jsonify({'error': 'Webhook aceito apenas da instância do Jira configurada'}), 403
+
+    evento = request.get_json(silent=True)
+    if not evento:
+        return jsonify({'error': 'Body JSON obrigatório'}), 400
+
+    dataset = ingestor_webhook.processar(evento)
+    # Sempre 200 para eventos ignorados: o Jira não deve reenviá-los
+    return jsonify({'status': 'queued' if dataset else 'ignored', 'dataset': dataset}), 200
+
+
 @app.route('/dashboard', methods=['GET'])
 @require_jwt
 def dashboard():
@@ -133,6 +260,7 @@ def dashboard():
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Central de Serviços</title>
         <link rel="stylesheet" href="https://scluiz.github.io/central-servicos/dashboard.css">
+        <script src="https://connect-cdn.atl-paas.net/all.js"></script>
         <style>
             body { margin: 0; padding: 20px; background: linear-gradient(135deg, #FF1493 0%, #FFD700 100%); }
         </style>
@@ -146,9 +274,12 @@ def dashboard():
         <script>
             async function loadTickets() {
                 try {
-                    // Passa o JWT na query string para o backend validar
-                    const jwtToken = new URLSearchParams(window.location.search).get('jwt');
-                    const response = await fetch('/api/tickets?jwt=' + jwtToken);
+                    // Token de contexto (qsh "context-qsh"): o JWT da página só
+                    // vale para /dashboard, então pedimos um novo ao Jira
+                    const jwtToken = await new Promise(resolve => AP.context.getToken(resolve));
+                    const response = await fetch('/api/tickets', {
+                        headers: { 'Authorization': 'JWT ' + jwtToken }
+                    });
                     const data = await response.json();
                     displayTickets(data.issues || []);
                 } catch (error) {
@@ -189,7 +320,13 @@ def panel():
 @app.route('/api/tickets', methods=['GET'])
 @require_jwt
 def get_tickets():
-    """Buscar tickets do Jira usando credenciais seguras de env vars"""
+    """
+    Buscar tickets do Jira usando credenciais seguras de env vars.
+    Sem stream, responde uma página de até 50 issues (?nextPageToken= pede
+    a seguinte); com ?stream=1 percorre todas as páginas e responde em NDJSON.
+    ?fields=summary,status escolhe os campos e ?formato=reduzido|compacto|jira
+    o formato da resposta (ver projecao.py).
+    """
     try:
         email = os.environ.get('JIRA_EMAIL')
         token = os.environ.get('JIRA_TOKEN')
@@ -200,26 +337,22 @@ def get_tickets():
         from requests.auth import HTTPBasicAuth
         auth = HTTPBasicAuth(email, token)
 
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json'
-        }
-
         jql = 'project = 105 ORDER BY created DESC'
-        url = f'{JIRA_URL}/rest/api/3/search'
-        params = {
-            'jql': jql,
-            'maxResults': 50,
-            'fields': 'summary,description,status,priority,created,assignee,reporter'
-        }
+        campos = request.args.get('fields') or CAMPOS_TICKETS
+        formato = request.args.get('formato') or projecao.FORMATO_PADRAO
+        if formato not in projecao.FORMATOS:
+            return jsonify({'error': f'Formato inválido (use: {", ".join(projecao.FORMATOS)})'}), 400
 
-        response = requests.get(url, auth=auth, headers=headers, params=params)
+        if request.args.get('stream') in ('1', 'true'):
+            paginas = jira_client.paginar_busca(JIRA_URL, auth, jql, campos.split(','))
+            return jira_client.resposta_ndjson(projecao.projetar_issues(pagina, formato) for pagina in paginas)
 
-        if response.status_code == 200:
-            return jsonify(response.json())
-        else:
-            return jsonify({'error': 'Erro ao buscar tickets'}), response.status_code
+        corpo = jira_client.buscar_pagina(JIRA_URL, auth, jql, campos.split(','), 50,
+                                          request.args.get('nextPageToken'))
+        return jsonify(projecao.projetar_busca(corpo, formato))
 
+    except jira_client.ErroJira as e:
+        return jsonify({'error': 'Erro ao buscar tickets'}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -245,12 +378,14 @@ if __name__ == '__main__':
     print("📋 ENDPOINTS PROTEGIDOS POR JWT:")
     print("   GET  /dashboard    - Dashboard principal")
     print("   GET  /panel        - Web panel")
-    print("   GET  /api/tickets  - Listar tickets")
+    print("   GET  /api/tickets  - Listar tickets (?stream=1 para NDJSON)")
+    print("   POST /webhook/jira - Webhook de issues (atualiza os snapshots)")
     print()
     print("📋 ENDPOINTS PÚBLICOS:")
     print("   GET  /atlassian-connect.json - Descriptor do app")
     print("   POST /installed              - Webhook de instalação")
     print("   GET  /health                 - Health check")
+    print("   GET  /metrics                - Métricas (formato Prometheus)")
     print()
     print("=" * 80)
 
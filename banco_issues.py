@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Base local de issues (SQLite)
+Central de Serviços - Open Finance Brasil
+
+Guarda incidentes e mudanças no formato exportado pelos workflows em tabelas
+indexadas (status, created, sistema_afetado, assignee). Upserts nunca apagam
+registros, então o histórico fica preservado mesmo quando a JQL da exportação
+só cobre uma janela (ex.: mudanças dos últimos 90 dias).
+
+Após uma exportação completa, `importar --completo` também remove da base as
+issues excluídas ou movidas no Jira: as que faltam no snapshot, limitadas à
+janela que o snapshot cobre (`janela_dias`).
+
+Cada importação registra o período de criação que a base cobre por inteiro
+(`cobertura`): os relatórios mensais só regeram meses dentro dele.
+
+Uso:
+    python banco_issues.py importar [incidentes] [mudancas] [--completo]
+    python banco_issues.py exportar mudancas [--dias 90]
+"""
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sync_incidentes import parse_data_jira
+from sync_mudancas import DIAS_JANELA
+from fluxo_json import iterar_itens
+from publicacao import publicar_json
+
+CAMINHO_PADRAO = os.environ.get('BANCO_ISSUES_DB', 'banco_issues.db')
+
+DATASETS = {
+    'incidentes': {
+        'arquivo': 'dados-incidentes.json',
+        'colunas': ['summary', 'status', 'priority', 'assignee', 'reporter', 'created', 'updated',
+                    'resolutiondate', 'sistema_afetado', 'impacto', 'sla_breached'],
+        # Snapshot com todo o histórico do projeto
+        'janela_dias': None,
+    },
+    'mudancas': {
+        'arquivo': 'dados-mudancas.json',
+        'colunas': ['summary', 'status', 'priority', 'assignee', 'reporter', 'created', 'updated',
+                    'categoria', 'causouIncidente'],
+        # Snapshot só com as criadas ou atualizadas nos últimos DIAS_JANELA dias
+        'janela_dias': DIAS_JANELA,
+    },
+}
+
+# Margem na janela dos snapshots: a JQL relativa (-90d) é avaliada no Jira, em
+# outro momento e fuso
+MARGEM_JANELA = timedelta(days=1)
+
+# Colunas indexadas (e aceitas como filtro em consultar)
+INDICES = ['status', 'priority', 'assignee', 'sistema_afetado', 'categoria']
+
+
+def data_utc_iso(data):
+    return data.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def data_atualizacao(valor):
+    """'ultima_atualizacao' dos snapshots (isoformat, hora local sem fuso) -> datetime com fuso."""
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(valor).astimezone()
+    except ValueError:
+        return None
+
+
+def data_utc(valor):
+    """Data do Jira normalizada para ISO UTC, ordenável como texto."""
+    data = parse_data_jira(valor)
+    return data_utc_iso(data) if data else None
+
+
+class BancoIssues:
+    """Acesso à base local de incidentes e mudanças."""
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.conn = sqlite3.connect(caminho)
+        self.conn.row_factory = sqlite3.Row
+        self._criar_schema()
+
+    def _criar_schema(self):
+        with self.conn:
+            for dataset, config in DATASETS.items():
+                colunas = ', '.join(f'"{c}"' for c in config['colunas'])
+                self.conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS {dataset} ('
+                    f' key TEXT PRIMARY KEY, {colunas}, created_utc TEXT, dados TEXT NOT NULL)'
+                )
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{dataset}_created ON {dataset} (created_utc)')
+                for coluna in INDICES:
+                    if coluna in config['colunas']:
+                        self.conn.execute(
+                            f'CREATE INDEX IF NOT EXISTS idx_{dataset}_{coluna} ON {dataset} ("{coluna}")'
+                        )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS cobertura (dataset TEXT PRIMARY KEY, inicio_utc TEXT, fim_utc TEXT NOT NULL)'
+            )
+
+    def upsert(self, dataset, itens):
+        """Insere ou atualiza itens (dicts no formato exportado) pela `key`."""
+        colunas = DATASETS[dataset]['colunas']
+        nomes = ', '.join(['key'] + [f'"{c}"' for c in colunas] + ['created_utc', 'dados'])
+        marcadores = ', '.join('?' * (len(colunas) + 3))
+        total = 0
+
+        def linhas():
+            nonlocal total
+            for item in itens:
+                total += 1
+                yield ([item['key']]
+                       + [item.get(c) for c in colunas]
+                       + [data_utc(item.get('created')), json.dumps(item, ensure_ascii=False)])
+
+        with self.conn:
+            self.conn.executemany(f'INSERT OR REPLACE INTO {dataset} ({nomes}) VALUES ({marcadores})', linhas())
+        return total
+
+    def remover(self, dataset, keys):
+        with self.conn:
+            cursor = self.conn.executemany(f'DELETE FROM {dataset} WHERE key = ?', [(k,) for k in keys])
+        return cursor.rowcount
+
+    def cobertura(self, dataset):
+        """
+        (inicio, fim) do período de criação em que a base tem todas as issues
+        do dataset; inicio None = desde a primeira issue. None se desconhecido.
+        """
+        row = self.conn.execute('SELECT inicio_utc, fim_utc FROM cobertura WHERE dataset = ?', (dataset,)).fetchone()
+        if not row:
+            return None
+        inicio = datetime.fromisoformat(row['inicio_utc'].replace('Z', '+00:00')) if row['inicio_utc'] else None
+        return inicio, datetime.fromisoformat(row['fim_utc'].replace('Z', '+00:00'))
+
+    def registrar_cobertura(self, dataset, inicio, fim):
+        """
+        Registra que a base tem as issues criadas entre `inicio` (None: todas) e
+        `fim`. Um período que encosta no já registrado o estende; depois de uma
+        lacuna (ex.: importações paradas por mais que a janela), vale só o novo.
+        """
+        atual = self.cobertura(dataset)
+        if atual and inicio is not None and atual[1] >= inicio:
+            inicio = atual[0] if atual[0] is None else min(atual[0], inicio)
+            fim = max(atual[1], fim)
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO cobertura (dataset, inicio_utc, fim_utc) VALUES (?, ?, ?)',
+                              (dataset, data_utc_iso(inicio) if inicio else None, data_utc_iso(fim)))
+
+    def ausentes(self, dataset, presentes, janela_dias=None, agora=None):
+        """
+        Keys da base que não estão em `presentes`. Com `janela_dias`, só as
+        criadas ou atualizadas dentro da janela (as demais apenas saíram dela).
+        """
+        limite = None
+        if janela_dias:
+            agora = agora or datetime.now(timezone.utc)
+            limite = data_utc_iso(agora - timedelta(days=janela_dias) + MARGEM_JANELA)
+        ausentes = []
+        for row in self.conn.execute(f'SELECT key, created, updated FROM {dataset}'):
+            if row['key'] in presentes:
+                continue
+            if limite is None or max(data_utc(row['created']) or '', data_utc(row['updated']) or '') >= limite:
+                ausentes.append(row['key'])
+        return ausentes
+
+    def consultar(self, dataset, desde=None, ate=None, limite=None, **filtros):
+        """
+        Itens do dataset ordenados por created (mais recentes primeiro).
+        `desde`/`ate` são datetimes com fuso; `filtros` são colunas indexadas,
+        ex.: consultar('incidentes', status='Aberto', sistema_afetado='AWS').
+        """
+        condicoes, parametros = [], []
+        for coluna, valor in filtros.items():
+            if coluna not in INDICES or coluna not in DATASETS[dataset]['colunas']:
+                raise ValueError(f'Filtro não suportado em {dataset}: {coluna}')
+            condicoes.append(f'"{coluna}" = ?')
+            parametros.append(valor)
+        if desde:
+            condicoes.append('created_utc >= ?')
+            parametros.append(data_utc_iso(desde))
+        if ate:
+            condicoes.append('created_utc < ?')
+            parametros.append(data_utc_iso(ate))
+
+        sql = f'SELECT dados FROM {dataset}'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' ORDER BY created_utc DESC, key DESC'
+        if limite:
+            sql += ' LIMIT ?'
+            parametros.append(limite)
+
+        return [json.loads(row['dados']) for row in self.conn.execute(sql, parametros)]
+
+    def contar_por(self, dataset, coluna):
+        """Contagem agrupada por uma coluna indexada."""
+        if coluna not in INDICES or coluna not in DATASETS[dataset]['colunas']:
+            raise ValueError(f'Coluna não suportada em {dataset}: {coluna}')
+        rows = self.conn.execute(
+            f'SELECT "{coluna}" AS valor, COUNT(*) AS total FROM {dataset} GROUP BY "{coluna}" ORDER BY total DESC'
+        )
+        return {row['valor']: row['total'] for row in rows}
+
+    def exportar(self, dataset, dias=None):
+        """Payload no formato de dados-<dataset>.json; `dias` limita pela data de criação."""
+        desde = datetime.now(timezone.utc) - timedelta(days=dias) if dias else None
+        itens = self.consultar(dataset, desde=desde)
+        return {
+            'ultima_atualizacao': datetime.now().isoformat(),
+            'total': len(itens),
+            dataset: itens
+        }
+
+    def importar_json(self, dataset, caminho=None, completo=False):
+        """
+        Carrega o snapshot JSON publicado na base, lendo um item por vez.
+        Com `completo` (snapshot de uma exportação completa), remove as issues
+        ausentes dele dentro da janela do dataset. Retorna (gravados, removidos).
+        """
+        presentes = set()
+        cabecalho = {}
+
+        def itens():
+            for item in iterar_itens(caminho or DATASETS[dataset]['arquivo'], dataset, cabecalho):
+                presentes.add(item['key'])
+                yield item
+
+        gravados = self.upsert(dataset, itens())
+        janela_dias = DATASETS[dataset]['janela_dias']
+        # A janela do snapshot é relativa ao momento em que ele foi gerado
+        gerado_em = data_atualizacao(cabecalho.get('ultima_atualizacao'))
+        removidos = 0
+        if completo:
+            removidos = self.remover(dataset, self.ausentes(dataset, presentes, janela_dias, gerado_em))
+        if gerado_em:
+            inicio = gerado_em - timedelta(days=janela_dias) + MARGEM_JANELA if janela_dias else None
+            self.registrar_cobertura(dataset, inicio, gerado_em)
+        return gravados, removidos
+
+    def fechar(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Base local de incidentes e mudanças')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    importar = sub.add_parser('importar', help='Carrega os snapshots JSON na base')
+    importar.add_argument('datasets', nargs='*', help='incidentes, mudancas (padrão: todos)')
+    importar.add_argument('--completo', action='store_true',
+                          help='Snapshots de exportação completa: remove da base as issues ausentes deles')
+
+    exportar = sub.add_parser('exportar', help='Gera o snapshot JSON a partir da base')
+    exportar.add_argument('dataset', choices=list(DATASETS))
+    exportar.add_argument('--dias', type=int, help='Apenas itens criados nos últimos N dias')
+    exportar.add_argument('--saida', help='Arquivo de saída (padrão: o snapshot publicado)')
+
+    parser.add_argument('--db', default=CAMINHO_PADRAO, help='Arquivo SQLite (padrão: %(default)s)')
+    args = parser.parse_args()
+
+    banco = BancoIssues(args.db)
+    try:
+        if args.comando == 'importar':
+            for dataset in args.datasets or list(DATASETS):
+                if dataset not in DATASETS:
+                    parser.error(f'dataset desconhecido: {dataset}')
+                total, removidos = banco.importar_json(dataset, completo=args.completo)
+                print(f'✓ {total} {dataset} gravados em {args.db}')
+                if removidos:
+                    print(f'✓ {removidos} {dataset} excluídos ou movidos no Jira removidos da base')
+        else:
+            saida = args.saida or DATASETS[args.dataset]['arquivo']
+            payload = banco.exportar(args.dataset, args.dias)
+            if publicar_json(saida, payload, chave_lista=args.dataset):
+                print(f'✓ {payload["total"]} {args.dataset} exportados para {saida}')
+            else:
+                print(f'= Nenhuma alteração em {saida}')
+    except (OSError, ValueError) as e:
+        print(f'✗ {e}')
+        sys.exit(1)
+    finally:
+        banco.fechar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Central de Serviços - Open Finance Brasil
+
+Benchmarks offline: Jira/Confluence falso (jira_fake) e medição dos scripts
+e do api_proxy (executar). Veja `python -m benchmarks.executar --help`.
+"""
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks com o Jira/Confluence falso
+Central de Serviços - Open Finance Brasil
+
+Sobe o servidor de benchmarks/jira_fake.py e mede, sem acessar o Jira real:
+  - scripts de exportação (tempo de parede, mínimo/mediana/máximo de N
+    execuções, cada uma em diretório limpo): update_news.py, update_spaces.py,
+    sync_incidentes.py --completo, sync_mudancas.py e a exportação consolidada
+    (python -m central_servicos export)
+  - api_proxy.py: vazão (req/s), latência p50/p90/p99 e tamanho da resposta
+    de /api/tickets (em cada formato), /api/validate e /api/incidentes sob N
+    clientes concorrentes
+
+Uso:
+    python -m benchmarks.executar --saida base.json
+    python -m benchmarks.executar --baseline base.json --latencia-ms 50 --taxa-429 0.02
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import threading
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.jira_fake import ServidorFake, adicionar_argumentos, configuracao_de
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    'update_news': ['update_news.py'],
+    'update_spaces': ['update_spaces.py'],
+    'sync_incidentes': ['sync_incidentes.py', '--completo'],
+    'sync_mudancas': ['sync_mudancas.py'],
+    'export_consolidado': ['-m', 'central_servicos', 'export', '--datasets', 'incidentes,mudancas,news', '--completo'],
+}
+
+ENDPOINTS_PROXY = {
+    'tickets': ('POST', '/api/tickets', {'email': 'bench@example.com', 'token': 'x', 'project': 'OFBI'}),
+    'tickets_compacto': ('POST', '/api/tickets', {'email': 'bench@example.com', 'token': 'x', 'project': 'OFBI',
+                                                  'formato': 'compacto'}),
+    'tickets_jira': ('POST', '/api/tickets', {'email': 'bench@example.com', 'token': 'x', 'project': 'OFBI',
+                                              'formato': 'jira'}),
+    'validate': ('POST', '/api/validate', {'email': 'bench@example.com', 'token': 'x'}),
+    'incidentes_busca': ('GET', '/api/incidentes?q=portal&limite=50', None),
+    'incidentes_pagina': ('GET', '/api/incidentes?status=Aberto&limite=100', None),
+}
+
+
+def percentil(valores, p):
+    """Percentil por posição mais próxima (valores já ordenados)."""
+    if not valores:
+        return None
+    indice = max(0, min(len(valores) - 1, round(p / 100 * len(valores) + 0.5) - 1))
+    return valores[indice]
+
+
+def ambiente_scripts(servidor):
+    env = dict(os.environ)
+    env.update({
+        'JIRA_URL': servidor.url,
+        'JIRA_EMAIL': 'bench@example.com',
+        'JIRA_API_TOKEN': 'x',
+        'PYTHONPATH': RAIZ + os.pathsep + env.get('PYTHONPATH', ''),
+    })
+    return env
+
+
+def medir_script(nome, servidor, repeticoes, diretorio_dados=None):
+    """Executa o script `repeticoes` vezes, cada uma em diretório limpo."""
+    comando = SCRIPTS[nome]
+    if comando[0] != '-m':
+        comando = [os.path.join(RAIZ, comando[0])] + comando[1:]
+    tempos = []
+    for _ in range(repeticoes):
+        with tempfile.TemporaryDirectory(prefix=f'bench-{nome}-') as diretorio:
+            inicio = time.perf_counter()
+            resultado = subprocess.run([sys.executable] + comando, cwd=diretorio, env=ambiente_scripts(servidor),
+                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            tempos.append(time.perf_counter() - inicio)
+            if resultado.returncode != 0:
+                raise RuntimeError(f'{nome} falhou ({resultado.returncode}):\n{resultado.stdout[-2000:]}')
+            if diretorio_dados is not None:
+                for arquivo in ('dados-incidentes.json', 'dados-mudancas.json'):
+                    if os.path.exists(os.path.join(diretorio, arquivo)):
+                        shutil.copy(os.path.join(diretorio, arquivo), diretorio_dados)
+    return {
+        'min_s': round(min(tempos), 4),
+        'mediana_s': round(statistics.median(tempos), 4),
+        'max_s': round(max(tempos), 4),
+        'execucoes': len(tempos),
+    }
+
+
+def iniciar_proxy(servidor, diretorio_dados):
+    """Sobe o api_proxy (servidor threaded do werkzeug) apontando para o Jira falso."""
+    os.environ['JIRA_URL'] = servidor.url
+    os.environ['DADOS_DIR'] = diretorio_dados
+    sys.path.insert(0, RAIZ)
+    import api_proxy
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class HandlerSilencioso(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    httpd = make_server('127.0.0.1', 0, api_proxy.app, threaded=True, request_handler=HandlerSilencioso)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f'http://127.0.0.1:{httpd.server_port}'
+
+
+def medir_endpoint(base, metodo, caminho, corpo, requisicoes, concorrencia):
+    local = threading.local()
+
+    def uma(_):
+        sessao = getattr(local, 'sessao', None)
+        if sessao is None:
+            sessao = local.sessao = requests.Session()
+        inicio = time.perf_counter()
+        tamanho = 0
+        try:
+            resposta = sessao.request(metodo, base + caminho, json=corpo, timeout=60)
+            tamanho = len(resposta.content)
+            ok = resposta.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - inicio, ok, tamanho
+
+    # Aquecimento: preenche caches e índices antes de medir
+    uma(None)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(uma, range(requisicoes)))
+    duracao = time.perf_counter() - inicio
+
+    latencias = sorted(t * 1000 for t, _, _ in resultados)
+    return {
+        'req_s': round(requisicoes / duracao, 1),
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p90_ms': round(percentil(latencias, 90), 2),
+        'p99_ms': round(percentil(latencias, 99), 2),
+        'kb_resposta': round(max(tamanho for _, _, tamanho in resultados) / 1024, 1),
+        'erros': sum(1 for _, ok, _ in resultados if not ok),
+    }
+
+
+def comparar(resultados, baseline):
+    """Imprime a variação de cada métrica em relação à baseline."""
+    print('\n=== Comparação com a baseline ===')
+    for grupo in ('scripts', 'proxy'):
+        for nome, metricas in resultados.get(grupo, {}).items():
+            anteriores = baseline.get(grupo, {}).get(nome)
+            if not anteriores:
+                continue
+            partes = []
+            for metrica, valor in metricas.items():
+                if metrica == 'execucoes':
+                    continue
+                anterior = anteriores.get(metrica)
+                if isinstance(valor, (int, float)) and isinstance(anterior, (int, float)) and anterior:
+                    partes.append(f'{metrica} {anterior} -> {valor} ({(valor - anterior) / anterior * 100:+.1f}%)')
+            print(f'{grupo}/{nome}: ' + '; '.join(partes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks com Jira/Confluence falso')
+    adicionar_argumentos(parser)
+    parser.add_argument('--repeticoes', type=int, default=3, help='Execuções por script')
+    parser.add_argument('--requisicoes', type=int, default=500, help='Requisições por endpoint do proxy')
+    parser.add_argument('--concorrencia', type=int, default=16, help='Clientes simultâneos no proxy')
+    parser.add_argument('--scripts', default=','.join(SCRIPTS), help='Scripts a medir (vazio: nenhum)')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS_PROXY), help='Endpoints do proxy (vazio: nenhum)')
+    parser.add_argument('--saida', help='Grava os resultados em JSON')
+    parser.add_argument('--baseline', help='Resultados anteriores (JSON) para comparação')
+    args = parser.parse_args()
+
+    # load_dotenv(override=True) nos scripts sobrescreveria JIRA_URL com o Jira real
+    if os.path.exists(os.path.join(RAIZ, '.env')):
+        print('✗ Existe um .env na raiz do repositório; renomeie-o antes de rodar os benchmarks.')
+        sys.exit(1)
+
+    scripts = [s for s in args.scripts.split(',') if s]
+    endpoints = [e for e in args.endpoints.split(',') if e]
+    invalidos = [s for s in scripts if s not in SCRIPTS] + [e for e in endpoints if e not in ENDPOINTS_PROXY]
+    if invalidos:
+        parser.error(f'desconhecidos: {", ".join(invalidos)}')
+
+    servidor = ServidorFake(configuracao_de(args)).iniciar()
+    print(f'✓ Jira falso em {servidor.url} ({len(servidor.issues)} issues, {len(servidor.espacos)} espaços)')
+
+    resultados = {
+        'config': {k: v for k, v in vars(args).items() if k not in ('saida', 'baseline')},
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+        'scripts': {},
+        'proxy': {},
+    }
+
+    diretorio_dados = tempfile.mkdtemp(prefix='bench-dados-')
+    try:
+        for nome in scripts:
+            resultados['scripts'][nome] = medir_script(nome, servidor, args.repeticoes, diretorio_dados)
+            print(f'{nome}: {resultados["scripts"][nome]}')
+
+        if endpoints:
+            if not os.path.exists(os.path.join(diretorio_dados, 'dados-incidentes.json')):
+                medir_script('sync_incidentes', servidor, 1, diretorio_dados)
+            httpd, base = iniciar_proxy(servidor, diretorio_dados)
+            try:
+                for nome in endpoints:
+                    metodo, caminho, corpo = ENDPOINTS_PROXY[nome]
+                    resultados['proxy'][nome] = medir_endpoint(base, metodo, caminho, corpo,
+                                                               args.requisicoes, args.concorrencia)
+                    print(f'proxy {nome}: {resultados["proxy"][nome]}')
+            finally:
+                httpd.shutdown()
+    finally:
+        servidor.parar()
+        shutil.rmtree(diretorio_dados, ignore_errors=True)
+
+    resultados['jira_fake'] = {'requisicoes': servidor.requisicoes, 'respostas_429': servidor.respostas_429}
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f'✓ Resultados salvos em {args.saida}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            comparar(resultados, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
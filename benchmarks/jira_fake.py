@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Jira/Confluence falso para benchmarks
+Central de Serviços - Open Finance Brasil
+
+Servidor HTTP local com os endpoints usados pelos scripts e pelos servidores:
+  - /rest/api/3/search          (startAt/maxResults, legado)
+  - /rest/api/3/search/jql      (GET ou POST, paginação por nextPageToken)
+  - /rest/api/3/myself          (401 sem Basic auth ou com email "invalido...")
+  - /wiki/rest/api/space        (start/limit, _links.next)
+  - /wiki/rest/api/content/search (CQL por espaço, lote de espaços, label
+                                   "portal-news" ou todos os espaços globais)
+
+Os dados são gerados de forma determinística (semente fixa). Latência por
+requisição, tamanho máximo de página, volume e taxa de respostas 429 são
+configuráveis, para medir os scripts sem acessar openfinancebrasil.atlassian.net.
+
+Uso avulso:
+    python -m benchmarks.jira_fake --porta 8089 --incidentes 5000 --latencia-ms 50
+    JIRA_URL=http://127.0.0.1:8089 python update_news.py
+"""
+import re
+import json
+import base64
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+FUSO = timezone(timedelta(hours=-3))
+
+# Issues criadas ao longo do último ano (datas fixas dentro do mesmo dia)
+DIAS_HISTORICO = 365
+
+STATUS_INCIDENTE = [('Aberto', 'new'), ('Em Andamento', 'indeterminate'), ('Monitorando', 'indeterminate'),
+                    ('Resolvido', 'done'), ('Fechado', 'done')]
+STATUS_MUDANCA = [('Aguardando Aprovação', 'new'), ('Em progresso', 'indeterminate'),
+                  ('Concluído com Sucesso', 'done'), ('Concluído com Falha', 'done'), ('Cancelado', 'done')]
+PRIORIDADES = ['Highest', 'High', 'Medium', 'Low']
+SISTEMAS = ['Diretório', 'Portal', 'Motor de Conformidade', 'Service Desk', 'AWS', 'Plataforma de Dados']
+TIMES = ['Arquitetura', 'Segurança', 'Integração Digital', 'Infraestrutura', 'Sustentação']
+CATEGORIAS = ['Normal', 'Planejada', 'Emergencial']
+
+
+class Configuracao:
+    """Parâmetros do servidor falso."""
+
+    def __init__(self, incidentes=2000, mudancas=500, espacos=40, conteudos_por_espaco=5,
+                 latencia_ms=0, max_pagina=100, taxa_429=0.0, retry_after=0, semente=42):
+        self.incidentes = incidentes
+        self.mudancas = mudancas
+        self.espacos = espacos
+        self.conteudos_por_espaco = conteudos_por_espaco
+        self.latencia_ms = latencia_ms
+        self.max_pagina = max_pagina
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.semente = semente
+
+
+def _data_jira(data):
+    return data.strftime('%Y-%m-%dT%H:%M:%S.') + f'{data.microsecond // 1000:03d}' + data.strftime('%z')
+
+
+def _data_confluence(data):
+    return data.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f'{data.microsecond // 1000:03d}Z'
+
+
+def _inicio_historico():
+    hoje = datetime.now(FUSO).replace(hour=0, minute=0, second=0, microsecond=0)
+    return hoje - timedelta(days=DIAS_HISTORICO)
+
+
+def _usuario(nome):
+    """Usuário como a API devolve (avatares em quatro tamanhos e link `self`)."""
+    conta = base64.b32encode(nome.encode('utf-8')).decode('ascii').rstrip('=').lower()[:24]
+    avatar = f'https://avatar-management.example.com/{conta}'
+    return {
+        'self': f'https://example.atlassian.net/rest/api/3/user?accountId={conta}',
+        'accountId': conta,
+        'displayName': nome,
+        'avatarUrls': {tamanho: f'{avatar}/{tamanho}' for tamanho in ('48x48', '24x24', '16x16', '32x32')},
+        'active': True,
+        'timeZone': 'America/Sao_Paulo',
+        'accountType': 'atlassian',
+    }
+
+
+def _descricao(numero, tipo):
+    """Descrição em ADF com alguns parágrafos, lista e menção (sem sorteios: não altera a sequência)."""
+    def paragrafo(texto):
+        return {'type': 'paragraph', 'content': [{'type': 'text', 'text': texto}]}
+    return {'type': 'doc', 'version': 1, 'content': [
+        paragrafo(f'Descrição da issue {numero}.'),
+        paragrafo(f'{tipo} registrado pela Central de Serviços. Ambiente de produção afetado; '
+                  'participantes notificados conforme o processo de gestão.'),
+        {'type': 'bulletList', 'content': [
+            {'type': 'listItem', 'content': [paragrafo(f'Passo {passo}: verificação e registro da evidência.')]}
+            for passo in range(1, 4)
+        ]},
+        {'type': 'paragraph', 'content': [
+            {'type': 'text', 'text': 'Responsável: '},
+            {'type': 'mention', 'attrs': {'id': f'conta-{numero}', 'text': '@Central de Serviços'}},
+        ]},
+    ]}
+
+
+def gerar_issues(config):
+    """Incidentes e mudanças em ordem de criação decrescente."""
+    rnd = random.Random(config.semente)
+    inicio = _inicio_historico()
+    issues = []
+    total = config.incidentes + config.mudancas
+    tipos = ['[System] Incidente'] * config.incidentes + ['[System] Mudança'] * config.mudancas
+    rnd.shuffle(tipos)
+    for numero, tipo in enumerate(tipos, start=1):
+        criado = inicio + timedelta(minutes=numero * DIAS_HISTORICO * 24 * 60 // max(total, 1),
+                                    seconds=rnd.randint(0, 59))
+        atualizado = criado + timedelta(hours=rnd.randint(0, 72))
+        incidente = tipo.endswith('Incidente')
+        status, categoria = rnd.choice(STATUS_INCIDENTE if incidente else STATUS_MUDANCA)
+        fields = {
+            'issuetype': {'self': 'https://example.atlassian.net/rest/api/3/issuetype/10001', 'name': tipo,
+                          'iconUrl': 'https://example.atlassian.net/images/icons/issuetypes/incident.svg'},
+            'summary': f'{"Indisponibilidade" if incidente else "Atualização"} {rnd.choice(SISTEMAS)} #{numero}',
+            'status': {'name': status, 'statusCategory': {'key': categoria}},
+            'priority': {'name': rnd.choice(PRIORIDADES),
+                         'iconUrl': 'https://example.atlassian.net/images/icons/priorities/medium.svg'},
+            'assignee': _usuario(rnd.choice(TIMES)),
+            'reporter': _usuario(f'Pessoa {rnd.randint(1, 50)}'),
+            'created': _data_jira(criado),
+            'updated': _data_jira(atualizado),
+            'labels': [],
+            'description': _descricao(numero, 'Incidente' if incidente else 'Mudança'),
+        }
+        if incidente:
+            breached = rnd.random() < 0.2
+            fields.update({
+                'resolutiondate': _data_jira(atualizado) if categoria == 'done' else None,
+                'customfield_10238': {'value': rnd.choice(SISTEMAS)},
+                'customfield_10248': {'value': rnd.choice(['Alto', 'Médio', 'Baixo'])},
+                'customfield_10096': {'completedCycles': [{
+                    'breached': breached,
+                    'breachTime': {'jira': _data_jira(criado + timedelta(hours=8))},
+                    'elapsedTime': {'friendly': f'{rnd.randint(1, 20)}h'},
+                }]},
+            })
+        else:
+            fields.update({
+                'customfield_11073': rnd.random() < 0.05,
+                'customfield_11106': {'value': rnd.choice(CATEGORIAS)},
+            })
+        issues.append({'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields',
+                       'id': str(10000 + numero), 'self': f'https://example.atlassian.net/rest/api/3/issue/{10000 + numero}',
+                       'key': f'OFBI-{numero}', 'fields': fields})
+    issues.reverse()
+    return issues
+
+
+def gerar_confluence(config):
+    """Espaços globais e conteúdos (mais recentes primeiro)."""
+    rnd = random.Random(config.semente + 1)
+    inicio = _inicio_historico()
+    espacos = [{
+        'id': 1000 + i,
+        'key': f'ESP{i}',
+        'name': f'Espaço {i}',
+        'type': 'global',
+        'description': {'plain': {'value': f'Descrição do espaço {i}'}},
+        'icon': {'path': f'/images/logo/default-space-logo-{i}.png'},
+        '_links': {'webui': f'/spaces/ESP{i}'},
+    } for i in range(config.espacos)]
+
+    conteudos = []
+    for espaco in espacos:
+        for j in range(config.conteudos_por_espaco):
+            modificado = inicio + timedelta(hours=rnd.randint(0, 24 * DIAS_HISTORICO))
+            conteudos.append({
+                'id': str(len(conteudos) + 1),
+                'type': 'page',
+                'title': f'Página {j} de {espaco["name"]}',
+                'space': {'key': espaco['key']},
+                'version': {'when': _data_confluence(modificado)},
+                'history': {'createdDate': _data_confluence(modificado - timedelta(days=1))},
+                'labels': ['portal-news'] if rnd.random() < 0.05 else [],
+                '_links': {'webui': f'/spaces/{espaco["key"]}/pages/{len(conteudos) + 1}'},
+            })
+    conteudos.sort(key=lambda c: c['version']['when'], reverse=True)
+    return espacos, conteudos
+
+
+class ServidorFake:
+    """Servidor em thread própria; `url` é a base a usar como JIRA_URL."""
+
+    def __init__(self, config=None, host='127.0.0.1', porta=0):
+        self.config = config or Configuracao()
+        self.issues = gerar_issues(self.config)
+        self.espacos, self.conteudos = gerar_confluence(self.config)
+        self.requisicoes = 0
+        self.respostas_429 = 0
+        self._lock = threading.Lock()
+        self._rnd = random.Random(self.config.semente + 2)
+        self.httpd = ThreadingHTTPServer((host, porta), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self.httpd.server_address[:2]
+        return f'http://{host}:{porta}'
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _sortear_429(self):
+        with self._lock:
+            self.requisicoes += 1
+            if self.config.taxa_429 and self._rnd.random() < self.config.taxa_429:
+                self.respostas_429 += 1
+                return True
+        return False
+
+    # --- Jira -------------------------------------------------------------
+
+    def _filtrar_jql(self, jql):
+        """Só distingue os tipos de issue citados na JQL (o resto é ignorado)."""
+        jql = jql or ''
+        incidentes = 'Incidente' in jql
+        mudancas = 'Mudança' in jql or 'Change' in jql
+        if not incidentes and not mudancas:
+            return self.issues
+        tipos = set()
+        if incidentes:
+            tipos.add('[System] Incidente')
+        if mudancas:
+            tipos.add('[System] Mudança')
+        return [i for i in self.issues if i['fields']['issuetype']['name'] in tipos]
+
+    def _tamanho_pagina(self, pedido):
+        try:
+            pedido = int(pedido)
+        except (TypeError, ValueError):
+            pedido = 50
+        return max(1, min(pedido, self.config.max_pagina))
+
+    def busca_legada(self, params):
+        issues = self._filtrar_jql(params.get('jql'))
+        inicio = int(params.get('startAt') or 0)
+        tamanho = self._tamanho_pagina(params.get('maxResults'))
+        return 200, {'startAt': inicio, 'maxResults': tamanho, 'total': len(issues),
+                     'issues': issues[inicio:inicio + tamanho]}
+
+    def busca_jql(self, params):
+        issues = self._filtrar_jql(params.get('jql'))
+        inicio = int(params.get('nextPageToken') or 0)
+        tamanho = self._tamanho_pagina(params.get('maxResults'))
+        fim = inicio + tamanho
+        resposta = {'issues': issues[inicio:fim], 'isLast': fim >= len(issues)}
+        if fim < len(issues):
+            resposta['nextPageToken'] = str(fim)
+        return 200, resposta
+
+    def myself(self, headers):
+        autorizacao = headers.get('Authorization') or ''
+        if not autorizacao.startswith('Basic '):
+            return 401, {'errorMessages': ['Unauthorized']}
+        email = base64.b64decode(autorizacao[6:]).decode('utf-8', 'replace').split(':', 1)[0]
+        if email.startswith('invalido'):
+            return 401, {'errorMessages': ['Unauthorized']}
+        return 200, {'accountId': '1', 'emailAddress': email, 'displayName': email.split('@')[0],
+                     'avatarUrls': {'48x48': ''}}
+
+    # --- Confluence -------------------------------------------------------
+
+    def listar_espacos(self, params, base):
+        inicio = int(params.get('start') or 0)
+        tamanho = self._tamanho_pagina(params.get('limit') or 25)
+        pagina = self.espacos[inicio:inicio + tamanho]
+        links = {'base': base}
+        if inicio + tamanho < len(self.espacos):
+            links['next'] = f'/rest/api/space?{urlencode({"start": inicio + tamanho, "limit": tamanho})}'
+        return 200, {'results': pagina, 'start': inicio, 'limit': tamanho, 'size': len(pagina), '_links': links}
+
+    def buscar_conteudo(self, params, base):
+        cql = params.get('cql') or ''
+        if 'label' in cql:
+            conteudos = [c for c in self.conteudos if 'portal-news' in c['labels']]
+        elif 'space in' in cql or 'space =' in cql:
+            chaves = set(re.findall(r'"([^"]+)"', cql.split('AND')[0]))
+            conteudos = [c for c in self.conteudos if c['space']['key'] in chaves]
+        else:
+            conteudos = self.conteudos
+        inicio = int(params.get('start') or 0)
+        tamanho = self._tamanho_pagina(params.get('limit') or 25)
+        pagina = conteudos[inicio:inicio + tamanho]
+        links = {'base': base}
+        if inicio + tamanho < len(conteudos):
+            links['next'] = f'/rest/api/content/search?{urlencode({"cql": cql, "start": inicio + tamanho, "limit": tamanho})}'
+        return 200, {'results': pagina, 'start': inicio, 'limit': tamanho, 'size': len(pagina), '_links': links}
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status, corpo, headers=None):
+                dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                for nome, valor in (headers or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _atender(self, corpo=None):
+                if servidor.config.latencia_ms:
+                    time.sleep(servidor.config.latencia_ms / 1000)
+                partes = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+                if isinstance(corpo, dict):
+                    params.update({k: v for k, v in corpo.items() if not isinstance(v, (list, dict))})
+
+                if servidor._sortear_429():
+                    self._responder(429, {'errorMessages': ['Rate limit exceeded']},
+                                    {'Retry-After': str(servidor.config.retry_after)})
+                    return
+
+                caminho = partes.path.rstrip('/')
+                base = f'http://{self.headers.get("Host")}/wiki'
+                if caminho == '/rest/api/3/search/jql':
+                    status, resposta = servidor.busca_jql(params)
+                elif caminho == '/rest/api/3/search':
+                    status, resposta = servidor.busca_legada(params)
+                elif caminho == '/rest/api/3/myself':
+                    status, resposta = servidor.myself(self.headers)
+                elif caminho == '/wiki/rest/api/space':
+                    status, resposta = servidor.listar_espacos(params, base)
+                elif caminho == '/wiki/rest/api/content/search':
+                    status, resposta = servidor.buscar_conteudo(params, base)
+                else:
+                    status, resposta = 404, {'errorMessages': [f'Não implementado: {caminho}']}
+                self._responder(status, resposta)
+
+            def do_GET(self):
+                self._atender()
+
+            def do_POST(self):
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                try:
+                    corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                except ValueError:
+                    corpo = {}
+                self._atender(corpo)
+
+        return Handler
+
+
+def adicionar_argumentos(parser):
+    """Opções de Configuracao (compartilhadas com benchmarks.executar)."""
+    parser.add_argument('--incidentes', type=int, default=2000)
+    parser.add_argument('--mudancas', type=int, default=500)
+    parser.add_argument('--espacos', type=int, default=40)
+    parser.add_argument('--conteudos-por-espaco', type=int, default=5)
+    parser.add_argument('--latencia-ms', type=float, default=0, help='Latência por requisição (ms)')
+    parser.add_argument('--max-pagina', type=int, default=100, help='Máximo de itens por página')
+    parser.add_argument('--taxa-429', type=float, default=0.0, help='Fração de respostas 429 (0 a 1)')
+    parser.add_argument('--retry-after', type=int, default=0, help='Valor do Retry-After nas respostas 429')
+    parser.add_argument('--semente', type=int, default=42)
+
+
+def configuracao_de(args):
+    return Configuracao(args.incidentes, args.mudancas, args.espacos, args.conteudos_por_espaco,
+                        args.latencia_ms, args.max_pagina, args.taxa_429, args.retry_after, args.semente)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Jira/Confluence falso para benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8089)
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    servidor = ServidorFake(configuracao_de(args), args.host, args.porta)
+    print(f'✓ Jira falso em {servidor.url} ({len(servidor.issues)} issues, {len(servidor.espacos)} espaços)')
+    try:
+        servidor.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em memória com TTL, despejo LRU e coalescência de requisições
+Central de Serviços - Open Finance Brasil
+"""
+import time
+import threading
+from collections import OrderedDict
+
+
+class _Voo:
+    """Chamada em andamento compartilhada pelas requisições idênticas (single-flight)."""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.erro = None
+
+
+class CacheTTL:
+    """
+    Cache thread-safe limitado a `max_itens` entradas, cada uma válida por
+    `ttl` segundos. Ao estourar o limite, descarta a entrada menos usada.
+    """
+
+    def __init__(self, ttl, max_itens):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self.acertos = 0
+        self.falhas = 0
+        self._dados = OrderedDict()
+        self._em_voo = {}
+        self._lock = threading.Lock()
+
+    def _ler(self, chave, agora):
+        # Deve ser chamado com o lock adquirido
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        expira_em, valor = item
+        if expira_em <= agora:
+            del self._dados[chave]
+            return None
+        self._dados.move_to_end(chave)
+        return item
+
+    def get(self, chave):
+        """Valor armazenado para `chave`, ou None se ausente/expirado."""
+        with self._lock:
+            item = self._ler(chave, time.monotonic())
+            if item is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            return item[1]
+
+    def consultar(self, chave):
+        """Como `get`, mas sem contar acerto/falha (checagens auxiliares)."""
+        with self._lock:
+            item = self._ler(chave, time.monotonic())
+            return None if item is None else item[1]
+
+    def set(self, chave, valor, ttl=None):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def invalidar(self, chave=None):
+        """Remove uma entrada, ou todas se `chave` for None."""
+        with self._lock:
+            if chave is None:
+                self._dados.clear()
+            else:
+                self._dados.pop(chave, None)
+
+    def invalidar_se(self, predicado):
+        """Remove as entradas cuja chave satisfaz `predicado(chave)`; retorna quantas."""
+        with self._lock:
+            chaves = [chave for chave in self._dados if predicado(chave)]
+            for chave in chaves:
+                del self._dados[chave]
+            return len(chaves)
+
+    def obter_ou_calcular(self, chave, funcao, armazenar=None, ttl_para=None):
+        """
+        Retorna o valor em cache ou executa `funcao()`. Requisições simultâneas
+        para a mesma chave aguardam a primeira chamada e recebem o mesmo
+        resultado, de modo que só uma chamada chega ao upstream.
+        `armazenar(valor)` decide se o resultado entra no cache (padrão: sempre)
+        e `ttl_para(valor)` permite um TTL próprio (None usa o padrão).
+        """
+        with self._lock:
+            item = self._ler(chave, time.monotonic())
+            if item is not None:
+                self.acertos += 1
+                return item[1]
+            self.falhas += 1
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = _Voo()
+
+        if not lider:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.valor
+
+        try:
+            voo.valor = funcao()
+            if armazenar is None or armazenar(voo.valor):
+                self.set(chave, voo.valor, ttl_para(voo.valor) if ttl_para else None)
+            return voo.valor
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._em_voo[chave]
+            voo.evento.set()
+
+    def __len__(self):
+        return len(self._dados)
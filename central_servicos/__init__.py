@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Central de Serviços - Open Finance Brasil
+
+Linha de comando das exportações do Jira para o GitHub Pages:
+
+    python -m central_servicos export --datasets incidentes,mudancas,news
+
+Os scripts da raiz (sync_incidentes.py, sync_mudancas.py, update_news.py)
+continuam funcionando isoladamente; o pacote reaproveita a normalização deles.
+"""
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Central de Serviços - Open Finance Brasil
+
+Uso:
+    python -m central_servicos export --datasets incidentes,mudancas,news [--completo]
+"""
+import os
+import sys
+import argparse
+
+from requests.auth import HTTPBasicAuth
+
+import jira_client
+from central_servicos.exportacao import ESCRITORES, exportar
+
+# Carregar variáveis de ambiente (localmente usa .env, no GitHub Actions usa Secrets)
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m central_servicos', description='Central de Serviços')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    export = sub.add_parser('export', help='Exporta os datasets do Jira em uma única busca')
+    export.add_argument('--datasets', default=','.join(ESCRITORES),
+                        help='Lista separada por vírgula (padrão: %(default)s)')
+    export.add_argument('--completo', action='store_true',
+                        help='Incidentes: ignora a marca d\'água e refaz a busca completa')
+    args = parser.parse_args()
+
+    datasets = [d.strip() for d in args.datasets.split(',') if d.strip()]
+    desconhecidos = [d for d in datasets if d not in ESCRITORES]
+    if not datasets or desconhecidos:
+        parser.error(f'datasets inválidos: {", ".join(desconhecidos) or "(nenhum)"}')
+
+    jira_url = os.getenv('JIRA_URL')
+    jira_email = os.getenv('JIRA_EMAIL')
+    jira_token = os.getenv('JIRA_API_TOKEN')
+
+    if not jira_url or not jira_email or not jira_token:
+        print('Erro: Credenciais do Jira não configuradas.')
+        sys.exit(1)
+
+    print(f'Exportando {", ".join(datasets)} do Jira...')
+    try:
+        exportar(jira_url, HTTPBasicAuth(jira_email, jira_token), datasets, args.completo)
+    except jira_client.ErroJira as e:
+        print(f'✗ {e}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação consolidada do Jira
+Central de Serviços - Open Finance Brasil
+
+Incidentes, mudanças e o feed de notícias vêm do mesmo projeto (OFBI). Em vez
+de uma busca completa por dataset, monta uma única JQL com a união dos filtros
+e dos campos de cada um e distribui as issues de cada página para os escritores
+dos datasets, que filtram o que lhes interessa. Como a JQL ordena por created
+DESC, incidentes (na busca completa) e mudanças são gravados em stream,
+página a página; a publicação acontece no final.
+"""
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+import jira_client
+import sync_incidentes
+import sync_mudancas
+import update_news
+
+PROJETO = 'OFBI'
+
+
+def _nome_tipo(issue):
+    return ((issue.get('fields') or {}).get('issuetype') or {}).get('name')
+
+
+class EscritorIncidentes:
+    """
+    dados-incidentes.json: incremental pela marca d'água ou completo.
+
+    Todos os escritores recebem (caminho, completo) e expõem nome, campos,
+    filtro(), consumir(issue), finalizar() e abortar().
+    """
+
+    nome = 'incidentes'
+    campos = sync_incidentes.CAMPOS
+
+    def __init__(self, caminho=sync_incidentes.ARQUIVO_SAIDA, completo=False):
+        self.caminho = caminho
+        self.marca_dagua = sync_incidentes.preparar(caminho, completo)
+        self.alterados = []
+        # Busca completa: grava direto; incremental: mescla no snapshot ao final
+        self.publicacao = sync_incidentes.nova_publicacao(caminho) if self.marca_dagua is None else None
+
+    def filtro(self):
+        if self.marca_dagua is None:
+            return sync_incidentes.FILTRO_TIPOS
+        return f'{sync_incidentes.FILTRO_TIPOS} AND {sync_incidentes.filtro_janela(self.marca_dagua)}'
+
+    def consumir(self, issue):
+        # Só incidentes chegam pela cláusula deste escritor; o tipo basta
+        if _nome_tipo(issue) not in sync_incidentes.TIPOS_INCIDENTE:
+            return
+        incidente = sync_incidentes.normalizar_incidente(issue)
+        if self.publicacao is not None:
+            self.publicacao.escrever(incidente)
+        else:
+            self.alterados.append(incidente)
+
+    def finalizar(self):
+        if self.publicacao is not None:
+            publicado, total = self.publicacao.concluir(), self.publicacao.total
+        else:
+            publicado, total = sync_incidentes.publicar(self.caminho, self.alterados, self.marca_dagua)
+        if publicado:
+            print(f'✓ {total} incidentes exportados para {self.caminho}')
+        else:
+            print(f'= Nenhuma alteração nos {total} incidentes')
+
+    def abortar(self):
+        if self.publicacao is not None:
+            self.publicacao.descartar()
+
+
+class EscritorMudancas:
+    """dados-mudancas.json: mudanças criadas ou atualizadas na janela (sempre completa)."""
+
+    nome = 'mudancas'
+    campos = sync_mudancas.CAMPOS
+
+    def __init__(self, caminho=sync_mudancas.ARQUIVO_SAIDA, completo=False):
+        self.caminho = caminho
+        self.publicacao = sync_mudancas.nova_publicacao(caminho)
+
+    def filtro(self):
+        return sync_mudancas.FILTRO
+
+    def consumir(self, issue):
+        if _nome_tipo(issue) not in sync_mudancas.TIPOS_MUDANCA:
+            return
+        mudanca = sync_mudancas.normalizar_mudanca(issue)
+        # Mudanças abertas antigas podem vir pela cláusula do feed
+        if sync_mudancas.na_janela(mudanca):
+            self.publicacao.escrever(mudanca)
+
+    def finalizar(self):
+        total = self.publicacao.total
+        if self.publicacao.concluir():
+            print(f'✓ {total} mudanças exportadas para {self.caminho}')
+        else:
+            print(f'= Nenhuma alteração nas {total} mudanças')
+
+    def abortar(self):
+        self.publicacao.descartar()
+
+
+class EscritorNews:
+    """news_data.json: mudanças em aberto mais recentes + comunicados do Confluence (sempre completo)."""
+
+    nome = 'news'
+    campos = update_news.CAMPOS_JIRA
+
+    def __init__(self, caminho='news_data.json', completo=False):
+        self.caminho = caminho
+        self.itens = []
+        # O Confluence não depende da busca no Jira: começa em paralelo
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._confluence = self._executor.submit(update_news.fetch_confluence_news)
+
+    def filtro(self):
+        return update_news.FILTRO_JIRA
+
+    def consumir(self, issue):
+        if not update_news.jira_news_aberta(issue):
+            return
+        item = update_news.jira_news_item(issue)
+        # Guarda só as MAX_ITEMS_JIRA mais recentes (heap mínimo por data)
+        entrada = (item['_dt'], issue.get('key') or '', item)
+        if len(self.itens) < update_news.MAX_ITEMS_JIRA:
+            heapq.heappush(self.itens, entrada)
+        elif entrada[:2] > self.itens[0][:2]:
+            heapq.heapreplace(self.itens, entrada)
+
+    def finalizar(self):
+        try:
+            confluence_items = self._confluence.result()
+        finally:
+            self._executor.shutdown()
+        jira_items = [item for _, _, item in sorted(self.itens, key=lambda e: e[:2], reverse=True)]
+        update_news.publicar_feed(jira_items, confluence_items, self.caminho)
+
+    def abortar(self):
+        self._executor.shutdown(wait=False)
+
+
+ESCRITORES = {
+    'incidentes': EscritorIncidentes,
+    'mudancas': EscritorMudancas,
+    'news': EscritorNews,
+}
+
+
+def montar_jql(escritores):
+    """JQL única: o projeto e a união (OR) dos filtros de cada escritor."""
+    filtros = ' OR '.join(f'({e.filtro()})' for e in escritores)
+    return f'project = {PROJETO} AND ({filtros}) ORDER BY created DESC'
+
+
+def unir_campos(escritores):
+    """União dos campos pedidos pelos escritores, na ordem em que aparecem."""
+    campos = ['issuetype']
+    for escritor in escritores:
+        campos.extend(c for c in escritor.campos if c not in campos)
+    return campos
+
+
+def exportar(jira_url, auth, datasets, completo=False):
+    """
+    Uma busca paginada para todos os `datasets`; cada página é entregue a
+    todos os escritores antes da próxima ser buscada.
+    """
+    escritores = [ESCRITORES[nome](completo=completo) for nome in datasets]
+    jql = montar_jql(escritores)
+    print(f'JQL: {jql}')
+
+    total = 0
+    try:
+        for pagina in jira_client.paginar_busca(jira_url, auth, jql, unir_campos(escritores)):
+            total += len(pagina)
+            for issue in pagina:
+                for escritor in escritores:
+                    escritor.consumir(issue)
+    except BaseException:
+        # Nenhum dataset é publicado pela metade
+        for escritor in escritores:
+            escritor.abortar()
+        raise
+    print(f'{total} issues lidas do Jira')
+
+    for escritor in escritores:
+        escritor.finalizar()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura incremental dos snapshots publicados
+Central de Serviços - Open Finance Brasil
+
+Os snapshots ({"ultima_atualizacao": ..., "incidentes": [...], "total": N})
+podem ter dezenas de milhares de issues. `iterar_itens` percorre a lista do
+arquivo lendo blocos de tamanho fixo e decodificando um item por vez, sem
+carregar o documento inteiro; quem só precisa do começo pode parar cedo.
+`iterar_ndjson` faz o mesmo para a variante .ndjson (um item por linha).
+"""
+import json
+
+TAMANHO_BLOCO = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_ESPACOS = ' \t\n\r'
+
+
+class _Leitor:
+    """Buffer sobre o arquivo com decodificação de um valor JSON por vez."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.fim = False
+
+    def _ler_mais(self):
+        bloco = self.f.read(TAMANHO_BLOCO)
+        if not bloco:
+            self.fim = True
+            return False
+        self.buffer = self.buffer[self.pos:] + bloco
+        self.pos = 0
+        return True
+
+    def proximo_caractere(self):
+        """Primeiro caractere significativo (sem consumir); '' no fim do arquivo."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _ESPACOS:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._ler_mais():
+                return ''
+
+    def consumir(self, esperado):
+        if self.proximo_caractere() != esperado:
+            raise ValueError(f'JSON inválido: esperado {esperado!r} na posição {self.pos}')
+        self.pos += 1
+
+    def valor(self):
+        """Decodifica o próximo valor JSON, lendo mais blocos se ele estiver incompleto."""
+        self.proximo_caractere()
+        while True:
+            try:
+                valor, fim = _decoder.raw_decode(self.buffer, self.pos)
+                # Um número no fim do buffer pode continuar no próximo bloco
+                if fim < len(self.buffer) or self.fim:
+                    self.pos = fim
+                    return valor
+            except ValueError:
+                if self.fim:
+                    raise
+            self._ler_mais()
+
+
+def iterar_itens(caminho, chave_lista, cabecalho=None):
+    """
+    Gera os itens da lista `chave_lista` do snapshot em `caminho`, um por vez.
+    Se `cabecalho` for um dict, recebe os demais campos do objeto: os que vêm
+    antes da lista já no primeiro item; os que vêm depois (ex.: 'total'), ao
+    fim da iteração.
+    Levanta OSError se o arquivo não existir e ValueError se estiver corrompido.
+    """
+    with open(caminho, 'r', encoding='utf-8') as f:
+        leitor = _Leitor(f)
+        leitor.consumir('{')
+        if leitor.proximo_caractere() == '}':
+            return
+        while True:
+            chave = leitor.valor()
+            leitor.consumir(':')
+            if chave == chave_lista:
+                leitor.consumir('[')
+                if leitor.proximo_caractere() == ']':
+                    leitor.consumir(']')
+                else:
+                    while True:
+                        yield leitor.valor()
+                        if leitor.proximo_caractere() == ']':
+                            leitor.consumir(']')
+                            break
+                        leitor.consumir(',')
+            else:
+                valor = leitor.valor()
+                if cabecalho is not None:
+                    cabecalho[chave] = valor
+            if leitor.proximo_caractere() == '}':
+                return
+            leitor.consumir(',')
+
+
+def iterar_ndjson(caminho):
+    """Gera os itens de um arquivo NDJSON (linhas vazias são ignoradas)."""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
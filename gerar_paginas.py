@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+Geração estática dos relatórios mensais
+Central de Serviços - Open Finance Brasil
+
+Renderiza, a partir dos dados das issues, as páginas mensais de incidentes e
+de mudanças (GMUDs) e os comparativos entre meses. Todas as páginas mensais
+usam o mesmo modelo (templates/relatorio_mes.html).
+
+A geração é incremental: cada página tem um hash das issues do mês (mais o
+modelo) registrado em relatorios/paginas.manifest.json, e só é regravada
+quando esse hash muda. Páginas de meses fechados ficam estáveis (mesmos
+bytes, mesmo ETag no GitHub Pages).
+
+Fonte dos dados: a base local (banco_issues.db) se existir; senão os
+snapshots dados-incidentes.json / dados-mudancas.json. Um mês só é gerado se
+a fonte cobre todo ele (`cobertura`): da issue mais antiga ou do início da
+janela do snapshot (mudanças: 90 dias) até a última atualização. Meses fora
+disso mantêm a página já publicada; os anteriores à geração continuam nas
+páginas mantidas à mão (dashboard_<mês>.html, gmuds_<mês>.html), ligadas
+pelos comparativos.
+
+Uso:
+    python gerar_paginas.py                     # incidentes e mudanças
+    python gerar_paginas.py mudancas --todas    # ignora o manifesto
+"""
+import os
+import sys
+import json
+import argparse
+from html import escape
+from string import Template
+from datetime import datetime, timedelta, timezone
+
+from sync_incidentes import parse_data_jira
+from fluxo_json import iterar_itens
+from publicacao import hash_conteudo, escrever_atomico
+from agregar_dados import mes, horas_resolucao, media, STATUS_CONCLUIDOS, STATUS_CANCELADOS
+from banco_issues import BancoIssues, CAMINHO_PADRAO as BANCO_PADRAO, DATASETS as DATASETS_BANCO, data_atualizacao
+
+DIRETORIO_SAIDA = 'relatorios'
+DIRETORIO_MODELOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+MANIFESTO = 'paginas.manifest.json'
+
+# Primeiro mês publicado e quantos meses entram nos comparativos
+MES_INICIAL = os.environ.get('RELATORIOS_MES_INICIAL', '2026-05')
+MESES_COMPARATIVO = int(os.environ.get('RELATORIOS_MESES_COMPARATIVO', '6'))
+
+JIRA_URL = os.environ.get('JIRA_URL', 'https://openfinancebrasil.atlassian.net').rstrip('/')
+FUSO = timezone(timedelta(hours=-3))
+
+# Incrementar quando a renderização mudar, para regerar todas as páginas
+VERSAO = 1
+
+NOMES_MESES = ('Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+               'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro')
+
+SEVERIDADES = {
+    'Highest': ('CRÍTICO', 'badge-high'),
+    'High': ('ALTO', 'badge-high'),
+    'Medium': ('MÉDIO', 'badge-medium'),
+    'Low': ('BAIXO', 'badge-low'),
+    'Lowest': ('BAIXO', 'badge-low'),
+}
+PRIORIDADES_CRITICAS = {'Highest', 'High'}
+IMPACTOS = {'Alto': 'badge-high', 'Médio': 'badge-medium', 'Baixo': 'badge-low'}
+
+
+# ---------------------------------------------------------------------------
+# Formatação
+# ---------------------------------------------------------------------------
+
+def nome_mes(chave):
+    """'2026-07' -> 'Julho 2026'."""
+    ano, numero = chave.split('-')
+    return f'{NOMES_MESES[int(numero) - 1]} {ano}'
+
+
+def dia_mes(valor):
+    """'2026-07-01T10:00:00.000-0300' -> '01/07'."""
+    return f'{valor[8:10]}/{valor[5:7]}' if valor else ''
+
+
+def duracao(horas):
+    """Horas -> '93h 28m' / '37m'."""
+    minutos = round(horas * 60)
+    if minutos < 60:
+        return f'{minutos}m'
+    return f'{minutos // 60}h {minutos % 60:02d}m'
+
+
+def formatar_horas(horas):
+    if horas is None:
+        return '—'
+    return f'{round(horas * 60)}m' if horas < 1 else f'{round(horas)}h'
+
+
+def formatar_dias(dias):
+    if dias is None:
+        return '—'
+    return '1 dia' if round(dias, 1) == 1 else f'{dias:.1f} dias'.replace('.', ',')
+
+
+def formatar_percentual(valor):
+    return '—' if valor is None else f'{valor}%'
+
+
+def badge(texto, classe, titulo=None):
+    atributo = f" title='{escape(titulo)}'" if titulo else ''
+    return f"<span class='badge {classe}'{atributo}>{escape(texto)}</span>"
+
+
+def link_ticket(key):
+    return f"<a href='{JIRA_URL}/browse/{escape(key)}' class='ticket-link'>{escape(key)}</a>"
+
+
+def severidade(item):
+    prioridade = item.get('priority') or ''
+    texto, classe = SEVERIDADES.get(prioridade, (prioridade.upper() or '—', 'badge-neutral'))
+    return badge(texto, classe)
+
+
+# ---------------------------------------------------------------------------
+# Incidentes
+# ---------------------------------------------------------------------------
+
+def linha_incidente(item):
+    horas = horas_resolucao(item)
+    if horas is None:
+        resolucao = badge('EM ABERTO', 'badge-neutral')
+    elif item.get('sla_breached'):
+        resolucao = badge(duracao(horas), 'badge-high', 'ESTOURADO')
+    else:
+        resolucao = badge(duracao(horas), 'badge-low', 'NO PRAZO')
+
+    status = item.get('status') or ''
+    if status in STATUS_CONCLUIDOS or item.get('resolutiondate'):
+        situacao = badge('RESOLVIDO', 'badge-low')
+    elif status in STATUS_CANCELADOS:
+        situacao = badge(status.upper(), 'badge-neutral')
+    else:
+        situacao = badge(status.upper() or '—', 'badge-medium')
+
+    impacto = item.get('impacto') or ''
+    return '', [
+        link_ticket(item['key']),
+        escape(item.get('assignee') or 'Não atribuído'),
+        dia_mes(item.get('created')),
+        escape(item.get('sistema_afetado') or '—'),
+        severidade(item),
+        badge(impacto.upper(), IMPACTOS.get(impacto, 'badge-neutral')) if impacto else badge('SEM IMPACTO', 'badge-low'),
+        resolucao,
+        situacao,
+    ]
+
+
+def indicadores_incidentes(itens):
+    criacoes = sorted(d for d in (parse_data_jira(i.get('created')) for i in itens) if d)
+    intervalos = [(b - a).total_seconds() / 86400 for a, b in zip(criacoes, criacoes[1:])]
+    return {
+        'total': len(itens),
+        'criticos': sum(1 for i in itens if i.get('priority') in PRIORIDADES_CRITICAS),
+        'mttr_horas': media([h for h in (horas_resolucao(i) for i in itens) if h is not None]),
+        'mttf_dias': media(intervalos),
+        'sla_violados': sum(1 for i in itens if i.get('sla_breached')),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Mudanças
+# ---------------------------------------------------------------------------
+
+def linha_mudanca(item):
+    status = item.get('status') or ''
+    classe = ''
+    if status == 'Concluído com Sucesso':
+        situacao = badge('✔', 'badge-low', status)
+    elif status == 'Concluído com Falha':
+        situacao = badge('✗', 'badge-high', status)
+        classe = 'row-failed'
+    else:
+        situacao = badge(status.upper() or '—', 'badge-neutral')
+
+    categoria = item.get('categoria') or ''
+    return classe, [
+        link_ticket(item['key']),
+        escape(item.get('summary') or ''),
+        escape(item.get('assignee') or 'Não atribuído'),
+        dia_mes(item.get('created')),
+        badge(categoria.upper() or '—', 'badge-high' if categoria == 'Emergencial' else 'badge-low'),
+        severidade(item),
+        situacao,
+    ]
+
+
+def indicadores_mudancas(itens):
+    total = len(itens)
+    canceladas = sum(1 for i in itens if i.get('status') in STATUS_CANCELADOS)
+    falhas = sum(1 for i in itens if i.get('status') == 'Concluído com Falha')
+    emergenciais = sum(1 for i in itens if i.get('categoria') == 'Emergencial')
+    return {
+        'total': total,
+        'emergenciais': emergenciais,
+        'emergenciais_pct': round(emergenciais / total * 100) if total else None,
+        'aprovadas_pct': round((total - canceladas - falhas) / total * 100) if total else None,
+        'causaram_incidente': sum(1 for i in itens if i.get('causouIncidente')),
+    }
+
+
+# Por dataset: colunas da tabela, linha de cada issue, indicadores do mês,
+# cards (indicador, rótulo, formato, cor) e gráficos do comparativo
+# (indicador, título, descrição, eixo, cor)
+DATASETS = {
+    'incidentes': {
+        'snapshot': 'dados-incidentes.json',
+        'titulo': 'Incidentes',
+        'colunas': ['Ticket', 'Responsável', 'Data', 'Ambiente', 'Severidade', 'Impacto', 'Resolução', 'Status'],
+        'linha': linha_incidente,
+        'indicadores': indicadores_incidentes,
+        # Páginas mantidas à mão (na pasta acima da saída), para meses que a fonte não cobre
+        'historicas': {
+            '2026-05': 'dashboard_maio.html',
+            '2026-06': 'dashboard_junho.html',
+            '2026-07': 'dashboard_julho.html',
+        },
+        'cards': [
+            ('total', 'Total incidentes', str, 'text-red'),
+            ('criticos', 'Críticos', str, 'text-red'),
+            ('mttr_horas', 'MTTR', formatar_horas, 'text-green'),
+            ('mttf_dias', 'MTTF', formatar_dias, 'text-green'),
+            ('sla_violados', 'SLA estourado', str, 'text-red'),
+        ],
+        'graficos': [
+            ('total', 'Total de Incidentes', 'Volume de chamados no mês', 'Qtd incidentes', '#3182ce'),
+            ('criticos', 'Incidentes Críticos', 'Prioridade alta ou mais alta', 'Qtd críticos', '#e53e3e'),
+            ('mttr_horas', 'MTTR (Horas)', 'Tempo médio entre abertura e resolução', 'Horas', '#38a169'),
+            ('mttf_dias', 'MTTF (Dias)', 'Tempo médio entre aberturas', 'Dias', '#805ad5'),
+            ('sla_violados', 'SLA Estourado', 'Incidentes com SLA violado', 'Qtd incidentes', '#dd6b20'),
+        ],
+    },
+    'mudancas': {
+        'snapshot': 'dados-mudancas.json',
+        'titulo': 'Mudanças (GMUDs)',
+        'colunas': ['Ticket', 'Descrição', 'Responsável', 'Data', 'Categoria', 'Severidade', 'Status'],
+        'linha': linha_mudanca,
+        'indicadores': indicadores_mudancas,
+        'historicas': {
+            '2026-05': 'gmuds_maio.html',
+            '2026-06': 'gmuds_junho.html',
+            '2026-07': 'gmuds_julho.html',
+        },
+        'cards': [
+            ('total', 'Total mudanças', str, 'text-teal'),
+            ('emergenciais_pct', 'Emergenciais', formatar_percentual, 'text-red'),
+            ('aprovadas_pct', 'Aprovadas CAB', formatar_percentual, 'text-green'),
+            ('causaram_incidente', 'Geraram incidentes', str, 'text-green'),
+        ],
+        'graficos': [
+            ('total', 'Volume de Mudanças', 'Total de GMUDs no mês', 'Qtd GMUDs', '#226b74'),
+            ('emergenciais', 'Mudanças Emergenciais', 'GMUDs emergenciais no mês', 'Qtd GMUDs', '#e64040'),
+            ('aprovadas_pct', 'Aprovação CAB (%)', 'Não canceladas e sem falha', '%', '#329932'),
+        ],
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# Geração
+# ---------------------------------------------------------------------------
+
+def carregar_modelo(nome):
+    with open(os.path.join(DIRETORIO_MODELOS, nome), 'r', encoding='utf-8') as f:
+        texto = f.read()
+    return Template(texto), hash_conteudo(texto)
+
+
+def meses_ate(inicio, fim):
+    """Chaves 'AAAA-MM' de `inicio` a `fim`, inclusive."""
+    ano, numero = map(int, inicio.split('-'))
+    meses = []
+    while f'{ano:04d}-{numero:02d}' <= fim:
+        meses.append(f'{ano:04d}-{numero:02d}')
+        ano, numero = (ano + 1, 1) if numero == 12 else (ano, numero + 1)
+    return meses
+
+
+def limites_mes(chave):
+    """'2026-07' -> (início do mês, início do mês seguinte), no fuso de Brasília."""
+    ano, numero = map(int, chave.split('-'))
+    proximo = (ano + 1, 1) if numero == 12 else (ano, numero + 1)
+    return datetime(ano, numero, 1, tzinfo=FUSO), datetime(*proximo, 1, tzinfo=FUSO)
+
+
+def carregar_por_mes(dataset, banco=None):
+    """
+    Issues do dataset agrupadas pelo mês de criação (a partir de MES_INICIAL)
+    e a cobertura da fonte: (inicio, fim) do período de criação em que ela tem
+    todas as issues, ou None se desconhecida.
+    """
+    if banco:
+        itens = banco.consultar(dataset)
+        cobertura = banco.cobertura(dataset)
+    else:
+        cabecalho = {}
+        itens = iterar_itens(DATASETS[dataset]['snapshot'], dataset, cabecalho)
+    grupos = {}
+    mais_antigo = None
+    for item in itens:
+        criado = parse_data_jira(item.get('created'))
+        if criado and (mais_antigo is None or criado < mais_antigo):
+            mais_antigo = criado
+        chave = mes(item.get('created'))
+        if chave >= MES_INICIAL:
+            grupos.setdefault(chave, []).append(item)
+    for lista in grupos.values():
+        lista.sort(key=lambda i: (i.get('created') or '', i['key']))
+
+    if not banco:
+        # Snapshot: da janela (se houver) até o momento em que foi gerado
+        fim = data_atualizacao(cabecalho.get('ultima_atualizacao'))
+        janela_dias = DATASETS_BANCO[dataset]['janela_dias']
+        cobertura = (fim - timedelta(days=janela_dias) if janela_dias else None, fim) if fim else None
+    # Nada antes da issue mais antiga da fonte é garantido
+    if cobertura is None or mais_antigo is None:
+        return grupos, None
+    inicio, fim = cobertura
+    return grupos, (mais_antigo if inicio is None else max(inicio, mais_antigo), fim)
+
+
+def mes_coberto(chave, cobertura, fechado):
+    """Se a fonte tem todas as issues criadas no mês (até agora, se em andamento)."""
+    if cobertura is None:
+        return False
+    inicio, fim = cobertura
+    inicio_mes, fim_mes = limites_mes(chave)
+    return inicio <= inicio_mes and fim >= (fim_mes if fechado else inicio_mes)
+
+
+def arquivo_mes(dataset, chave):
+    return f'{dataset}-{chave}.html'
+
+
+def arquivo_comparativo(dataset):
+    return f'{dataset}-comparativo.html'
+
+
+def render_mes(modelo, dataset, chave, itens, fechado):
+    config = DATASETS[dataset]
+    linhas = []
+    for item in itens:
+        classe, celulas = config['linha'](item)
+        linhas.append(f"            <tr class='{classe}'>" + ''.join(f'<td>{c}</td>' for c in celulas) + '</tr>')
+    if not linhas:
+        linhas.append(f"            <tr><td class='vazio' colspan='{len(config['colunas'])}'>Nenhum registro no mês</td></tr>")
+
+    indicadores = config['indicadores'](itens)
+    cards = [
+        f"        <div class='card'><h3 class='{cor}'>{escape(formato(indicadores[campo]))}</h3>"
+        f"<p>{escape(rotulo)}</p></div>"
+        for campo, rotulo, formato, cor in config['cards']
+    ]
+    return modelo.substitute(
+        titulo=escape(f"{config['titulo']} - {nome_mes(chave)}"),
+        subtitulo='Mês fechado' if fechado else 'Mês em andamento',
+        comparativo=arquivo_comparativo(dataset),
+        cabecalho=''.join(f'<th>{escape(c)}</th>' for c in config['colunas']),
+        linhas='\n'.join(linhas),
+        cards='\n'.join(cards),
+    )
+
+
+def render_comparativo(modelo, dataset, meses, indicadores, links):
+    config = DATASETS[dataset]
+    janela = meses[-MESES_COMPARATIVO:]
+    graficos = [
+        f"        <div class='chart-card'><h3>{escape(titulo)}</h3><p>{escape(descricao)}</p>"
+        f"<div class='chart-container'><canvas id='grafico-{campo}'></canvas></div></div>"
+        for campo, titulo, descricao, _, _ in config['graficos']
+    ]
+    series = [
+        {'id': f'grafico-{campo}', 'eixo': eixo, 'cor': cor,
+         'valores': [(indicadores[chave] or {}).get(campo) for chave in janela]}
+        for campo, _, _, eixo, cor in config['graficos']
+    ]
+    links = [f"        <a href='{escape(links[chave])}'>{escape(nome_mes(chave))}</a>"
+             for chave in reversed(meses) if chave in links]
+    # '</' escapado: o JSON vai dentro de <script>
+    return modelo.substitute(
+        titulo=escape(f"Comparativo de {config['titulo']}"),
+        subtitulo=escape(f'{nome_mes(janela[0])} a {nome_mes(janela[-1])}' if janela else ''),
+        links='\n'.join(links),
+        graficos='\n'.join(graficos),
+        labels=json.dumps([nome_mes(c) for c in janela], ensure_ascii=False).replace('</', '<\\/'),
+        series=json.dumps(series, ensure_ascii=False).replace('</', '<\\/'),
+    )
+
+
+def carregar_manifesto_paginas(diretorio):
+    try:
+        with open(os.path.join(diretorio, MANIFESTO), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def gerar(dataset, diretorio=DIRETORIO_SAIDA, banco=None, todas=False, agora=None):
+    """
+    Gera as páginas de `dataset` que mudaram. Retorna (geradas, inalteradas).
+    `todas` ignora o manifesto e regrava tudo.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    agora = agora or datetime.now(FUSO)
+    mes_atual = agora.strftime('%Y-%m')
+
+    modelo_mes, hash_modelo_mes = carregar_modelo('relatorio_mes.html')
+    modelo_comparativo, hash_modelo_comparativo = carregar_modelo('relatorio_comparativo.html')
+
+    manifesto = carregar_manifesto_paginas(diretorio)
+    paginas = manifesto.setdefault('paginas', {})
+    grupos, cobertura = carregar_por_mes(dataset, banco)
+    meses = meses_ate(MES_INICIAL, mes_atual)
+    # Páginas mantidas à mão ficam na pasta acima da saída
+    raiz = os.path.dirname(os.path.abspath(diretorio))
+    historicas = DATASETS[dataset]['historicas']
+
+    geradas = inalteradas = 0
+    indicadores = {}
+    hashes = []
+    links = {}
+    for chave in meses:
+        arquivo = arquivo_mes(dataset, chave)
+        caminho = os.path.join(diretorio, arquivo)
+        itens = grupos.get(chave, [])
+        fechado = chave < mes_atual
+
+        # Fonte sem todas as issues do mês (janela de 90 dias, base recente ou
+        # snapshot antigo): a página publicada continua valendo; sem ela, o
+        # comparativo aponta para a página mantida à mão, se houver
+        if not mes_coberto(chave, cobertura, fechado):
+            if arquivo in paginas and os.path.exists(caminho):
+                indicadores[chave] = paginas[arquivo].get('indicadores')
+                hashes.append(paginas[arquivo]['hash'])
+                links[chave] = arquivo
+                inalteradas += 1
+            else:
+                indicadores[chave] = None
+                hashes.append(None)
+                if chave in historicas and os.path.exists(os.path.join(raiz, historicas[chave])):
+                    links[chave] = os.path.relpath(os.path.join(raiz, historicas[chave]),
+                                                   os.path.abspath(diretorio)).replace(os.sep, '/')
+                print(f'= {arquivo}: a fonte não cobre o mês inteiro; página não gerada')
+            continue
+
+        indicadores[chave] = DATASETS[dataset]['indicadores'](itens)
+        links[chave] = arquivo
+
+        digest = hash_conteudo({
+            'versao': VERSAO, 'modelo': hash_modelo_mes, 'jira': JIRA_URL,
+            'fechado': fechado, 'itens': itens,
+        })
+        hashes.append(digest)
+        if not todas and paginas.get(arquivo, {}).get('hash') == digest and os.path.exists(caminho):
+            inalteradas += 1
+            continue
+
+        html = render_mes(modelo_mes, dataset, chave, itens, fechado)
+        escrever_atomico(caminho, html.encode('utf-8'))
+        paginas[arquivo] = {'hash': digest, 'fechado': fechado, 'total': len(itens),
+                            'indicadores': indicadores[chave]}
+        geradas += 1
+        print(f'✓ {arquivo} ({len(itens)} {dataset})')
+
+    arquivo = arquivo_comparativo(dataset)
+    caminho = os.path.join(diretorio, arquivo)
+    digest = hash_conteudo({'versao': VERSAO, 'modelo': hash_modelo_comparativo,
+                            'janela': MESES_COMPARATIVO, 'meses': list(zip(meses, hashes)), 'links': links})
+    if todas or paginas.get(arquivo, {}).get('hash') != digest or not os.path.exists(caminho):
+        html = render_comparativo(modelo_comparativo, dataset, meses, indicadores, links)
+        escrever_atomico(caminho, html.encode('utf-8'))
+        paginas[arquivo] = {'hash': digest}
+        geradas += 1
+        print(f'✓ {arquivo}')
+    else:
+        inalteradas += 1
+
+    escrever_atomico(os.path.join(diretorio, MANIFESTO),
+                     json.dumps(manifesto, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8'))
+    return geradas, inalteradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera os relatórios mensais estáticos')
+    parser.add_argument('datasets', nargs='*', help=f'Datasets: {", ".join(DATASETS)} (padrão: todos)')
+    parser.add_argument('--saida', default=DIRETORIO_SAIDA, help=f'Diretório das páginas (padrão: {DIRETORIO_SAIDA})')
+    parser.add_argument('--banco', default=BANCO_PADRAO,
+                        help='Base local usada como fonte, se existir (senão, os snapshots JSON)')
+    parser.add_argument('--todas', action='store_true', help='Regrava todas as páginas, ignorando o manifesto')
+    args = parser.parse_args()
+
+    for dataset in args.datasets:
+        if dataset not in DATASETS:
+            parser.error(f'dataset desconhecido: {dataset}')
+
+    banco = BancoIssues(args.banco) if os.path.exists(args.banco) else None
+    if banco is None:
+        print(f'= {args.banco} não encontrado; usando os snapshots JSON')
+
+    try:
+        for dataset in args.datasets or list(DATASETS):
+            geradas, inalteradas = gerar(dataset, args.saida, banco, args.todas)
+            print(f'= {dataset}: {geradas} página(s) gerada(s), {inalteradas} sem alterações')
+    except (OSError, ValueError) as e:
+        print(f'✗ Erro ao gerar páginas: {e}')
+        sys.exit(1)
+    finally:
+        if banco is not None:
+            banco.fechar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração do gunicorn para os servidores Flask
+Central de Serviços - Open Finance Brasil
+
+Uso:
+    gunicorn -c gunicorn.conf.py api_proxy:app
+    gunicorn -c gunicorn.conf.py atlassian_connect_server:app
+
+Por padrão usa workers gevent: o worker aplica o monkey patching da stdlib,
+então as chamadas ao Jira feitas via requests (jira_client) deixam de bloquear
+o processo e cada worker mantém centenas de requisições upstream em paralelo,
+com as mesmas rotas e o mesmo código dos handlers.
+"""
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# 'sync' desativa o modo assíncrono (um request por worker, como antes)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+# Máximo de conexões simultâneas por worker gevent
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+keepalive = 5
+
+# O pool de conexões do jira_client precisa acompanhar a concorrência do worker;
+# com pool menor as conexões excedentes seriam abertas e descartadas a cada chamada
+if worker_class == 'gevent':
+    os.environ.setdefault('JIRA_POOL_MAXSIZE', str(min(worker_connections, 200)))
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Índice em memória dos snapshots publicados (incidentes e mudanças)
+Central de Serviços - Open Finance Brasil
+
+Carrega dados-incidentes.json / dados-mudancas.json e monta:
+  - a lista de itens ordenada por data de criação (busca de intervalo por bisect)
+  - índices por valor de status, prioridade, sistema, responsável e categoria
+  - um índice invertido dos termos do resumo (e da key) para busca textual
+O arquivo é recarregado automaticamente quando muda em disco; cada recarga
+com conteúdo novo gera uma versão (hash do conteúdo) e a diferença em relação
+à versão anterior, usada pelo stream SSE de /api/stream/<dataset>.
+"""
+import os
+import re
+import json
+import time
+import base64
+import bisect
+import threading
+import unicodedata
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from banco_issues import data_utc
+from publicacao import hash_conteudo, calcular_diferenca
+
+# Datas sem fuso nos filtros são interpretadas no horário de Brasília
+FUSO_PADRAO = timezone(timedelta(hours=-3))
+
+# Intervalo mínimo entre verificações do arquivo em disco (segundos)
+INTERVALO_VERIFICACAO = 1.0
+
+# Quantas diferenças entre versões consecutivas ficam guardadas
+MAX_HISTORICO = 50
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+# Parâmetro da API -> campo do item
+FILTROS = {
+    'status': 'status',
+    'priority': 'priority',
+    'sistema': 'sistema_afetado',
+    'assignee': 'assignee',
+    'categoria': 'categoria',
+}
+
+_SEPARADOR = re.compile(r'[^0-9a-z]+')
+
+
+def tokenizar(texto):
+    """Termos normalizados (minúsculas, sem acento) de um texto."""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return [t for t in _SEPARADOR.split(texto) if t]
+
+
+def parse_data_filtro(valor):
+    """'2026-08-01' ou ISO completo -> datetime com fuso (None se vazio)."""
+    if not valor:
+        return None
+    data = datetime.fromisoformat(valor)
+    return data if data.tzinfo else data.replace(tzinfo=FUSO_PADRAO)
+
+
+def _utc(data):
+    return data.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def codificar_cursor(posicao):
+    return base64.urlsafe_b64encode(json.dumps(posicao).encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    try:
+        created, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('cursor inválido')
+    # Comparado com tuplas (str, str) do índice: outros tipos quebrariam o bisect
+    if not isinstance(created, str) or not isinstance(key, str):
+        raise ValueError('cursor inválido')
+    return created, key
+
+
+class IndiceDataset:
+    """Índice de um snapshot (ex.: dados-incidentes.json, lista 'incidentes')."""
+
+    def __init__(self, caminho, chave_lista):
+        self.caminho = caminho
+        self.chave_lista = chave_lista
+        self.versao = 0
+        self.hash = None
+        self.ultima_atualizacao = None
+        self.historico = deque(maxlen=MAX_HISTORICO)
+        self._assinatura = None
+        self._verificado_em = 0
+        self._lock = threading.Lock()
+        self._montar([])
+
+    def _montar(self, itens):
+        # Ordem crescente de (created_utc, key); as consultas percorrem de trás para frente
+        ordenados = sorted(itens, key=lambda i: (data_utc(i.get('created')) or '', i.get('key') or ''))
+        ordem = [(data_utc(i.get('created')) or '', i.get('key') or '') for i in ordenados]
+
+        por_campo = {campo: {} for campo in FILTROS.values()}
+        termos = {}
+        for posicao, item in enumerate(ordenados):
+            for campo, indice in por_campo.items():
+                if campo in item:
+                    indice.setdefault(item.get(campo) or '', set()).add(posicao)
+            for termo in tokenizar(f"{item.get('key', '')} {item.get('summary', '')}"):
+                termos.setdefault(termo, set()).add(posicao)
+
+        # Troca atômica: consultas em andamento continuam usando o estado anterior
+        self._estado = (ordenados, ordem, por_campo, termos, sorted(termos))
+
+    def recarregar_se_mudou(self):
+        """Recarrega o snapshot se o arquivo mudou (verificação limitada a 1x/segundo)."""
+        agora = time.monotonic()
+        if agora - self._verificado_em < INTERVALO_VERIFICACAO:
+            return
+        with self._lock:
+            if agora - self._verificado_em < INTERVALO_VERIFICACAO:
+                return
+            self._verificado_em = agora
+            try:
+                stat = os.stat(self.caminho)
+            except OSError:
+                return
+            assinatura = (stat.st_mtime_ns, stat.st_size)
+            if assinatura == self._assinatura:
+                return
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+            except (OSError, ValueError):
+                # Arquivo sendo reescrito: mantém o índice atual e tenta de novo depois
+                return
+            self._assinatura = assinatura
+            # 'ultima_atualizacao' fica fora do hash: atualizada mesmo sem mudança de conteúdo
+            self.ultima_atualizacao = dados.get('ultima_atualizacao')
+            digest = hash_conteudo(dados)
+            if digest == self.hash:
+                return
+
+            itens = dados.get(self.chave_lista, [])
+            if self.hash is not None:
+                self.historico.append((self.hash, digest, calcular_diferenca(self.itens, itens)))
+            self._montar(itens)
+            self.hash = digest
+            self.versao += 1
+
+    @property
+    def itens(self):
+        return self._estado[0]
+
+    def diferencas_desde(self, digest):
+        """
+        Lista de (hash_anterior, hash_novo, diferenca) desde a versão `digest`
+        até a atual. None se `digest` não estiver mais no histórico.
+        """
+        historico = list(self.historico)
+        for i, (anterior, _, _) in enumerate(historico):
+            if anterior == digest:
+                return historico[i:]
+        return [] if digest == self.hash else None
+
+    @staticmethod
+    def _posicoes_termo(termos, vocabulario, prefixo):
+        """Posições dos itens com algum termo começando por `prefixo`."""
+        posicoes = set()
+        i = bisect.bisect_left(vocabulario, prefixo)
+        while i < len(vocabulario) and vocabulario[i].startswith(prefixo):
+            posicoes |= termos[vocabulario[i]]
+            i += 1
+        return posicoes
+
+    def buscar(self, q=None, desde=None, ate=None, cursor=None, limite=LIMITE_PADRAO, campos=None, **filtros):
+        """
+        Consulta paginada, mais recentes primeiro.
+        `filtros` usa os nomes de FILTROS, cada um com uma lista de valores aceitos.
+        Retorna dict com itens, total, proximo_cursor e versao.
+        """
+        self.recarregar_se_mudou()
+        itens, ordem, por_campo, termos, vocabulario = self._estado
+
+        candidatos = None
+        for parametro, valores in filtros.items():
+            if not valores:
+                continue
+            indice = por_campo[FILTROS[parametro]]
+            posicoes = set()
+            for valor in valores:
+                posicoes |= indice.get(valor, set())
+            candidatos = posicoes if candidatos is None else candidatos & posicoes
+
+        for termo in tokenizar(q):
+            posicoes = self._posicoes_termo(termos, vocabulario, termo)
+            candidatos = posicoes if candidatos is None else candidatos & posicoes
+
+        # Intervalo de datas por busca binária na ordem por created
+        inicio = bisect.bisect_left(ordem, (_utc(desde),)) if desde else 0
+        fim = bisect.bisect_left(ordem, (_utc(ate),)) if ate else len(ordem)
+
+        if candidatos is None:
+            total = max(0, fim - inicio)
+        else:
+            candidatos = sorted((p for p in candidatos if inicio <= p < fim), reverse=True)
+            total = len(candidatos)
+
+        # O cursor é a posição (created, key) do último item entregue
+        if cursor:
+            fim = min(fim, bisect.bisect_left(ordem, tuple(decodificar_cursor(cursor))))
+
+        limite = max(1, min(limite or LIMITE_PADRAO, LIMITE_MAXIMO))
+        if candidatos is None:
+            pagina = list(range(fim - 1, max(inicio, fim - limite) - 1, -1))
+            tem_mais = fim - limite > inicio
+        else:
+            restantes = [p for p in candidatos if p < fim]
+            pagina = restantes[:limite]
+            tem_mais = len(restantes) > limite
+
+        resultado = [itens[p] for p in pagina]
+        if campos:
+            resultado = [{c: item.get(c) for c in campos} for item in resultado]
+
+        return {
+            'versao': self.versao,
+            'ultima_atualizacao': self.ultima_atualizacao,
+            'total': total,
+            'itens': resultado,
+            'proximo_cursor': codificar_cursor(list(ordem[pagina[-1]])) if pagina and tem_mais else None,
+        }
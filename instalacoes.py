@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Armazenamento das instalações do Atlassian Connect
+Central de Serviços - Open Finance Brasil
+
+As instalações (clientKey, baseUrl, sharedSecret) recebidas em /installed
+precisam sobreviver a reinícios e ser vistas por todos os workers do gunicorn.
+O backend padrão é um SQLite local indexado por clientKey e baseUrl; na frente
+dele fica um cache em memória (read-through) invalidado a cada gravação.
+
+Backend escolhido por INSTALLATIONS_STORE ('sqlite' ou 'memoria') e arquivo
+do SQLite por INSTALLATIONS_DB.
+"""
+import os
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from cache_ttl import CacheTTL
+
+
+class InstalacaoStore(ABC):
+    """
+    Interface dos backends. As instalações são dicts no formato do /installed.
+    Um backend incompleto falha já ao ser instanciado (TypeError).
+    """
+
+    @abstractmethod
+    def get(self, client_key):
+        ...
+
+    @abstractmethod
+    def get_por_base_url(self, base_url):
+        ...
+
+    @abstractmethod
+    def salvar(self, instalacao):
+        ...
+
+    @abstractmethod
+    def remover(self, client_key):
+        ...
+
+    @abstractmethod
+    def contar(self):
+        ...
+
+    def __contains__(self, client_key):
+        return self.get(client_key) is not None
+
+    def __len__(self):
+        return self.contar()
+
+
+class MemoriaInstalacaoStore(InstalacaoStore):
+    """Backend em memória (desenvolvimento): não compartilha estado entre processos."""
+
+    def __init__(self):
+        self._dados = {}
+
+    def get(self, client_key):
+        return self._dados.get(client_key)
+
+    def get_por_base_url(self, base_url):
+        for instalacao in self._dados.values():
+            if instalacao.get('baseUrl') == base_url:
+                return instalacao
+        return None
+
+    def salvar(self, instalacao):
+        self._dados[instalacao['clientKey']] = instalacao
+
+    def remover(self, client_key):
+        return self._dados.pop(client_key, None) is not None
+
+    def contar(self):
+        return len(self._dados)
+
+
+class SQLiteInstalacaoStore(InstalacaoStore):
+    """Backend SQLite: um arquivo compartilhado por todos os workers da máquina."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        # Conexões sqlite3 não podem ser compartilhadas entre threads
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS installations ('
+                ' client_key TEXT PRIMARY KEY,'
+                ' base_url TEXT,'
+                ' shared_secret TEXT,'
+                ' public_key TEXT,'
+                ' atualizado_em REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_installations_base_url ON installations (base_url)')
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=10)
+            conn.row_factory = sqlite3.Row
+            # WAL permite leituras concorrentes enquanto outro processo grava
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _para_dict(row):
+        if row is None:
+            return None
+        return {
+            'clientKey': row['client_key'],
+            'baseUrl': row['base_url'],
+            'sharedSecret': row['shared_secret'],
+            'publicKey': row['public_key'],
+        }
+
+    def get(self, client_key):
+        row = self._conexao().execute(
+            'SELECT * FROM installations WHERE client_key = ?', (client_key,)
+        ).fetchone()
+        return self._para_dict(row)
+
+    def get_por_base_url(self, base_url):
+        row = self._conexao().execute(
+            'SELECT * FROM installations WHERE base_url = ? ORDER BY atualizado_em DESC LIMIT 1', (base_url,)
+        ).fetchone()
+        return self._para_dict(row)
+
+    def salvar(self, instalacao):
+        with self._conexao() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO installations (client_key, base_url, shared_secret, public_key, atualizado_em)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (instalacao['clientKey'], instalacao.get('baseUrl'), instalacao.get('sharedSecret'),
+                 instalacao.get('publicKey'), time.time())
+            )
+
+    def remover(self, client_key):
+        with self._conexao() as conn:
+            cursor = conn.execute('DELETE FROM installations WHERE client_key = ?', (client_key,))
+        return cursor.rowcount > 0
+
+    def contar(self):
+        return self._conexao().execute('SELECT COUNT(*) FROM installations').fetchone()[0]
+
+
+class InstalacaoStoreCache(InstalacaoStore):
+    """
+    Cache read-through na frente de outro backend. Gravações e remoções neste
+    processo invalidam a entrada na hora; as feitas por outros workers são
+    vistas no máximo `ttl` segundos depois.
+    """
+
+    def __init__(self, backend, ttl=30, max_itens=1024):
+        self.backend = backend
+        self.cache = CacheTTL(ttl=ttl, max_itens=max_itens)
+
+    def get(self, client_key):
+        instalacao = self.cache.get(('clientKey', client_key))
+        if instalacao is None:
+            instalacao = self.backend.get(client_key)
+            if instalacao is not None:
+                self.cache.set(('clientKey', client_key), instalacao)
+        return instalacao
+
+    def get_por_base_url(self, base_url):
+        instalacao = self.cache.get(('baseUrl', base_url))
+        if instalacao is None:
+            instalacao = self.backend.get_por_base_url(base_url)
+            if instalacao is not None:
+                self.cache.set(('baseUrl', base_url), instalacao)
+        return instalacao
+
+    def salvar(self, instalacao):
+        self.backend.salvar(instalacao)
+        self._invalidar(instalacao['clientKey'], instalacao.get('baseUrl'))
+
+    def remover(self, client_key):
+        anterior = self.backend.get(client_key)
+        removido = self.backend.remover(client_key)
+        self._invalidar(client_key, anterior.get('baseUrl') if anterior else None)
+        return removido
+
+    def contar(self):
+        return self.backend.contar()
+
+    def _invalidar(self, client_key, base_url):
+        self.cache.invalidar(('clientKey', client_key))
+        if base_url:
+            self.cache.invalidar(('baseUrl', base_url))
+
+
+def criar_store():
+    """Cria o store configurado pelas variáveis de ambiente."""
+    tipo = os.environ.get('INSTALLATIONS_STORE', 'sqlite')
+    if tipo == 'memoria':
+        return MemoriaInstalacaoStore()
+    if tipo != 'sqlite':
+        raise ValueError(f'INSTALLATIONS_STORE desconhecido: {tipo}')
+
+    backend = SQLiteInstalacaoStore(os.environ.get('INSTALLATIONS_DB', 'installations.db'))
+    return InstalacaoStoreCache(backend, ttl=float(os.environ.get('INSTALLATIONS_CACHE_TTL', '30')))
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartilhado para Jira/Confluence
+Central de Serviços - Open Finance Brasil
+
+Todas as chamadas à Atlassian passam por uma única requests.Session com pool de
+conexões (keep-alive), timeout padrão e novas tentativas com backoff
+exponencial + jitter em 429/5xx, respeitando o cabeçalho Retry-After.
+Cada tentativa é registrada nas métricas (latência e status por host).
+"""
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metricas
+
+# (conexão, leitura) em segundos
+TIMEOUT_PADRAO = (5, 30)
+
+MAX_TENTATIVAS = int(os.getenv('JIRA_MAX_TENTATIVAS', '4'))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+# Retry-After muito longo bloquearia o worker; acima disso devolvemos o 429
+RETRY_AFTER_MAX = 60
+
+STATUS_RETENTAVEIS = {429, 502, 503, 504}
+
+# Um pool por host; maxsize limita conexões simultâneas reaproveitadas por host
+POOL_CONEXOES = int(os.getenv('JIRA_POOL_CONEXOES', '4'))
+POOL_MAXSIZE = int(os.getenv('JIRA_POOL_MAXSIZE', '32'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ErroJira(RuntimeError):
+    """Resposta de erro da API do Jira/Confluence."""
+
+    def __init__(self, status_code, detalhes=''):
+        super().__init__(f'Erro na API do Jira: {status_code} - {detalhes}')
+        self.status_code = status_code
+        self.detalhes = detalhes
+
+
+def get_session():
+    """Retorna a sessão compartilhada do processo, criando-a na primeira chamada."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONEXOES, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _retry_after(response):
+    """Segundos indicados no Retry-After (inteiro ou data HTTP), ou None."""
+    valor = response.headers.get('Retry-After') if response is not None else None
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+
+
+def _tempo_espera(tentativa, response=None):
+    """Backoff exponencial com jitter completo; Retry-After tem prioridade."""
+    retry_after = _retry_after(response)
+    if retry_after is not None:
+        return retry_after
+    teto = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** tentativa))
+    return random.uniform(0, teto)
+
+
+def request(method, url, **kwargs):
+    """
+    Executa uma requisição com novas tentativas em falhas transitórias.
+    Aceita os mesmos argumentos de requests.request; `timeout` tem padrão.
+    Após esgotar as tentativas devolve a última resposta (ou propaga a exceção).
+    Só é usado para leituras, então repetir POSTs de busca é seguro.
+    """
+    kwargs.setdefault('timeout', TIMEOUT_PADRAO)
+    session = get_session()
+
+    for tentativa in range(MAX_TENTATIVAS):
+        ultima = tentativa == MAX_TENTATIVAS - 1
+        inicio = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            metricas.registrar_upstream(method, url, time.perf_counter() - inicio, None)
+            if ultima:
+                raise
+            time.sleep(_tempo_espera(tentativa))
+            continue
+        metricas.registrar_upstream(method, url, time.perf_counter() - inicio, response.status_code)
+
+        if response.status_code not in STATUS_RETENTAVEIS or ultima:
+            return response
+
+        espera = _tempo_espera(tentativa, response)
+        if espera > RETRY_AFTER_MAX:
+            return response
+        response.close()
+        time.sleep(espera)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def buscar_pagina(jira_url, auth, jql, campos, max_results=100, next_page_token=None):
+    """
+    Uma página de /rest/api/3/search/jql: a resposta completa do Jira
+    (issues, isLast e nextPageToken da página seguinte).
+    Levanta ErroJira se o Jira responder com erro.
+    """
+    headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+    payload = {
+        'jql': jql,
+        'fields': campos,
+        'maxResults': max_results,
+    }
+    if next_page_token:
+        payload['nextPageToken'] = next_page_token
+
+    response = post(f'{jira_url}/rest/api/3/search/jql', auth=auth, headers=headers, json=payload)
+
+    if response.status_code != 200:
+        raise ErroJira(response.status_code, response.text)
+    return response.json()
+
+
+def paginar_busca(jira_url, auth, jql, campos, max_results=100):
+    """
+    Gera as páginas (listas de issues) de /rest/api/3/search/jql seguindo o
+    nextPageToken, uma requisição por vez: só uma página fica em memória.
+    Sempre gera ao menos uma página (possivelmente vazia).
+    Levanta ErroJira se o Jira responder com erro.
+    """
+    next_page_token = None
+
+    while True:
+        data = buscar_pagina(jira_url, auth, jql, campos, max_results, next_page_token)
+        yield data.get('issues', [])
+
+        next_page_token = data.get('nextPageToken')
+        if data.get('isLast', True) or not next_page_token:
+            break
+
+
+def resposta_ndjson(paginas):
+    """
+    Resposta Flask que transmite as issues como NDJSON (uma por linha) à
+    medida que cada página chega do Jira. A primeira página é buscada antes de
+    iniciar a resposta para que erros do Jira ainda possam virar um status
+    HTTP de erro. Usada pelo /api/tickets dos dois servidores.
+    """
+    # Import local: os scripts de exportação usam este módulo sem o Flask
+    from flask import Response, stream_with_context
+
+    primeira = next(paginas)
+
+    def gerar():
+        for issue in primeira:
+            yield json.dumps(issue, ensure_ascii=False) + '\n'
+        try:
+            for pagina in paginas:
+                for issue in pagina:
+                    yield json.dumps(issue, ensure_ascii=False) + '\n'
+        except Exception as e:
+            # Status já enviado: sinaliza o erro na última linha do stream
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
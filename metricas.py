@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas no formato texto do Prometheus
+Central de Serviços - Open Finance Brasil
+
+Contadores, medidores e histogramas em memória (sem dependências externas),
+expostos em /metrics pelos dois servidores Flask:
+  - latência, status e tamanho das respostas por rota, e requisições em andamento
+  - latência e status de cada chamada ao Jira/Confluence (via jira_client)
+  - acertos, falhas e taxa de acerto dos caches (CacheTTL)
+
+Cada processo (worker do gunicorn) mantém e expõe as próprias métricas.
+A latência das respostas em stream (NDJSON/SSE) é medida até o início do envio.
+"""
+import os
+import time
+import bisect
+import threading
+from urllib.parse import urlsplit
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+TIPO_CONTEUDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ''
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pares.append(f'{nome}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = 'untyped'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _cabecalho(self):
+        return [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def incrementar(self, *valores, quantidade=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + quantidade
+
+    def exportar(self):
+        with self._lock:
+            series = list(self._series.items())
+        return self._cabecalho() + [f'{self.nome}{_rotulos(self.rotulos, v)} {_numero(n)}' for v, n in series]
+
+
+class Medidor(Contador):
+    tipo = 'gauge'
+
+    def decrementar(self, *valores, quantidade=1):
+        self.incrementar(*valores, quantidade=-quantidade)
+
+
+class MedidorFuncao(_Metrica):
+    """Medidor calculado na exportação: `funcao()` retorna {valores_rotulos: numero}."""
+
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, rotulos, funcao, tipo='gauge'):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+        self.tipo = tipo
+
+    def exportar(self):
+        return self._cabecalho() + [f'{self.nome}{_rotulos(self.rotulos, v)} {_numero(n)}'
+                                    for v, n in self.funcao().items()]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, *valores):
+        # Contagem por faixa (não cumulativa); a acumulação fica para a exportação
+        posicao = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][posicao] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        with self._lock:
+            series = [(v, list(s[0]), s[1], s[2]) for v, s in self._series.items()]
+        linhas = self._cabecalho()
+        nomes_le = self.rotulos + ('le',)
+        for valores, faixas, soma, total in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.buckets + (float('inf'),), faixas):
+                acumulado += quantidade
+                linhas.append(f'{self.nome}_bucket{_rotulos(nomes_le, valores + (_numero(limite),))} {acumulado}')
+            linhas.append(f'{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}')
+            linhas.append(f'{self.nome}_count{_rotulos(self.rotulos, valores)} {total}')
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas exportadas juntas."""
+
+    def __init__(self):
+        self.metricas = []
+        self.caches = {}
+
+    def adicionar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def registrar_cache(self, nome, cache):
+        """Expõe acertos/falhas/tamanho de um CacheTTL (lidos na exportação, sem custo por acesso)."""
+        self.caches[nome] = cache
+
+    def exportar(self):
+        linhas = []
+        for metrica in self.metricas:
+            linhas.extend(metrica.exportar())
+        return '\n'.join(linhas) + '\n'
+
+
+REGISTRO = Registro()
+
+http_duracao = REGISTRO.adicionar(Histograma(
+    'central_http_requisicao_segundos', 'Latência das requisições HTTP por rota', ('app', 'rota', 'metodo')))
+http_respostas = REGISTRO.adicionar(Contador(
+    'central_http_respostas_total', 'Respostas HTTP por rota e status', ('app', 'rota', 'metodo', 'status')))
+http_tamanho = REGISTRO.adicionar(Histograma(
+    'central_http_resposta_bytes', 'Tamanho do corpo das respostas (exceto streams)', ('app', 'rota'),
+    BUCKETS_BYTES))
+http_em_andamento = REGISTRO.adicionar(Medidor(
+    'central_http_em_andamento', 'Requisições HTTP em andamento', ('app',)))
+
+upstream_duracao = REGISTRO.adicionar(Histograma(
+    'central_upstream_requisicao_segundos', 'Latência de cada chamada ao Jira/Confluence', ('host', 'metodo')))
+upstream_respostas = REGISTRO.adicionar(Contador(
+    'central_upstream_respostas_total', 'Chamadas ao Jira/Confluence por status (erro: falha de conexão)',
+    ('host', 'metodo', 'status')))
+
+
+def _estatisticas_caches(campo):
+    def calcular():
+        resultado = {}
+        for nome, cache in REGISTRO.caches.items():
+            if campo == 'itens':
+                resultado[(nome,)] = len(cache)
+            elif campo == 'taxa':
+                consultas = cache.acertos + cache.falhas
+                resultado[(nome,)] = round(cache.acertos / consultas, 4) if consultas else 0
+            else:
+                resultado[(nome,)] = getattr(cache, campo)
+        return resultado
+    return calcular
+
+
+REGISTRO.adicionar(MedidorFuncao('central_cache_acertos_total', 'Acertos do cache', ('cache',),
+                                 _estatisticas_caches('acertos'), tipo='counter'))
+REGISTRO.adicionar(MedidorFuncao('central_cache_falhas_total', 'Falhas (ausente/expirado) do cache', ('cache',),
+                                 _estatisticas_caches('falhas'), tipo='counter'))
+REGISTRO.adicionar(MedidorFuncao('central_cache_taxa_acerto', 'Acertos / consultas desde o início', ('cache',),
+                                 _estatisticas_caches('taxa')))
+REGISTRO.adicionar(MedidorFuncao('central_cache_itens', 'Entradas no cache', ('cache',),
+                                 _estatisticas_caches('itens')))
+
+
+def registrar_upstream(metodo, url, duracao, status):
+    """Chamado pelo jira_client a cada tentativa (status None = falha de conexão)."""
+    host = urlsplit(url).netloc
+    upstream_duracao.observar(duracao, host, metodo)
+    upstream_respostas.incrementar(host, metodo, str(status) if status is not None else 'erro')
+
+
+def instrumentar(app, nome):
+    """
+    Mede todas as rotas de `app` e adiciona GET /metrics.
+    Com METRICS_TOKEN definido, /metrics exige `Authorization: Bearer <token>`.
+    """
+    # Import local: jira_client usa este módulo nos scripts, que rodam sem Flask
+    from flask import g, request, Response
+
+    token = os.environ.get('METRICS_TOKEN')
+
+    @app.before_request
+    def _inicio():
+        g._metricas_inicio = time.perf_counter()
+        g._metricas_em_andamento = True
+        http_em_andamento.incrementar(nome)
+
+    @app.after_request
+    def _fim(response):
+        inicio = g.pop('_metricas_inicio', None)
+        if inicio is None:
+            return response
+        rota = request.url_rule.rule if request.url_rule is not None else 'sem_rota'
+        http_duracao.observar(time.perf_counter() - inicio, nome, rota, request.method)
+        http_respostas.incrementar(nome, rota, request.method, str(response.status_code))
+        if not response.is_streamed and response.content_length is not None:
+            http_tamanho.observar(response.content_length, nome, rota)
+        return response
+
+    @app.teardown_request
+    def _encerrar(_erro):
+        # Executa mesmo em exceções não tratadas: o medidor nunca fica preso
+        if g.pop('_metricas_em_andamento', False):
+            http_em_andamento.decrementar(nome)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Métricas no formato texto do Prometheus"""
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('não autorizado\n', status=401, mimetype='text/plain')
+        return Response(REGISTRO.exportar(), content_type=TIPO_CONTEUDO)
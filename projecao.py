@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Projeção das respostas de busca do Jira antes de enviá-las ao navegador
+Central de Serviços - Open Finance Brasil
+
+O /rest/api/3/search devolve muito mais do que os dashboards usam: descrições
+em Atlassian Document Format (árvores JSON), avatares em quatro tamanhos,
+links `self` e metadados de `expand`. Formatos disponíveis em /api/tickets:
+  - 'reduzido' (padrão): mesma estrutura do Jira (issue.fields.status.name,
+    fields.assignee.displayName...), sem os campos que nenhuma tela lê e com a
+    descrição convertida em texto simples truncado
+  - 'compacto': um objeto plano por issue, com os nomes e conversões dos
+    exportadores (sistema_afetado, impacto, sla_*, categoria...)
+  - 'jira': resposta original, sem alterações
+"""
+import os
+import re
+
+from sync_incidentes import CAMPOS_PERSONALIZADOS as CAMPOS_INCIDENTES, extrair_sla, responsavel
+from sync_mudancas import CAMPOS_PERSONALIZADOS as CAMPOS_MUDANCAS, categoria_mudanca
+
+FORMATOS = ('reduzido', 'compacto', 'jira')
+FORMATO_PADRAO = 'reduzido'
+
+# Caracteres da descrição em texto simples (None/0 = sem limite)
+DESCRICAO_MAX = int(os.environ.get('DESCRICAO_MAX', '500'))
+
+# Chaves descartadas em qualquer nível (links da API, ícones e avatares)
+DESCARTAR = {'self', 'expand', 'avatarUrls', 'iconUrl', '_links'}
+
+# Campos mantidos nos usuários (assignee, reporter...)
+CAMPOS_USUARIO = ('accountId', 'displayName', 'emailAddress')
+
+# Campos da resposta de busca mantidos no nível de cima
+CHAVES_BUSCA = ('issues', 'total', 'startAt', 'maxResults', 'isLast', 'nextPageToken')
+
+# Id do campo no Jira -> nome no formato compacto (o mesmo dos snapshots)
+NOMES_CAMPOS = {id_campo: nome for nome, id_campo in {**CAMPOS_INCIDENTES, **CAMPOS_MUDANCAS}.items()}
+CAMPO_SLA = CAMPOS_INCIDENTES['sla']
+CAMPO_CATEGORIA = CAMPOS_MUDANCAS['categoria']
+
+# Nós ADF que terminam em quebra de linha
+BLOCOS_ADF = {'paragraph', 'heading', 'blockquote', 'codeBlock', 'listItem', 'tableRow',
+              'panel', 'rule', 'mediaSingle', 'decisionItem', 'taskItem'}
+
+_ESPACOS_FIM_LINHA = re.compile(r'[ \t]+\n')
+_LINHAS_VAZIAS = re.compile(r'\n{3,}')
+
+
+def _texto_no(no):
+    """Texto de um nó ADF folha (None para nós sem texto próprio)."""
+    tipo = no.get('type')
+    if tipo == 'text':
+        return no.get('text', '')
+    if tipo == 'hardBreak':
+        return '\n'
+    attrs = no.get('attrs') or {}
+    if tipo in ('mention', 'emoji', 'status'):
+        return attrs.get('text') or attrs.get('shortName') or ''
+    if tipo in ('inlineCard', 'blockCard', 'embedCard'):
+        return attrs.get('url') or ''
+    return None
+
+
+def truncar(texto, limite=DESCRICAO_MAX):
+    if limite and limite < 0:
+        raise ValueError('limite deve ser >= 0')
+    if limite and len(texto) > limite:
+        return texto[:limite].rstrip() + '…'
+    return texto
+
+
+def texto_adf(documento, limite=DESCRICAO_MAX):
+    """
+    Converte um documento ADF em texto simples, truncado em `limite`
+    caracteres. Para de percorrer a árvore assim que o limite é atingido.
+    Strings (API v2 / descrições já em texto) só são truncadas.
+    """
+    if limite and limite < 0:
+        raise ValueError('limite deve ser >= 0')
+    if not documento:
+        return ''
+    if isinstance(documento, str):
+        return truncar(documento, limite)
+
+    partes = []
+    tamanho = 0
+    pilha = [documento]
+    while pilha:
+        no = pilha.pop()
+        if isinstance(no, str):
+            # Fim de bloco: uma quebra só, mesmo com blocos aninhados (listItem > paragraph)
+            texto = no if partes and not partes[-1].endswith('\n') else ''
+        elif isinstance(no, dict):
+            texto = _texto_no(no)
+            filhos = no.get('content')
+            if no.get('type') in BLOCOS_ADF:
+                pilha.append('\n')
+            if isinstance(filhos, list):
+                pilha.extend(reversed(filhos))
+        else:
+            continue
+        if texto:
+            partes.append(texto)
+            tamanho += len(texto)
+            # Margem para a limpeza de espaços abaixo
+            if limite and tamanho > limite * 2:
+                break
+
+    texto = _LINHAS_VAZIAS.sub('\n\n', _ESPACOS_FIM_LINHA.sub('\n', ''.join(partes))).strip()
+    return truncar(texto, limite)
+
+
+def _adf(valor):
+    return isinstance(valor, dict) and valor.get('type') == 'doc'
+
+
+def reduzir_valor(valor, limite=DESCRICAO_MAX):
+    """Valor de um campo sem links/ícones/avatares; ADF vira texto."""
+    if isinstance(valor, list):
+        return [reduzir_valor(v, limite) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    if _adf(valor):
+        return texto_adf(valor, limite)
+    if 'accountId' in valor:
+        return {chave: valor[chave] for chave in CAMPOS_USUARIO if chave in valor}
+    return {chave: reduzir_valor(v, limite) for chave, v in valor.items() if chave not in DESCARTAR}
+
+
+def valor_compacto(valor, limite=DESCRICAO_MAX):
+    """Valor plano, como nos exportadores: usuário -> displayName, status/prioridade -> name, opção -> value."""
+    if isinstance(valor, list):
+        return [valor_compacto(v, limite) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    if _adf(valor):
+        return texto_adf(valor, limite)
+    for chave in ('displayName', 'name', 'value'):
+        if chave in valor:
+            return valor[chave]
+    return reduzir_valor(valor, limite)
+
+
+def compactar_issue(issue, limite=DESCRICAO_MAX):
+    """Issue plana com as regras dos exportadores (time solucionador, categoria pelas labels, SLA)."""
+    fields = issue.get('fields') or {}
+    item = {'key': issue.get('key')}
+    for campo, valor in fields.items():
+        if campo == CAMPO_SLA:
+            item.update(extrair_sla(valor))
+        elif campo == 'assignee':
+            item['assignee'] = responsavel(issue.get('key'), valor)
+        elif campo == CAMPO_CATEGORIA:
+            item['categoria'] = categoria_mudanca(fields)
+        else:
+            item[NOMES_CAMPOS.get(campo, campo)] = valor_compacto(valor, limite)
+    return item
+
+
+def projetar_issue(issue, formato=FORMATO_PADRAO, limite=DESCRICAO_MAX):
+    """Uma issue da API no `formato` pedido."""
+    if formato == 'jira':
+        return issue
+    if formato == 'compacto':
+        return compactar_issue(issue, limite)
+    reduzida = {'id': issue.get('id'), 'key': issue.get('key')}
+    reduzida['fields'] = {campo: reduzir_valor(valor, limite)
+                          for campo, valor in (issue.get('fields') or {}).items()}
+    return reduzida
+
+
+def projetar_issues(issues, formato=FORMATO_PADRAO, limite=DESCRICAO_MAX):
+    return [projetar_issue(issue, formato, limite) for issue in issues]
+
+
+def projetar_busca(corpo, formato=FORMATO_PADRAO, limite=DESCRICAO_MAX):
+    """Resposta de /search (ou /search/jql) no `formato` pedido."""
+    if formato == 'jira':
+        return corpo
+    projetado = {chave: corpo[chave] for chave in CHAVES_BUSCA if chave in corpo}
+    projetado['issues'] = projetar_issues(corpo.get('issues', []), formato, limite)
+    return projetado
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+Publicação dos arquivos JSON servidos pelo GitHub Pages
+Central de Serviços - Open Finance Brasil
+
+Cada arquivo publicado (ex.: dados-incidentes.json) ganha:
+  - dados-incidentes.min.json       versão compacta (sem indentação)
+  - dados-incidentes.min.json.gz    versão compacta pré-comprimida (gzip)
+  - dados-incidentes.min.json.br    idem em brotli (se o pacote estiver instalado)
+  - dados-incidentes.manifest.json  hash do conteúdo, ETag e tamanhos
+
+O hash ignora campos voláteis como `ultima_atualizacao`: se o conteúdo não
+mudou, nada é reescrito e o workflow não gera commit.
+
+Snapshots com lista de itens (ex.: 'incidentes') também recebem um número de
+versão crescente no manifesto e arquivos de delta por versão em
+deltas/<nome>/<versao>.json (chaves adicionadas, alteradas e removidas desde a
+versão anterior), mantidos para as últimas DELTAS_MAX versões. Um cliente na
+versão N aplica os deltas N+1..atual; se N for anterior ao primeiro delta
+disponível, baixa o arquivo completo.
+
+Para snapshots grandes, PublicacaoStream grava os mesmos arquivos à medida que
+os itens chegam (opcionalmente também uma variante .ndjson), com memória
+constante, e só troca os arquivos publicados no final.
+"""
+import os
+import gzip
+import json
+import hashlib
+from datetime import datetime
+
+from fluxo_json import iterar_itens
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # .br é opcional; sem o pacote publica apenas .gz
+
+CAMPOS_VOLATEIS = ('ultima_atualizacao',)
+
+# Variante NDJSON (um item por linha) dos snapshots gravados em stream
+PUBLICAR_NDJSON = os.environ.get('PUBLICAR_NDJSON', '') == '1'
+
+DIRETORIO_DELTAS = 'deltas'
+DELTAS_MAX = int(os.environ.get('DELTAS_MAX', '20'))
+
+
+def _sem_volateis(payload, ignorar):
+    if isinstance(payload, dict):
+        return {k: v for k, v in payload.items() if k not in ignorar}
+    return payload
+
+
+def hash_conteudo(payload, ignorar=CAMPOS_VOLATEIS):
+    """SHA-256 estável do payload (chaves ordenadas, sem campos voláteis)."""
+    canonico = json.dumps(_sem_volateis(payload, ignorar), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def calcular_diferenca(anteriores, atuais):
+    """Chaves adicionadas, alteradas e removidas entre duas listas de itens."""
+    antes = {i.get('key'): i for i in anteriores}
+    depois = {i.get('key'): i for i in atuais}
+    return {
+        'adicionados': [item for key, item in depois.items() if key not in antes],
+        'alterados': [item for key, item in depois.items() if key in antes and antes[key] != item],
+        'removidos': [key for key in antes if key not in depois],
+    }
+
+
+def caminhos_derivados(caminho):
+    """Arquivos derivados de `caminho`: compacto, .gz, .br e manifesto."""
+    base = caminho[:-5] if caminho.endswith('.json') else caminho
+    compacto = f'{base}.min.json'
+    return {
+        'compacto': compacto,
+        'gz': f'{compacto}.gz',
+        'br': f'{compacto}.br',
+        'manifesto': f'{base}.manifest.json',
+        'ndjson': f'{base}.ndjson',
+    }
+
+
+def carregar_manifesto(caminho):
+    """Manifesto publicado de `caminho` (dict vazio se ainda não existir)."""
+    try:
+        with open(caminhos_derivados(caminho)['manifesto'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def escrever_atomico(caminho, dados):
+    """Grava bytes em arquivo temporário e renomeia, para nunca publicar arquivo pela metade."""
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, caminho)
+
+
+def _publicar_delta(caminho, manifesto, diferenca):
+    """
+    Grava o delta da versão anterior para a nova (`diferenca` é None se não
+    houver versão anterior legível) e remove os antigos.
+    Retorna os campos de versão do manifesto.
+    """
+    versao_anterior = manifesto.get('versao', 0)
+    versao = versao_anterior + 1
+    base = os.path.basename(caminho)[:-5] if caminho.endswith('.json') else os.path.basename(caminho)
+    diretorio = os.path.join(os.path.dirname(caminho), DIRETORIO_DELTAS, base)
+
+    if versao_anterior and diferenca is not None:
+        os.makedirs(diretorio, exist_ok=True)
+        delta = {'de': versao_anterior, 'para': versao, **diferenca}
+        escrever_atomico(
+            os.path.join(diretorio, f'{versao}.json'),
+            json.dumps(delta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        )
+
+    # Mantém só as últimas DELTAS_MAX versões
+    disponiveis = []
+    if os.path.isdir(diretorio):
+        for nome in os.listdir(diretorio):
+            numero = nome[:-5]
+            if not (nome.endswith('.json') and numero.isdigit()):
+                continue
+            if int(numero) <= versao - DELTAS_MAX or int(numero) > versao:
+                os.remove(os.path.join(diretorio, nome))
+            else:
+                disponiveis.append(int(numero))
+
+    # Só vale a cadeia contínua terminando na versão atual
+    primeiro = versao + 1
+    while primeiro - 1 in disponiveis:
+        primeiro -= 1
+
+    return {
+        'versao': versao,
+        'deltas': {
+            'diretorio': f'{DIRETORIO_DELTAS}/{base}/',
+            'primeiro': primeiro if primeiro <= versao else None,
+        },
+    }
+
+
+def publicar_json(caminho, payload, ignorar=CAMPOS_VOLATEIS, extras=None, chave_lista=None):
+    """
+    Publica `payload` em `caminho` (indentado, como os dashboards já leem) e
+    nos derivados compacto/.gz/.br, atualizando o manifesto.
+    Com `chave_lista` (ex.: 'incidentes') incrementa a versão e grava o delta.
+    `extras` são campos adicionais gravados no manifesto.
+    Retorna False (sem gravar nada) se o conteúdo não mudou.
+    """
+    digest = hash_conteudo(payload, ignorar)
+    manifesto = carregar_manifesto(caminho)
+    if manifesto.get('hash') == digest and os.path.exists(caminho):
+        return False
+
+    versionamento = {}
+    if chave_lista:
+        # Antes de sobrescrever: o delta é calculado contra o arquivo atual
+        diferenca = None
+        if manifesto.get('versao'):
+            try:
+                anteriores = list(iterar_itens(caminho, chave_lista))
+                diferenca = calcular_diferenca(anteriores, payload.get(chave_lista, []))
+            except (OSError, ValueError):
+                pass
+        versionamento = _publicar_delta(caminho, manifesto, diferenca)
+
+    derivados = caminhos_derivados(caminho)
+    completo = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+    compacto = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # mtime=0 deixa o .gz determinístico (mesmo conteúdo, mesmos bytes)
+    comprimido_gz = gzip.compress(compacto, compresslevel=9, mtime=0)
+
+    escrever_atomico(caminho, completo)
+    escrever_atomico(derivados['compacto'], compacto)
+    escrever_atomico(derivados['gz'], comprimido_gz)
+
+    novo_manifesto = {
+        'arquivo': os.path.basename(caminho),
+        'hash': digest,
+        'etag': f'"{digest[:16]}"',
+        'atualizado_em': (payload.get('ultima_atualizacao') if isinstance(payload, dict) else None)
+        or datetime.now().isoformat(),
+        'bytes': len(completo),
+        'bytes_compacto': len(compacto),
+        'bytes_gz': len(comprimido_gz),
+    }
+
+    if brotli is not None:
+        comprimido_br = brotli.compress(compacto, quality=11)
+        escrever_atomico(derivados['br'], comprimido_br)
+        novo_manifesto['bytes_br'] = len(comprimido_br)
+
+    novo_manifesto.update(versionamento)
+    novo_manifesto.update(extras or {})
+    escrever_atomico(
+        derivados['manifesto'],
+        json.dumps(novo_manifesto, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8')
+    )
+    return True
+
+
+def _canonico(valor):
+    return json.dumps(valor, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def _hash_item(item):
+    return hashlib.sha256(_canonico(item).encode('utf-8')).digest()
+
+
+class PublicacaoStream:
+    """
+    Publica um snapshot {<cabecalho>, <chave_lista>: [...], "total": N} item a
+    item, gerando os mesmos arquivos e manifesto de publicar_json (inclusive o
+    mesmo hash de conteúdo) sem montar a lista em memória:
+
+        with PublicacaoStream('dados-incidentes.json', 'incidentes', cabecalho) as pub:
+            for item in itens:
+                pub.escrever(item)
+            pub.concluir()
+
+    Tudo é gravado em arquivos temporários; concluir() só troca os publicados
+    se o hash mudou. Saindo do `with` sem concluir (ex.: exceção), os
+    temporários são descartados e os arquivos publicados ficam intactos.
+    Os campos do cabecalho devem vir antes de `chave_lista` na ordem
+    alfabética ou depois de 'total', para o hash acompanhar a escrita.
+    """
+
+    def __init__(self, caminho, chave_lista, cabecalho=None, ignorar=CAMPOS_VOLATEIS, ndjson=None):
+        self.caminho = caminho
+        self.chave_lista = chave_lista
+        self.cabecalho = dict(cabecalho or {})
+        self.total = 0
+        self.derivados = caminhos_derivados(caminho)
+        self.manifesto = carregar_manifesto(caminho)
+        self._concluido = False
+
+        considerados = {k: v for k, v in self.cabecalho.items() if k not in ignorar}
+        self._hash_depois = sorted(k for k in considerados if k > chave_lista)
+        if any(chave_lista < k < 'total' for k in self._hash_depois):
+            raise ValueError(f'Campo do cabeçalho fora da ordem suportada: {self._hash_depois}')
+        antes = sorted(k for k in considerados if k < chave_lista)
+        self._considerados = considerados
+        self._hash = hashlib.sha256()
+        self._hash.update(('{' + ''.join(f'{_canonico(k)}:{_canonico(considerados[k])},' for k in antes)
+                           + f'{_canonico(chave_lista)}:[').encode('utf-8'))
+
+        # Versão anterior (key -> hash do item) para o delta, sem guardar os itens
+        self._anteriores = None
+        if self.manifesto.get('versao'):
+            try:
+                self._anteriores = {i.get('key'): _hash_item(i) for i in iterar_itens(caminho, chave_lista)}
+            except (OSError, ValueError):
+                pass
+        self._adicionados, self._alterados = [], []
+
+        self._temporarios = {}
+        self._abrir('completo', caminho)
+        self._abrir('compacto', self.derivados['compacto'])
+        self._gz = gzip.GzipFile(filename='', mode='wb', compresslevel=9, mtime=0,
+                                 fileobj=self._abrir('gz', self.derivados['gz']))
+        self._br = brotli.Compressor(quality=11) if brotli is not None else None
+        if self._br is not None:
+            self._abrir('br', self.derivados['br'])
+        if PUBLICAR_NDJSON if ndjson is None else ndjson:
+            self._abrir('ndjson', self.derivados['ndjson'])
+        self.bytes = dict.fromkeys(self._temporarios, 0)
+
+        inicio = ''.join(f'\n  {json.dumps(k, ensure_ascii=False)}: {self._indentar(v, 2)},'
+                         for k, v in self.cabecalho.items())
+        self._gravar('completo', '{' + inicio + f'\n  {json.dumps(chave_lista, ensure_ascii=False)}: [')
+        self._gravar_compacto('{' + ''.join(f'{json.dumps(k, ensure_ascii=False)}:{self._compacto(v)},'
+                                            for k, v in self.cabecalho.items())
+                              + f'{json.dumps(chave_lista, ensure_ascii=False)}:[')
+
+    def _abrir(self, nome, destino):
+        temporario = f'{destino}.tmp'
+        self._temporarios[nome] = (open(temporario, 'wb'), temporario, destino)
+        return self._temporarios[nome][0]
+
+    @staticmethod
+    def _compacto(valor):
+        return json.dumps(valor, ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _indentar(valor, nivel):
+        # Mesmo formato de json.dumps(payload, indent=2) para um valor aninhado
+        return json.dumps(valor, ensure_ascii=False, indent=2).replace('\n', '\n' + ' ' * nivel)
+
+    def _gravar(self, nome, texto):
+        dados = texto.encode('utf-8')
+        self._temporarios[nome][0].write(dados)
+        self.bytes[nome] += len(dados)
+
+    def _gravar_compacto(self, texto):
+        dados = texto.encode('utf-8')
+        self._temporarios['compacto'][0].write(dados)
+        self.bytes['compacto'] += len(dados)
+        self._gz.write(dados)
+        if self._br is not None:
+            comprimido = self._br.process(dados)
+            self._temporarios['br'][0].write(comprimido)
+            self.bytes['br'] += len(comprimido)
+
+    def escrever(self, item):
+        separador = ',' if self.total else ''
+        self._gravar('completo', f'{separador}\n    {self._indentar(item, 4)}')
+        self._gravar_compacto(separador + self._compacto(item))
+        if 'ndjson' in self._temporarios:
+            self._gravar('ndjson', self._compacto(item) + '\n')
+        self._hash.update((separador + _canonico(item)).encode('utf-8'))
+
+        if self._anteriores is not None:
+            anterior = self._anteriores.pop(item.get('key'), None)
+            if anterior is None:
+                self._adicionados.append(item)
+            elif anterior != _hash_item(item):
+                self._alterados.append(item)
+        self.total += 1
+
+    def escrever_todos(self, itens):
+        for item in itens:
+            self.escrever(item)
+
+    def concluir(self):
+        """Fecha a lista e publica. Retorna False (sem trocar nada) se o conteúdo não mudou."""
+        self._gravar('completo', ('\n  ]' if self.total else ']') + f',\n  "total": {self.total}\n}}')
+        self._gravar_compacto(f'],"total":{self.total}}}')
+        depois = ''.join(f',{_canonico(k)}:{_canonico(self._considerados[k])}' for k in self._hash_depois)
+        self._hash.update(f'],"total":{self.total}{depois}}}'.encode('utf-8'))
+        digest = self._hash.hexdigest()
+
+        self._gz.close()
+        if self._br is not None:
+            final = self._br.finish()
+            self._temporarios['br'][0].write(final)
+            self.bytes['br'] += len(final)
+        for f, _, _ in self._temporarios.values():
+            f.close()
+        self.bytes['gz'] = os.path.getsize(self._temporarios['gz'][1])
+
+        if self.manifesto.get('hash') == digest and os.path.exists(self.caminho):
+            self.descartar()
+            return False
+
+        diferenca = None
+        if self._anteriores is not None:
+            diferenca = {'adicionados': self._adicionados, 'alterados': self._alterados,
+                         'removidos': list(self._anteriores)}
+        versionamento = _publicar_delta(self.caminho, self.manifesto, diferenca)
+
+        # Mesma ordem de publicar_json: manifesto por último
+        for _, temporario, destino in self._temporarios.values():
+            os.replace(temporario, destino)
+        self._concluido = True
+
+        novo_manifesto = {
+            'arquivo': os.path.basename(self.caminho),
+            'hash': digest,
+            'etag': f'"{digest[:16]}"',
+            'atualizado_em': self.cabecalho.get('ultima_atualizacao') or datetime.now().isoformat(),
+            'bytes': self.bytes['completo'],
+            'bytes_compacto': self.bytes['compacto'],
+            'bytes_gz': self.bytes['gz'],
+        }
+        if 'br' in self.bytes:
+            novo_manifesto['bytes_br'] = self.bytes['br']
+        if 'ndjson' in self.bytes:
+            novo_manifesto['bytes_ndjson'] = self.bytes['ndjson']
+        novo_manifesto.update(versionamento)
+        escrever_atomico(
+            self.derivados['manifesto'],
+            json.dumps(novo_manifesto, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8')
+        )
+        return True
+
+    def descartar(self):
+        """Remove os temporários sem publicar (nada acontece se já concluído)."""
+        if self._concluido:
+            return
+        self._concluido = True
+        self._gz.close()
+        for f, temporario, _ in self._temporarios.values():
+            f.close()
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.descartar()
+        return False
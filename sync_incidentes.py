@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Sincronização incremental de incidentes do Jira
+Central de Serviços - Open Finance Brasil
+
+Em vez de baixar todos os incidentes do projeto a cada execução, usa a maior
+data de `updated` já presente em dados-incidentes.json como marca d'água e
+busca apenas os incidentes alterados desde então. As alterações são mescladas
+no snapshot existente pela `key` e o arquivo só é reescrito se algo mudou.
+O snapshot é lido e gravado em stream (fluxo_json / PublicacaoStream): na
+busca completa cada página é gravada assim que chega.
+"""
+import os
+import sys
+import math
+import heapq
+import argparse
+from datetime import datetime, timezone
+
+from requests.auth import HTTPBasicAuth
+
+import jira_client
+from fluxo_json import iterar_itens
+from publicacao import PublicacaoStream
+
+# Carregar variáveis de ambiente (localmente usa .env, no GitHub Actions usa Secrets)
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+ARQUIVO_SAIDA = 'dados-incidentes.json'
+
+TIPOS_INCIDENTE = ('[System] Incidente', 'Incidente')
+
+FILTRO_TIPOS = 'issuetype in ("[System] Incidente", "Incidente")'
+
+JQL_BASE = f'project = OFBI AND {FILTRO_TIPOS}'
+
+# Campos personalizados (nome no JSON publicado -> id no Jira)
+CAMPOS_PERSONALIZADOS = {
+    'sistema_afetado': 'customfield_10238',
+    'impacto': 'customfield_10248',
+    'sla': 'customfield_10096',  # SLA Tempo de resolução
+}
+
+CAMPOS = ['summary', 'status', 'created', 'updated', 'assignee', 'reporter', 'priority', 'labels', 'resolutiondate',
+          *CAMPOS_PERSONALIZADOS.values()]
+
+# Margem de segurança (minutos) somada à janela incremental para cobrir
+# diferenças de relógio e issues atualizadas durante a execução anterior
+MARGEM_MINUTOS = 10
+
+FORMATO_DATA_JIRA = '%Y-%m-%dT%H:%M:%S.%f%z'
+
+# Override manual de Time Solucionador (sobrepõe o assignee real do Jira)
+TIME_SOLUCIONADOR_OVERRIDE = {
+    'OFBI-4933': 'Arquitetura',
+    'OFBI-4715': 'Integração Digital',
+    'OFBI-4710': 'Arquitetura e Plataforma',
+    'OFBI-4707': 'Segurança',
+    'OFBI-4695': 'Segurança',
+}
+
+
+def parse_data_jira(valor):
+    """Converte datas no formato do Jira (2026-08-21T19:30:09.568-0300) em datetime."""
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, FORMATO_DATA_JIRA)
+    except ValueError:
+        return None
+
+
+def extrair_sla(sla):
+    """
+    Resumo do campo de SLA do Jira Service Management: ciclo em andamento
+    ou, se não houver, o último ciclo concluído.
+    """
+    sla_breached = False
+    sla_breach_time = None
+    sla_elapsed = None
+    sla_remaining = None
+    sla = sla or {}
+    ongoing = sla.get('ongoingCycle') or {}
+    if ongoing:
+        sla_breached = ongoing.get('breached', False)
+        bt = ongoing.get('breachTime') or {}
+        sla_breach_time = bt.get('jira')
+        et = ongoing.get('elapsedTime') or {}
+        sla_elapsed = et.get('friendly')
+        rt = ongoing.get('remainingTime') or {}
+        sla_remaining = rt.get('friendly')
+    else:
+        completed = sla.get('completedCycles') or []
+        if completed:
+            last = completed[-1]
+            sla_breached = last.get('breached', False)
+            bt = last.get('breachTime') or {}
+            sla_breach_time = bt.get('jira')
+            et = last.get('elapsedTime') or {}
+            sla_elapsed = et.get('friendly')
+
+    return {
+        'sla_breached': sla_breached,
+        'sla_breach_time': sla_breach_time,
+        'sla_elapsed': sla_elapsed,
+        'sla_remaining': sla_remaining,
+    }
+
+
+def responsavel(key, assignee):
+    """Time solucionador: o do TIME_SOLUCIONADOR_OVERRIDE ou o responsável no Jira."""
+    return TIME_SOLUCIONADOR_OVERRIDE.get(key, (assignee or {}).get('displayName', 'Sem responsável'))
+
+
+def normalizar_incidente(issue):
+    """Converte uma issue da API do Jira no formato publicado em dados-incidentes.json."""
+    key = issue.get('key')
+    fields = issue.get('fields', {})
+
+    assignee = fields.get('assignee') or {}
+    reporter = fields.get('reporter') or {}
+    priority = fields.get('priority') or {}
+    status = fields.get('status') or {}
+
+    # Sistema Afetado
+    sistema = fields.get(CAMPOS_PERSONALIZADOS['sistema_afetado']) or {}
+    sistema_afetado = sistema.get('value', '') if isinstance(sistema, dict) else ''
+
+    # Impacto
+    impacto_obj = fields.get(CAMPOS_PERSONALIZADOS['impacto']) or {}
+    impacto = impacto_obj.get('value', '') if isinstance(impacto_obj, dict) else ''
+
+    return {
+        'key': key,
+        'summary': fields.get('summary', ''),
+        'sistema_afetado': sistema_afetado,
+        'impacto': impacto,
+        'status': status.get('name', ''),
+        'priority': priority.get('name', ''),
+        'assignee': responsavel(key, assignee),
+        'reporter': reporter.get('displayName', ''),
+        'created': fields.get('created', ''),
+        'updated': fields.get('updated', ''),
+        'resolutiondate': fields.get('resolutiondate', None),
+        'labels': fields.get('labels', []),
+        **extrair_sla(fields.get(CAMPOS_PERSONALIZADOS['sla'])),
+    }
+
+
+def calcular_marca_dagua(incidentes):
+    """Maior `updated` entre os incidentes do snapshot (None se não houver nenhum)."""
+    datas = (parse_data_jira(i.get('updated')) for i in incidentes)
+    return max((d for d in datas if d), default=None)
+
+
+def filtro_janela(marca_dagua, agora=None):
+    """
+    Condição `updated >= -Nm` a partir da marca d'água: o valor relativo é
+    avaliado pelo Jira e não depende do fuso horário configurado no perfil do
+    usuário da integração.
+    """
+    agora = agora or datetime.now(timezone.utc)
+    minutos = math.ceil((agora - marca_dagua).total_seconds() / 60) + MARGEM_MINUTOS
+    minutos = max(minutos, MARGEM_MINUTOS)
+    return f'updated >= -{minutos}m'
+
+
+def montar_jql(marca_dagua=None, agora=None):
+    """JQL da sincronização: completa sem marca d'água, incremental com ela."""
+    if marca_dagua is None:
+        return f'{JQL_BASE} ORDER BY created DESC'
+    return f'{JQL_BASE} AND {filtro_janela(marca_dagua, agora)} ORDER BY updated ASC'
+
+
+def buscar_issues(jira_url, auth, jql, campos=CAMPOS, max_results=100):
+    """Percorre todas as páginas de /rest/api/3/search/jql seguindo o nextPageToken."""
+    issues = []
+    for pagina in jira_client.paginar_busca(jira_url, auth, jql, campos, max_results):
+        issues.extend(pagina)
+    return issues
+
+
+def _ordem(incidente):
+    return (incidente.get('created') or '', incidente['key'])
+
+
+def mesclar(existentes, alterados):
+    """
+    Mescla incidentes alterados no snapshot pela `key`, mantendo a ordenação
+    original (created DESC) usada pelos dashboards.
+    """
+    por_chave = {i['key']: i for i in existentes}
+    for incidente in alterados:
+        por_chave[incidente['key']] = incidente
+    return sorted(por_chave.values(), key=_ordem, reverse=True)
+
+
+def mesclar_stream(existentes, alterados):
+    """
+    Como `mesclar`, mas percorrendo `existentes` (já em created DESC) uma vez,
+    sem carregá-los: só os alterados ficam em memória.
+    """
+    alterados = mesclar([], alterados)
+    chaves = {i['key'] for i in alterados}
+    return heapq.merge(alterados, (i for i in existentes if i['key'] not in chaves), key=_ordem, reverse=True)
+
+
+def preparar(caminho=ARQUIVO_SAIDA, completo=False):
+    """
+    Marca d'água da próxima busca. Com `completo=True` (ou sem snapshot
+    anterior) é None: a busca é refeita inteira, o que também remove do
+    snapshot issues excluídas ou movidas de projeto no Jira.
+    """
+    if completo:
+        return None
+    try:
+        return calcular_marca_dagua(iterar_itens(caminho, 'incidentes'))
+    except (OSError, ValueError):
+        return None
+
+
+def nova_publicacao(caminho=ARQUIVO_SAIDA):
+    return PublicacaoStream(caminho, 'incidentes', {'ultima_atualizacao': datetime.now().isoformat()})
+
+
+def publicar(caminho, alterados, marca_dagua):
+    """
+    Grava o snapshot com os incidentes buscados. Na busca completa `alterados`
+    já vem em created DESC (ordem da JQL) e é gravado conforme é consumido.
+    Retorna (publicado, total); publicado é False se o conteúdo não mudou.
+    """
+    with nova_publicacao(caminho) as publicacao:
+        if marca_dagua is None:
+            publicacao.escrever_todos(alterados)
+        else:
+            publicacao.escrever_todos(mesclar_stream(iterar_itens(caminho, 'incidentes'), alterados))
+        return publicacao.concluir(), publicacao.total
+
+
+def sincronizar(jira_url, auth, caminho=ARQUIVO_SAIDA, completo=False):
+    """Executa a sincronização e retorna (publicado, total)."""
+    marca_dagua = preparar(caminho, completo)
+    jql = montar_jql(marca_dagua)
+    print(f'JQL: {jql}')
+
+    alterados = (normalizar_incidente(issue)
+                 for pagina in jira_client.paginar_busca(jira_url, auth, jql, CAMPOS)
+                 for issue in pagina)
+    return publicar(caminho, alterados, marca_dagua)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sincroniza incidentes do Jira com dados-incidentes.json')
+    parser.add_argument('--completo', action='store_true', help='Ignora a marca d\'água e refaz a busca completa')
+    parser.add_argument('--saida', default=ARQUIVO_SAIDA, help='Arquivo de snapshot (padrão: %(default)s)')
+    args = parser.parse_args()
+
+    jira_url = os.getenv('JIRA_URL')
+    jira_email = os.getenv('JIRA_EMAIL')
+    jira_token = os.getenv('JIRA_API_TOKEN')
+
+    if not jira_url or not jira_email or not jira_token:
+        print('Erro: Credenciais do Jira não configuradas.')
+        sys.exit(1)
+
+    print('Buscando incidentes do Jira...')
+    try:
+        publicado, total = sincronizar(jira_url, HTTPBasicAuth(jira_email, jira_token), args.saida, args.completo)
+    except jira_client.ErroJira as e:
+        print(f'✗ {e}')
+        sys.exit(1)
+
+    # Com hash igual ao do manifesto nada é regravado
+    if not publicado:
+        print(f'= Nenhuma alteração desde a última sincronização ({total} incidentes)')
+        return
+
+    print(f'✓ {total} incidentes exportados para {args.saida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação de mudanças do Jira
+Central de Serviços - Open Finance Brasil
+
+Busca as mudanças do projeto OFBI criadas ou atualizadas nos últimos 90 dias
+e publica dados-mudancas.json (mesmo formato lido pelos dashboards), gravando
+cada página assim que chega.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+from requests.auth import HTTPBasicAuth
+
+import jira_client
+from publicacao import PublicacaoStream
+from sync_incidentes import parse_data_jira
+
+# Carregar variáveis de ambiente (localmente usa .env, no GitHub Actions usa Secrets)
+try:
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+except ImportError:
+    pass
+
+ARQUIVO_SAIDA = 'dados-mudancas.json'
+
+TIPOS_MUDANCA = ('[System] Mudança', 'Mudança', 'Change')
+
+# Mudanças criadas ou atualizadas nos últimos DIAS_JANELA dias
+DIAS_JANELA = 90
+
+FILTRO = f'type in ("[System] Mudança", "Mudança", "Change") AND (created >= -{DIAS_JANELA}d OR updated >= -{DIAS_JANELA}d)'
+
+JQL = f'project = OFBI AND {FILTRO} ORDER BY created DESC'
+
+# Campos personalizados (nome no JSON publicado -> id no Jira)
+CAMPOS_PERSONALIZADOS = {
+    'causouIncidente': 'customfield_11073',
+    'categoria': 'customfield_11106',
+}
+
+CAMPOS = ['summary', 'status', 'created', 'updated', 'assignee', 'reporter', 'priority', 'labels',
+          *CAMPOS_PERSONALIZADOS.values()]
+
+
+def categoria_mudanca(fields):
+    """Categoria da mudança: o campo personalizado ou, se vazio, inferida das labels."""
+    categoria = fields.get(CAMPOS_PERSONALIZADOS['categoria'], {})
+    categoria_value = categoria.get('value', '') if categoria else ''
+
+    # Se não tem categoria, tentar inferir das labels
+    if not categoria_value:
+        labels = fields.get('labels') or []
+        if 'tipo:emergencial' in labels:
+            categoria_value = 'Emergencial'
+        elif 'tipo:planejada' in labels:
+            categoria_value = 'Planejada'
+        elif 'tipo:normal' in labels:
+            categoria_value = 'Normal'
+    return categoria_value
+
+
+def normalizar_mudanca(issue):
+    """Converte uma issue da API do Jira no formato publicado em dados-mudancas.json."""
+    key = issue.get('key')
+    fields = issue.get('fields', {})
+
+    assignee = fields.get('assignee', {})
+    reporter = fields.get('reporter', {})
+    priority = fields.get('priority', {})
+    status = fields.get('status', {})
+
+    return {
+        'key': key,
+        'summary': fields.get('summary', ''),
+        'status': status.get('name', '') if status else '',
+        'priority': priority.get('name', '') if priority else '',
+        'assignee': assignee.get('displayName', 'Sem responsável') if assignee else 'Sem responsável',
+        'reporter': reporter.get('displayName', '') if reporter else '',
+        'created': fields.get('created', ''),
+        'updated': fields.get('updated', ''),
+        'labels': fields.get('labels', []),
+        'causouIncidente': fields.get(CAMPOS_PERSONALIZADOS['causouIncidente'], False),
+        'categoria': categoria_mudanca(fields),
+    }
+
+
+def na_janela(mudanca, agora=None):
+    """Se a mudança (já normalizada) foi criada ou atualizada dentro da janela."""
+    limite = (agora or datetime.now().astimezone()) - timedelta(days=DIAS_JANELA)
+    for campo in ('created', 'updated'):
+        data = parse_data_jira(mudanca.get(campo))
+        if data and data >= limite:
+            return True
+    return False
+
+
+def nova_publicacao(caminho=ARQUIVO_SAIDA):
+    return PublicacaoStream(caminho, 'mudancas', {'ultima_atualizacao': datetime.now().isoformat()})
+
+
+def exportar(jira_url, auth, caminho=ARQUIVO_SAIDA):
+    """Busca todas as mudanças da janela e publica. Retorna (publicado, total)."""
+    with nova_publicacao(caminho) as publicacao:
+        for pagina in jira_client.paginar_busca(jira_url, auth, JQL, CAMPOS):
+            publicacao.escrever_todos(normalizar_mudanca(issue) for issue in pagina)
+        return publicacao.concluir(), publicacao.total
+
+
+def main():
+    jira_url = os.getenv('JIRA_URL')
+    jira_email = os.getenv('JIRA_EMAIL')
+    jira_token = os.getenv('JIRA_API_TOKEN')
+
+    if not jira_url or not jira_email or not jira_token:
+        print('Erro: Credenciais do Jira não configuradas.')
+        sys.exit(1)
+
+    print('Buscando dados do Jira...')
+    try:
+        publicado, total = exportar(jira_url, HTTPBasicAuth(jira_email, jira_token))
+    except jira_client.ErroJira as e:
+        print(f'✗ {e}')
+        sys.exit(1)
+
+    if publicado:
+        print(f'✓ {total} mudanças exportadas para {ARQUIVO_SAIDA}')
+    else:
+        print(f'= Nenhuma alteração nas {total} mudanças')
+
+
+if __name__ == '__main__':
+    main()
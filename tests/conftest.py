@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração dos testes
+Central de Serviços - Open Finance Brasil
+
+Os módulos ficam na raiz do repositório (scripts avulsos, sem pacote
+instalável): a raiz entra no sys.path para os testes importarem-nos.
+"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
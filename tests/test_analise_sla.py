@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da análise de SLA e MTTR
+Central de Serviços - Open Finance Brasil
+"""
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from analise_sla import COLUNAS, VAZIO, analisar, carregar, preparar
+
+AGORA = datetime(2026, 7, 15, 12, 0, tzinfo=timezone.utc)
+
+INCIDENTES = [
+    # Resolvido em 10h, dentro do prazo
+    {'key': 'OFBI-1', 'status': 'Resolvido', 'priority': 'High', 'assignee': 'Ana', 'sistema_afetado': 'PIX',
+     'created': '2026-07-06T09:00:00.000-0300', 'resolutiondate': '2026-07-06T19:00:00.000-0300',
+     'sla_breach_time': '2026-07-07T09:00:00.000-0300', 'sla_breached': False},
+    # Resolvido em 30h, depois do prazo (violado sem a marcação do Jira)
+    {'key': 'OFBI-2', 'status': 'Resolvido', 'priority': 'Low', 'assignee': 'Ana', 'sistema_afetado': 'PIX',
+     'created': '2026-07-07T09:00:00.000-0300', 'resolutiondate': '2026-07-08T15:00:00.000-0300',
+     'sla_breach_time': '2026-07-08T09:00:00.000-0300', 'sla_breached': False},
+    # Aberto com prazo vencido
+    {'key': 'OFBI-3', 'status': 'Em atendimento', 'priority': 'High', 'assignee': '', 'sistema_afetado': None,
+     'created': '2026-07-13T09:00:00.000-0300', 'resolutiondate': None,
+     'sla_breach_time': '2026-07-14T09:00:00.000-0300', 'sla_breached': None},
+    # Aberto, vence em 6h
+    {'key': 'OFBI-4', 'status': 'Em atendimento', 'priority': 'Medium', 'assignee': 'Bia', 'sistema_afetado': 'DCR',
+     'created': '2026-07-15T06:00:00.000-0300', 'resolutiondate': None,
+     'sla_breach_time': '2026-07-15T15:00:00.000-0300', 'sla_breached': False},
+    # Cancelado sem resolução: não conta como aberto
+    {'key': 'OFBI-5', 'status': 'Cancelado', 'priority': 'Low', 'assignee': 'Bia', 'sistema_afetado': 'DCR',
+     'created': '2026-07-14T09:00:00.000-0300', 'resolutiondate': None,
+     'sla_breach_time': None, 'sla_breached': False},
+]
+
+
+@pytest.fixture
+def df():
+    return preparar(pd.DataFrame.from_records([[i.get(c) for c in COLUNAS] for i in INCIDENTES],
+                                              columns=list(COLUNAS)))
+
+
+def test_preparar_converte_datas_e_normaliza_grupos(df):
+    assert str(df['created'].dt.tz) == 'UTC'
+    assert list(df['aberto']) == [False, False, True, True, False]
+    assert df.loc[2, 'assignee'] == VAZIO
+    assert df.loc[2, 'sistema_afetado'] == VAZIO
+    assert df['mttr_horas'].tolist()[:2] == [10.0, 30.0]
+
+
+def test_sla_em_relacao_ao_momento_da_execucao(df):
+    resultado = analisar(df, AGORA)
+
+    assert resultado['sla'] == {
+        'com_prazo': 4,
+        'violados': 2,
+        'taxa_violacao': 0.4,
+        'abertos': 2,
+        'abertos_violados': 1,
+        'abertos_vencem_24h': 1,
+    }
+    assert resultado['abertos'] == [
+        {'key': 'OFBI-3', 'prazo': '2026-07-14T09:00:00-0300', 'violado': True},
+        {'key': 'OFBI-4', 'prazo': '2026-07-15T15:00:00-0300', 'violado': False},
+    ]
+
+
+def test_percentis_de_mttr(df):
+    mttr = analisar(df, AGORA)['mttr_horas']
+
+    assert mttr['geral']['n'] == 2
+    assert mttr['geral']['media'] == 20.0
+    assert mttr['geral']['p50'] == 20.0
+    assert mttr['geral']['p90'] == 28.0
+    assert mttr['por_prioridade']['High'] == {'n': 1, 'media': 10.0, 'p50': 10.0, 'p90': 10.0, 'p99': 10.0}
+    assert set(mttr['por_sistema']) == {'PIX'}
+
+
+def test_tendencia_semanal(df):
+    semanas = {s['semana']: s for s in analisar(df, AGORA)['tendencia_semanal']}
+
+    # Semanas começando na segunda-feira (horário de Brasília)
+    assert semanas['2026-07-06'] == {'semana': '2026-07-06', 'abertos': 2, 'violados': 1,
+                                     'resolvidos': 2, 'mttr_p50_horas': 20.0}
+    assert semanas['2026-07-13'] == {'semana': '2026-07-13', 'abertos': 3, 'violados': 1,
+                                     'resolvidos': 0, 'mttr_p50_horas': None}
+
+
+def test_sem_incidentes():
+    vazio = preparar(pd.DataFrame(columns=list(COLUNAS)))
+    resultado = analisar(vazio, AGORA)
+
+    assert resultado['total'] == 0
+    assert resultado['sla']['taxa_violacao'] == 0
+    assert resultado['mttr_horas']['geral']['p50'] is None
+    assert resultado['abertos'] == []
+
+
+def test_carregar_le_o_snapshot(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    caminho.write_text(json.dumps({'ultima_atualizacao': '2026-07-15T09:00:00', 'incidentes': INCIDENTES,
+                                   'total': len(INCIDENTES)}), encoding='utf-8')
+
+    df, ultima_atualizacao = carregar(str(caminho))
+    assert ultima_atualizacao == '2026-07-15T09:00:00'
+    assert df['key'].tolist() == [i['key'] for i in INCIDENTES]
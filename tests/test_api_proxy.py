@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das rotas do proxy da API do Jira
+Central de Serviços - Open Finance Brasil
+"""
+import json
+import time
+import threading
+
+import pytest
+
+import api_proxy
+import cache_ttl
+import indice_dados
+import jira_client
+
+ISSUE = {'id': '10', 'key': 'OFBI-1', 'self': 'https://api/issue/10',
+         'fields': {'summary': 'Falha no PIX', 'status': {'name': 'Aberto', 'iconUrl': 'https://icone'}}}
+
+
+@pytest.fixture
+def cliente():
+    api_proxy.tickets_cache.invalidar()
+    api_proxy.credenciais_cache.invalidar()
+    return api_proxy.app.test_client()
+
+
+class BuscaFake:
+    """Busca falsa no Jira: guarda as chamadas; `erros` é uma fila de ErroJira a levantar."""
+
+    def __init__(self):
+        self.chamadas = []
+        self.erros = []
+        self.liberar = threading.Event()
+        self.liberar.set()
+
+    def __call__(self, jira_url, auth, jql, campos, max_results=100, next_page_token=None):
+        self.chamadas.append((auth.username, jql, ','.join(campos), next_page_token))
+        self.liberar.wait(5)
+        if self.erros:
+            raise self.erros.pop(0)
+        return {'issues': [ISSUE], 'isLast': True}
+
+
+@pytest.fixture
+def busca(monkeypatch):
+    busca = BuscaFake()
+    monkeypatch.setattr(jira_client, 'buscar_pagina', busca)
+    return busca
+
+
+def post_tickets(cliente, **corpo):
+    return cliente.post('/api/tickets', json={'email': 'ana@exemplo', 'token': 't0k3n', **corpo})
+
+
+@pytest.mark.parametrize('valor, erro', [
+    (-5, 'descricao_max deve ser >= 0'),
+    ('abc', 'descricao_max deve ser um número'),
+])
+def test_descricao_max_invalida(cliente, valor, erro):
+    resposta = post_tickets(cliente, descricao_max=valor)
+    assert resposta.status_code == 400
+    assert resposta.get_json() == {'error': erro}
+
+
+def test_tickets_repetidos_saem_do_cache(cliente, busca):
+    primeira = post_tickets(cliente)
+    segunda = post_tickets(cliente)
+
+    assert primeira.status_code == segunda.status_code == 200
+    assert primeira.get_json() == segunda.get_json()
+    assert primeira.get_json()['issues'][0]['fields']['status'] == {'name': 'Aberto'}
+    assert len(busca.chamadas) == 1
+
+
+@pytest.mark.parametrize('variacao', [
+    {'token': 'outro-token'},
+    {'email': 'bia@exemplo'},
+    {'project': '106'},
+    {'fields': 'summary'},
+    {'formato': 'compacto'},
+    {'descricao_max': 10},
+    {'nextPageToken': 'pagina-2'},
+])
+def test_chave_do_cache_distingue_cada_parametro(cliente, busca, variacao):
+    assert post_tickets(cliente).status_code == 200
+    assert post_tickets(cliente, **variacao).status_code == 200
+    assert post_tickets(cliente, **variacao).status_code == 200
+
+    assert len(busca.chamadas) == 2
+
+
+def test_chave_do_cache_nao_guarda_o_token(cliente, busca):
+    post_tickets(cliente)
+
+    chave, = api_proxy.tickets_cache._dados
+    assert 't0k3n' not in repr(chave)
+    assert chave[0] == api_proxy.fingerprint_credenciais('ana@exemplo', 't0k3n')
+
+
+def test_requisicoes_simultaneas_fazem_uma_busca(busca):
+    api_proxy.tickets_cache.invalidar()
+    busca.liberar.clear()
+    respostas = []
+
+    def requisitar():
+        respostas.append(post_tickets(api_proxy.app.test_client()).status_code)
+    threads = [threading.Thread(target=requisitar) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    # As demais chegam enquanto a primeira busca está em andamento
+    time.sleep(0.2)
+    busca.liberar.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert respostas == [200] * 5
+    assert len(busca.chamadas) == 1
+
+
+def test_erros_do_jira_nao_ficam_em_cache(cliente, busca):
+    busca.erros.append(jira_client.ErroJira(503, 'fora do ar'))
+
+    assert post_tickets(cliente).status_code == 503
+    assert post_tickets(cliente).status_code == 200
+    assert len(busca.chamadas) == 2
+
+
+class RespostaFake:
+    def __init__(self, status_code, corpo=None):
+        self.status_code = status_code
+        self.corpo = corpo or {}
+
+    def json(self):
+        return self.corpo
+
+
+class MyselfFake:
+    """/myself falso: 200 para o token 'valido', 401 para os demais; `status` força outra resposta."""
+
+    def __init__(self):
+        self.chamadas = []
+        self.status = None
+
+    def __call__(self, url, auth=None, headers=None):
+        self.chamadas.append(auth.password)
+        if self.status:
+            return RespostaFake(self.status)
+        if auth.password != 'valido':
+            return RespostaFake(401)
+        return RespostaFake(200, {'displayName': 'Ana', 'emailAddress': auth.username,
+                                  'avatarUrls': {'48x48': 'https://avatar'}})
+
+
+@pytest.fixture
+def myself(monkeypatch):
+    myself = MyselfFake()
+    monkeypatch.setattr(jira_client, 'get', myself)
+    return myself
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado do cache (time.monotonic)."""
+    agora = [1000.0]
+    monkeypatch.setattr(cache_ttl.time, 'monotonic', lambda: agora[0])
+    return agora
+
+
+def validar(cliente, token):
+    return cliente.post('/api/validate', json={'email': 'ana@exemplo', 'token': token})
+
+
+def test_validacao_em_cache_pela_impressao_digital(cliente, myself):
+    assert validar(cliente, 'valido').get_json()['user']['displayName'] == 'Ana'
+    assert validar(cliente, 'valido').status_code == 200
+    assert myself.chamadas == ['valido']
+
+    # Outro token, outra entrada; nenhuma chave guarda o token
+    assert validar(cliente, 'errado').status_code == 401
+    assert myself.chamadas == ['valido', 'errado']
+    assert not any('valido' in chave or 'errado' in chave for chave in api_proxy.credenciais_cache._dados)
+
+
+def test_recusa_fica_em_cache_por_menos_tempo(cliente, myself, relogio):
+    assert validar(cliente, 'valido').status_code == 200
+    assert validar(cliente, 'errado').status_code == 401
+    assert validar(cliente, 'errado').status_code == 401
+    assert myself.chamadas == ['valido', 'errado']
+
+    relogio[0] += api_proxy.VALIDACAO_NEGATIVA_TTL + 1
+    assert validar(cliente, 'errado').status_code == 401
+    assert validar(cliente, 'valido').status_code == 200
+    assert myself.chamadas == ['valido', 'errado', 'errado']
+
+    relogio[0] += api_proxy.credenciais_cache.ttl
+    assert validar(cliente, 'valido').status_code == 200
+    assert myself.chamadas == ['valido', 'errado', 'errado', 'valido']
+
+
+def test_erro_do_jira_nao_fica_em_cache(cliente, myself):
+    myself.status = 503
+    assert validar(cliente, 'valido').status_code == 503
+    myself.status = None
+    assert validar(cliente, 'valido').status_code == 200
+    assert myself.chamadas == ['valido', 'valido']
+
+
+def test_credenciais_recusadas_nem_chegam_ao_jira(cliente, myself, busca):
+    assert validar(cliente, 'errado').status_code == 401
+    acertos, falhas = api_proxy.credenciais_cache.acertos, api_proxy.credenciais_cache.falhas
+
+    resposta = post_tickets(cliente, token='errado')
+    assert resposta.status_code == 401
+    assert busca.chamadas == []
+    # A checagem não conta nas métricas do cache
+    assert (api_proxy.credenciais_cache.acertos, api_proxy.credenciais_cache.falhas) == (acertos, falhas)
+
+
+def test_401_na_busca_registra_a_recusa(cliente, myself, busca):
+    busca.erros.append(jira_client.ErroJira(401, 'Unauthorized'))
+
+    assert post_tickets(cliente, token='revogado').status_code == 401
+    assert validar(cliente, 'revogado').status_code == 401
+    assert myself.chamadas == []
+
+
+def gravar_incidentes(caminho, *keys):
+    itens = [{'key': key, 'created': '2026-07-01T10:00:00.000-0300', 'summary': key} for key in keys]
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'ultima_atualizacao': '2026-07-31T00:00:00', 'incidentes': itens}, f)
+
+
+@pytest.fixture
+def sse(tmp_path, monkeypatch):
+    """Índice de incidentes sobre um snapshot temporário, com conexões SSE curtas."""
+    monkeypatch.setattr(indice_dados, 'INTERVALO_VERIFICACAO', 0)
+    monkeypatch.setattr(api_proxy, 'INTERVALO_SSE', 0.02)
+    monkeypatch.setattr(api_proxy, 'DURACAO_MAX_SSE', 0.2)
+    caminho = str(tmp_path / 'dados-incidentes.json')
+    gravar_incidentes(caminho, 'OFBI-1')
+    indice = indice_dados.IndiceDataset(caminho, 'incidentes')
+    monkeypatch.setitem(api_proxy.indices, 'incidentes', indice)
+    return indice
+
+
+def eventos(resposta):
+    """Blocos do stream SSE como dicts ('event', 'id', 'data' já decodificado, 'retry')."""
+    blocos = []
+    for bloco in resposta.get_data(as_text=True).split('\n\n'):
+        if not bloco:
+            continue
+        campos = dict(linha.split(': ', 1) for linha in bloco.split('\n'))
+        if 'data' in campos:
+            campos['data'] = json.loads(campos['data'])
+        blocos.append(campos)
+    return blocos
+
+
+def test_stream_envia_snapshot_e_encerra_apos_a_duracao_maxima(cliente, sse):
+    inicio = time.monotonic()
+    resposta = cliente.get('/api/stream/incidentes')
+    blocos = eventos(resposta)
+
+    assert resposta.mimetype == 'text/event-stream'
+    assert time.monotonic() - inicio < 2
+    assert blocos[0] == {'retry': str(api_proxy.RECONEXAO_SSE_MS)}
+    assert blocos[1] == {'event': 'snapshot', 'id': sse.hash,
+                         'data': {'versao': sse.hash, 'ultima_atualizacao': '2026-07-31T00:00:00', 'total': 1}}
+    assert len(blocos) == 2
+
+
+def test_last_event_id_recebe_so_as_diferencas(cliente, sse):
+    sse.recarregar_se_mudou()
+    anterior = sse.hash
+    gravar_incidentes(sse.caminho, 'OFBI-1', 'OFBI-2')
+
+    blocos = eventos(cliente.get('/api/stream/incidentes', headers={'Last-Event-ID': anterior}))
+
+    diff, = [b for b in blocos if b.get('event')]
+    assert diff['event'] == 'diff'
+    assert diff['id'] == sse.hash != anterior
+    assert diff['data']['de'] == anterior
+    assert [i['key'] for i in diff['data']['adicionados']] == ['OFBI-2']
+    assert diff['data']['removidos'] == []
+
+
+def test_versao_fora_do_historico_recebe_reset(cliente, sse):
+    blocos = eventos(cliente.get('/api/stream/incidentes?versao=desconhecida'))
+
+    reset, = [b for b in blocos if b.get('event')]
+    assert reset == {'event': 'reset', 'id': sse.hash, 'data': {'versao': sse.hash}}
+
+
+def test_versao_atual_nao_recebe_nada(cliente, sse):
+    sse.recarregar_se_mudou()
+    blocos = eventos(cliente.get('/api/stream/incidentes', headers={'Last-Event-ID': sse.hash}))
+    assert [b for b in blocos if b.get('event')] == []
+
+
+def test_limite_de_conexoes_simultaneas(cliente, sse, monkeypatch):
+    monkeypatch.setattr(api_proxy, 'vagas_sse', threading.BoundedSemaphore(1))
+
+    aberta = cliente.get('/api/stream/incidentes', buffered=False)
+    assert aberta.status_code == 200
+
+    recusada = cliente.get('/api/stream/incidentes')
+    assert recusada.status_code == 503
+    assert recusada.headers['Retry-After'] == str(api_proxy.RECONEXAO_SSE_MS // 1000)
+
+    # Fechar a conexão libera a vaga
+    aberta.close()
+    assert cliente.get('/api/stream/incidentes').status_code == 200
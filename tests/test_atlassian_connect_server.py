@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da verificação de JWT (qsh, cache de tokens, reinstalação e webhook) do app Atlassian Connect
+Central de Serviços - Open Finance Brasil
+"""
+import os
+import time
+import hashlib
+
+os.environ.setdefault('INSTALLATIONS_STORE', 'memoria')
+
+import jwt
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import atlassian_connect_server as servidor
+from instalacoes import MemoriaInstalacaoStore
+
+# HS256 pede segredos de ao menos 32 bytes
+SEGREDO_A = 'a' * 32
+SEGREDO_B = 'b' * 32
+SEGREDO_NOVO = 'n' * 32
+SEGREDO_ERRADO = 'x' * 32
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(servidor, 'installations', MemoriaInstalacaoStore())
+    servidor.tokens_verificados.invalidar()
+
+    verificacoes = []
+    verify_jwt = servidor.verify_jwt
+
+    def contar(token, client_key):
+        verificacoes.append(client_key)
+        return verify_jwt(token, client_key)
+    monkeypatch.setattr(servidor, 'verify_jwt', contar)
+
+    cliente = servidor.app.test_client()
+    cliente.verificacoes = verificacoes
+    for client_key, segredo in (('cliente-a', SEGREDO_A), ('cliente-b', SEGREDO_B)):
+        assert instalar(cliente, client_key, segredo).status_code == 200
+    return cliente
+
+
+def instalar(cliente, client_key, segredo, base_url=None, assinado_por=None):
+    """Instala o app; reinstalações vão assinadas com o segredo atual (`assinado_por`)."""
+    headers = {}
+    if assinado_por:
+        qsh = servidor.calcular_qsh('POST', '/installed', MultiDict())
+        headers['Authorization'] = f'JWT {token(*assinado_por, qsh)}'
+    return cliente.post('/installed', headers=headers,
+                        json={'clientKey': client_key, 'sharedSecret': segredo,
+                              'baseUrl': base_url or f'https://{client_key}.atlassian.net'})
+
+
+def token(client_key, segredo, qsh, exp=300):
+    agora = int(time.time())
+    return jwt.encode({'iss': client_key, 'iat': agora, 'exp': agora + exp, 'qsh': qsh},
+                      segredo, algorithm='HS256')
+
+
+def qsh_painel():
+    return servidor.calcular_qsh('GET', '/panel', MultiDict())
+
+
+def get_painel(cliente, jwt_token):
+    return cliente.get('/panel', headers={'Authorization': f'JWT {jwt_token}'})
+
+
+def test_qsh_canonico():
+    args = MultiDict([('b', 'x y'), ('a', '2'), ('a', '1'), ('jwt', 'ignorado')])
+    canonico = 'GET&/api/tickets&a=1,2&b=x%20y'
+    assert servidor.calcular_qsh('get', '/api/tickets/', args) == hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def test_token_em_cache_nao_reverifica_assinatura(cliente):
+    jwt_token = token('cliente-a', SEGREDO_A, qsh_painel())
+
+    assert get_painel(cliente, jwt_token).status_code == 200
+    assert get_painel(cliente, jwt_token).status_code == 200
+    assert cliente.verificacoes == ['cliente-a']
+
+
+def test_token_em_cache_vale_so_para_a_propria_url(cliente):
+    jwt_token = token('cliente-a', SEGREDO_A, qsh_painel())
+    assert get_painel(cliente, jwt_token).status_code == 200
+
+    resposta = cliente.get('/api/tickets', headers={'Authorization': f'JWT {jwt_token}'})
+    assert resposta.status_code == 401
+    assert 'qsh' in resposta.get_json()['error']
+
+
+def test_token_de_contexto_vale_para_qualquer_url(cliente):
+    jwt_token = token('cliente-a', SEGREDO_A, servidor.QSH_CONTEXTO)
+    assert get_painel(cliente, jwt_token).status_code == 200
+
+
+def test_assinatura_invalida_nao_entra_no_cache(cliente):
+    jwt_token = token('cliente-a', SEGREDO_ERRADO, qsh_painel())
+
+    assert get_painel(cliente, jwt_token).status_code == 401
+    assert get_painel(cliente, jwt_token).status_code == 401
+    assert cliente.verificacoes == ['cliente-a', 'cliente-a']
+    assert len(servidor.tokens_verificados) == 0
+
+
+def test_token_expirado_em_cache_e_recusado(cliente, monkeypatch):
+    jwt_token = token('cliente-a', SEGREDO_A, qsh_painel(), exp=60)
+    assert get_painel(cliente, jwt_token).status_code == 200
+
+    relogio = time.time() + 120
+    monkeypatch.setattr(servidor.time, 'time', lambda: relogio)
+    resposta = get_painel(cliente, jwt_token)
+    assert resposta.status_code == 401
+    assert 'expirado' in resposta.get_json()['error']
+
+
+def test_desinstalacao_invalida_so_tokens_do_cliente(cliente):
+    token_a = token('cliente-a', SEGREDO_A, qsh_painel())
+    token_b = token('cliente-b', SEGREDO_B, qsh_painel())
+    assert get_painel(cliente, token_a).status_code == 200
+    assert get_painel(cliente, token_b).status_code == 200
+
+    assert cliente.post('/uninstalled', json={'clientKey': 'cliente-a'}).status_code == 200
+
+    assert get_painel(cliente, token_a).status_code == 401
+    assert get_painel(cliente, token_b).status_code == 200
+    assert cliente.verificacoes == ['cliente-a', 'cliente-b', 'cliente-a']
+
+
+def test_reinstalacao_com_novo_segredo_invalida_tokens_antigos(cliente):
+    antigo = token('cliente-a', SEGREDO_A, qsh_painel())
+    assert get_painel(cliente, antigo).status_code == 200
+
+    assert instalar(cliente, 'cliente-a', SEGREDO_NOVO, assinado_por=('cliente-a', SEGREDO_A)).status_code == 200
+
+    assert get_painel(cliente, antigo).status_code == 401
+    assert get_painel(cliente, token('cliente-a', SEGREDO_NOVO, qsh_painel())).status_code == 200
+
+
+def test_reinstalacao_sem_assinatura_do_segredo_atual_e_recusada(cliente):
+    assert instalar(cliente, 'cliente-a', SEGREDO_NOVO).status_code == 401
+    assert instalar(cliente, 'cliente-a', SEGREDO_NOVO, assinado_por=('cliente-a', SEGREDO_ERRADO)).status_code == 401
+    # Outro clientKey para o mesmo site também precisa da assinatura atual
+    assert instalar(cliente, 'intruso', SEGREDO_NOVO, base_url='https://cliente-a.atlassian.net').status_code == 401
+
+    assert servidor.installations.get('cliente-a')['sharedSecret'] == SEGREDO_A
+    assert servidor.installations.get('intruso') is None
+
+
+class IngestorFake:
+    def __init__(self):
+        self.eventos = []
+
+    def processar(self, evento):
+        self.eventos.append(evento)
+        return 'incidentes'
+
+
+def post_webhook(cliente, client_key, segredo):
+    qsh = servidor.calcular_qsh('POST', '/webhook/jira', MultiDict())
+    return cliente.post('/webhook/jira', json={'webhookEvent': 'jira:issue_updated'},
+                        headers={'Authorization': f'JWT {token(client_key, segredo, qsh)}'})
+
+
+def test_webhook_de_outra_instancia_e_recusado(cliente, monkeypatch):
+    ingestor = IngestorFake()
+    monkeypatch.setattr(servidor, 'ingestor_webhook', ingestor)
+
+    # Token válido, mas de uma instalação em outro site
+    resposta = post_webhook(cliente, 'cliente-a', SEGREDO_A)
+    assert resposta.status_code == 403
+    assert ingestor.eventos == []
+
+    assert instalar(cliente, 'jira-ofb', SEGREDO_NOVO, base_url=servidor.JIRA_URL + '/').status_code == 200
+    resposta = post_webhook(cliente, 'jira-ofb', SEGREDO_NOVO)
+    assert resposta.status_code == 200
+    assert resposta.get_json() == {'status': 'queued', 'dataset': 'incidentes'}
+    assert len(ingestor.eventos) == 1
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da base local de issues
+Central de Serviços - Open Finance Brasil
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from banco_issues import BancoIssues
+from sync_mudancas import DIAS_JANELA
+
+AGORA = datetime.now(timezone.utc)
+
+
+def data_jira(dias_atras):
+    return (AGORA - timedelta(days=dias_atras)).strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+
+
+def issue(key, criado_ha, atualizado_ha=None, **campos):
+    return {'key': key, 'created': data_jira(criado_ha),
+            'updated': data_jira(criado_ha if atualizado_ha is None else atualizado_ha), **campos}
+
+
+def snapshot(tmp_path, dataset, itens):
+    caminho = tmp_path / f'dados-{dataset}.json'
+    caminho.write_text(json.dumps({dataset: itens, 'total': len(itens)}), encoding='utf-8')
+    return str(caminho)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    banco = BancoIssues(str(tmp_path / 'banco.db'))
+    yield banco
+    banco.fechar()
+
+
+def keys(banco, dataset):
+    return sorted(i['key'] for i in banco.consultar(dataset))
+
+
+def test_upsert_atualiza_pela_key_e_filtra(banco):
+    banco.upsert('incidentes', [issue('OFBI-1', 3, status='Aberto'), issue('OFBI-2', 1, status='Aberto')])
+    banco.upsert('incidentes', [issue('OFBI-1', 3, status='Resolvido')])
+
+    assert keys(banco, 'incidentes') == ['OFBI-1', 'OFBI-2']
+    assert [i['key'] for i in banco.consultar('incidentes', status='Resolvido')] == ['OFBI-1']
+    assert [i['key'] for i in banco.consultar('incidentes', desde=AGORA - timedelta(days=2))] == ['OFBI-2']
+
+
+def test_importacao_incremental_nao_remove(banco, tmp_path):
+    banco.upsert('incidentes', [issue('OFBI-1', 3), issue('OFBI-2', 1)])
+
+    assert banco.importar_json('incidentes', snapshot(tmp_path, 'incidentes', [issue('OFBI-2', 1)])) == (1, 0)
+    assert keys(banco, 'incidentes') == ['OFBI-1', 'OFBI-2']
+
+
+def test_importacao_completa_remove_incidentes_ausentes(banco, tmp_path):
+    banco.upsert('incidentes', [issue('OFBI-1', 400), issue('OFBI-2', 1), issue('OFBI-3', 1)])
+
+    caminho = snapshot(tmp_path, 'incidentes', [issue('OFBI-2', 1), issue('OFBI-4', 0)])
+    assert banco.importar_json('incidentes', caminho, completo=True) == (2, 2)
+    assert keys(banco, 'incidentes') == ['OFBI-2', 'OFBI-4']
+
+
+def test_importacao_completa_de_mudancas_respeita_a_janela(banco, tmp_path):
+    banco.upsert('mudancas', [
+        issue('OFBI-10', DIAS_JANELA + 30),                   # saiu da janela: histórico
+        issue('OFBI-11', DIAS_JANELA + 30, atualizado_ha=5),  # atualizada na janela e excluída
+        issue('OFBI-12', 10),                                 # criada na janela e excluída
+        issue('OFBI-13', DIAS_JANELA),                        # na borda da janela: mantida
+        issue('OFBI-14', 2),
+    ])
+
+    caminho = snapshot(tmp_path, 'mudancas', [issue('OFBI-14', 2)])
+    assert banco.importar_json('mudancas', caminho, completo=True) == (1, 2)
+    assert keys(banco, 'mudancas') == ['OFBI-10', 'OFBI-13', 'OFBI-14']
+
+
+def test_importacoes_seguidas_estendem_a_cobertura(banco, tmp_path):
+    caminho = tmp_path / 'dados-mudancas.json'
+    for gerado_em in ('2026-08-01T12:00:00+00:00', '2026-09-15T12:00:00+00:00'):
+        caminho.write_text(json.dumps({'ultima_atualizacao': gerado_em, 'mudancas': []}), encoding='utf-8')
+        banco.importar_json('mudancas', str(caminho))
+
+    inicio, fim = banco.cobertura('mudancas')
+    assert inicio == datetime(2026, 8, 1, 12, tzinfo=timezone.utc) - timedelta(days=DIAS_JANELA - 1)
+    assert fim == datetime(2026, 9, 15, 12, tzinfo=timezone.utc)
+
+
+def test_incidentes_cobrem_todo_o_historico(banco, tmp_path):
+    caminho = snapshot(tmp_path, 'incidentes', [])
+    assert banco.cobertura('incidentes') is None
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'ultima_atualizacao': '2026-09-15T12:00:00+00:00', 'incidentes': []}, f)
+    banco.importar_json('incidentes', caminho)
+    assert banco.cobertura('incidentes') == (None, datetime(2026, 9, 15, 12, tzinfo=timezone.utc))
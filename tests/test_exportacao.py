@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da exportação consolidada (uma busca no Jira para vários datasets)
+Central de Serviços - Open Finance Brasil
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import jira_client
+import update_news
+from central_servicos import exportacao
+from fluxo_json import iterar_itens
+
+
+def data_jira(dias_atras):
+    data = datetime.now().astimezone() - timedelta(days=dias_atras)
+    return data.strftime('%Y-%m-%dT%H:%M:%S.000%z')
+
+
+def issue(n, tipo, dias_atras, categoria_status='indeterminate'):
+    return {
+        'key': f'OFBI-{n}',
+        'fields': {
+            'issuetype': {'name': tipo},
+            'summary': f'Issue {n}',
+            'status': {'name': 'Em progresso', 'statusCategory': {'key': categoria_status}},
+            'created': data_jira(dias_atras),
+            'updated': data_jira(dias_atras),
+        },
+    }
+
+
+# Ordem da JQL: created DESC
+ISSUES = [
+    issue(6, '[System] Incidente', 1),
+    issue(5, '[System] Mudança', 2),
+    issue(4, 'Tarefa', 3),
+    issue(3, 'Incidente', 4),
+    issue(2, '[System] Mudança', 5, categoria_status='done'),
+    issue(1, '[System] Mudança', 200),
+]
+
+
+class RespostaFake:
+    status_code = 200
+    text = ''
+
+    def __init__(self, corpo):
+        self.corpo = corpo
+
+    def json(self):
+        return self.corpo
+
+
+@pytest.fixture
+def jira(tmp_path, monkeypatch):
+    """Busca falsa em páginas de 4 issues; guarda os payloads recebidos."""
+    monkeypatch.chdir(tmp_path)
+    payloads = []
+
+    def post(url, **kwargs):
+        assert url.endswith('/rest/api/3/search/jql')
+        payload = kwargs['json']
+        payloads.append(payload)
+        inicio = int(payload.get('nextPageToken') or 0)
+        fim = inicio + 4
+        corpo = {'issues': ISSUES[inicio:fim], 'isLast': fim >= len(ISSUES)}
+        if not corpo['isLast']:
+            corpo['nextPageToken'] = str(fim)
+        return RespostaFake(corpo)
+
+    monkeypatch.setattr(jira_client, 'post', post)
+    return payloads
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    publicados = []
+    monkeypatch.setattr(update_news, 'fetch_confluence_news', lambda: [])
+    monkeypatch.setattr(update_news, 'publicar_feed', lambda jira, confluence, caminho: publicados.append(jira))
+    return publicados
+
+
+def chaves(caminho, chave_lista):
+    return [i['key'] for i in iterar_itens(caminho, chave_lista)]
+
+
+def test_uma_busca_para_todos_os_datasets(jira, feed):
+    exportacao.exportar('https://jira.exemplo', None, ['incidentes', 'mudancas', 'news'], completo=True)
+
+    # Uma única JQL, paginada por nextPageToken
+    assert len(jira) == 2
+    assert jira[0]['jql'] == jira[1]['jql']
+    assert jira[1]['nextPageToken'] == '4'
+
+    jql = jira[0]['jql']
+    assert jql.startswith(f'project = {exportacao.PROJETO} AND (')
+    assert jql.endswith('ORDER BY created DESC')
+    for filtro in ('issuetype in ("[System] Incidente", "Incidente")', exportacao.sync_mudancas.FILTRO,
+                   update_news.FILTRO_JIRA):
+        assert f'({filtro})' in jql
+
+    campos = jira[0]['fields']
+    assert campos[0] == 'issuetype'
+    assert len(campos) == len(set(campos))
+    for escritor in exportacao.ESCRITORES.values():
+        assert set(escritor.campos) <= set(campos)
+
+
+def test_cada_dataset_recebe_so_o_que_lhe_interessa(jira, feed):
+    exportacao.exportar('https://jira.exemplo', None, ['incidentes', 'mudancas', 'news'], completo=True)
+
+    assert chaves('dados-incidentes.json', 'incidentes') == ['OFBI-6', 'OFBI-3']
+    # OFBI-1 está fora da janela de 90 dias; OFBI-2 está concluída, mas na janela
+    assert chaves('dados-mudancas.json', 'mudancas') == ['OFBI-5', 'OFBI-2']
+    # Feed: só mudanças em aberto, mais recentes primeiro, mesmo fora da janela
+    assert [item['key'] for item in feed[0]] == ['OFBI-5', 'OFBI-1']
+
+
+def test_so_os_datasets_pedidos(jira, feed, tmp_path):
+    exportacao.exportar('https://jira.exemplo', None, ['mudancas'])
+
+    assert exportacao.sync_mudancas.FILTRO in jira[0]['jql']
+    assert 'Incidente' not in jira[0]['jql']
+    assert not feed
+    assert not (tmp_path / 'dados-incidentes.json').exists()
+    assert chaves('dados-mudancas.json', 'mudancas') == ['OFBI-5', 'OFBI-2']
+
+
+def test_erro_no_meio_nao_publica_nada(jira, feed, monkeypatch, tmp_path):
+    def falhar(url, **kwargs):
+        if kwargs['json'].get('nextPageToken'):
+            raise jira_client.ErroJira(503, 'indisponível')
+        return RespostaFake({'issues': ISSUES[:4], 'isLast': False, 'nextPageToken': '4'})
+    monkeypatch.setattr(jira_client, 'post', falhar)
+
+    with pytest.raises(jira_client.ErroJira):
+        exportacao.exportar('https://jira.exemplo', None, ['incidentes', 'mudancas'], completo=True)
+
+    assert not [nome for nome in tmp_path.iterdir() if nome.suffix in ('.json', '.tmp')]
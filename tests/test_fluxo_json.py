@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da leitura incremental dos snapshots
+Central de Serviços - Open Finance Brasil
+"""
+import json
+
+import pytest
+
+import fluxo_json
+from fluxo_json import iterar_itens, iterar_ndjson
+
+ITENS = [
+    {'key': 'OFBI-3', 'summary': 'Falha no é "pix" {[,]}', 'valor': 1234567890, 'labels': ['a', 'b']},
+    {'key': 'OFBI-2', 'summary': 'x' * 200, 'valor': 1.5e-3, 'aninhado': {'lista': [1, [2, 3]]}},
+    {'key': 'OFBI-1', 'summary': '', 'valor': None, 'ok': True},
+]
+
+
+def gravar(tmp_path, documento, indent=2):
+    caminho = tmp_path / 'dados.json'
+    caminho.write_text(json.dumps(documento, ensure_ascii=False, indent=indent), encoding='utf-8')
+    return str(caminho)
+
+
+@pytest.mark.parametrize('bloco', [1, 2, 3, 7, 64 * 1024])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_itens_partidos_entre_blocos(tmp_path, monkeypatch, bloco, indent):
+    monkeypatch.setattr(fluxo_json, 'TAMANHO_BLOCO', bloco)
+    documento = {'ultima_atualizacao': '2026-07-31T00:00:00', 'incidentes': ITENS, 'total': len(ITENS)}
+
+    cabecalho = {}
+    assert list(iterar_itens(gravar(tmp_path, documento, indent), 'incidentes', cabecalho)) == ITENS
+    assert cabecalho == {'ultima_atualizacao': '2026-07-31T00:00:00', 'total': 3}
+
+
+def test_numero_no_fim_do_bloco_nao_e_cortado(tmp_path, monkeypatch):
+    # '12345' lido em blocos de 3: raw_decode aceitaria '123' se não esperasse o próximo bloco
+    monkeypatch.setattr(fluxo_json, 'TAMANHO_BLOCO', 3)
+    caminho = tmp_path / 'dados.json'
+    caminho.write_text('{"itens":[12345,678]}', encoding='utf-8')
+    assert list(iterar_itens(str(caminho), 'itens')) == [12345, 678]
+
+
+def test_lista_vazia_e_documento_vazio(tmp_path):
+    assert list(iterar_itens(gravar(tmp_path, {'incidentes': [], 'total': 0}), 'incidentes')) == []
+    assert list(iterar_itens(gravar(tmp_path, {}), 'incidentes')) == []
+
+
+def test_parada_antecipada_le_so_o_necessario(tmp_path, monkeypatch):
+    monkeypatch.setattr(fluxo_json, 'TAMANHO_BLOCO', 16)
+    caminho = gravar(tmp_path, {'incidentes': ITENS * 1000})
+
+    lidos = []
+    original = fluxo_json._Leitor._ler_mais
+
+    def contar(leitor):
+        lidos.append(1)
+        return original(leitor)
+    monkeypatch.setattr(fluxo_json._Leitor, '_ler_mais', contar)
+
+    primeiro = next(iterar_itens(caminho, 'incidentes'))
+    assert primeiro == ITENS[0]
+    assert len(lidos) < 20
+
+
+@pytest.mark.parametrize('conteudo', ['{"incidentes": [{"key": "OFBI-1"}, {"key": ', '{"incidentes" [1]}', '[1, 2]'])
+def test_arquivo_corrompido(tmp_path, conteudo):
+    caminho = tmp_path / 'dados.json'
+    caminho.write_text(conteudo, encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iterar_itens(str(caminho), 'incidentes'))
+
+
+def test_arquivo_ausente(tmp_path):
+    with pytest.raises(OSError):
+        list(iterar_itens(str(tmp_path / 'nao-existe.json'), 'incidentes'))
+
+
+def test_ndjson(tmp_path):
+    caminho = tmp_path / 'dados.ndjson'
+    caminho.write_text(''.join(json.dumps(i, ensure_ascii=False) + '\n\n' for i in ITENS), encoding='utf-8')
+    assert list(iterar_ndjson(str(caminho))) == ITENS
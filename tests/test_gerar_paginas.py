@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da geração dos relatórios mensais (cobertura da fonte)
+Central de Serviços - Open Finance Brasil
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+import gerar_paginas
+from banco_issues import BancoIssues
+from gerar_paginas import FUSO, MANIFESTO, gerar
+
+AGORA = datetime(2026, 10, 18, 12, 0, tzinfo=FUSO)
+
+
+def issue(key, created, updated=None):
+    return {'key': key, 'summary': key, 'status': 'Concluído', 'priority': 'Medium',
+            'created': created, 'updated': updated or created}
+
+
+@pytest.fixture
+def raiz(tmp_path, monkeypatch):
+    """Pasta do site: snapshots, páginas mantidas à mão e relatorios/."""
+    for dataset in gerar_paginas.DATASETS:
+        monkeypatch.setitem(gerar_paginas.DATASETS[dataset], 'snapshot', str(tmp_path / f'dados-{dataset}.json'))
+    return tmp_path
+
+
+def snapshot(raiz, dataset, ultima_atualizacao, itens):
+    (raiz / f'dados-{dataset}.json').write_text(json.dumps({
+        'ultima_atualizacao': ultima_atualizacao, 'total': len(itens), dataset: itens,
+    }), encoding='utf-8')
+
+
+def arquivos(diretorio):
+    return sorted(p.name for p in diretorio.iterdir() if p.name != MANIFESTO)
+
+
+def test_mes_fora_da_janela_do_snapshot_nao_e_regerado(raiz):
+    snapshot(raiz, 'mudancas', '2026-10-18T09:00:00-03:00', [
+        # Criada antes da janela, veio pela atualização: junho segue incompleto
+        issue('OFBI-1', '2026-06-10T10:00:00.000-0300', '2026-09-01T10:00:00.000-0300'),
+        issue('OFBI-2', '2026-08-05T10:00:00.000-0300'),
+        issue('OFBI-3', '2026-10-02T10:00:00.000-0300'),
+    ])
+    (raiz / 'gmuds_maio.html').write_text('histórico', encoding='utf-8')
+    saida = raiz / 'relatorios'
+    saida.mkdir()
+    (saida / 'mudancas-2026-07.html').write_text('publicada', encoding='utf-8')
+    (saida / MANIFESTO).write_text(json.dumps({'paginas': {
+        'mudancas-2026-07.html': {'hash': 'h', 'fechado': True, 'total': 9, 'indicadores': {'total': 9}},
+    }}), encoding='utf-8')
+
+    gerar('mudancas', str(saida), agora=AGORA)
+
+    assert arquivos(saida) == ['mudancas-2026-07.html', 'mudancas-2026-08.html', 'mudancas-2026-09.html',
+                               'mudancas-2026-10.html', 'mudancas-comparativo.html']
+    # Página já publicada de mês não coberto fica como está
+    assert (saida / 'mudancas-2026-07.html').read_text(encoding='utf-8') == 'publicada'
+    comparativo = (saida / 'mudancas-comparativo.html').read_text(encoding='utf-8')
+    assert "<a href='../gmuds_maio.html'>Maio 2026</a>" in comparativo
+    assert "<a href='mudancas-2026-07.html'>Julho 2026</a>" in comparativo
+    assert 'Junho 2026</a>' not in comparativo
+
+
+def test_snapshot_antigo_nao_fecha_meses_posteriores(raiz):
+    snapshot(raiz, 'incidentes', '2026-08-22T21:00:00-03:00', [
+        issue('OFBI-10', '2026-04-01T10:00:00.000-0300'),
+        issue('OFBI-11', '2026-06-15T10:00:00.000-0300'),
+        issue('OFBI-12', '2026-08-10T10:00:00.000-0300'),
+    ])
+    saida = raiz / 'relatorios'
+
+    gerar('incidentes', str(saida), agora=AGORA)
+
+    assert arquivos(saida) == ['incidentes-2026-05.html', 'incidentes-2026-06.html', 'incidentes-2026-07.html',
+                               'incidentes-comparativo.html']
+    manifesto = json.loads((saida / MANIFESTO).read_text(encoding='utf-8'))['paginas']
+    assert manifesto['incidentes-2026-06.html']['total'] == 1
+
+
+def test_nada_antes_da_issue_mais_antiga(raiz):
+    snapshot(raiz, 'incidentes', '2026-10-18T09:00:00-03:00', [issue('OFBI-20', '2026-07-20T10:00:00.000-0300')])
+    saida = raiz / 'relatorios'
+
+    gerar('incidentes', str(saida), agora=AGORA)
+
+    assert arquivos(saida) == ['incidentes-2026-08.html', 'incidentes-2026-09.html', 'incidentes-2026-10.html',
+                               'incidentes-comparativo.html']
+
+
+def test_cobertura_da_base(raiz, tmp_path):
+    snapshot(raiz, 'mudancas', '2026-10-18T09:00:00-03:00', [issue('OFBI-30', '2026-08-05T10:00:00.000-0300')])
+    banco = BancoIssues(str(tmp_path / 'banco.db'))
+    try:
+        # Base sem cobertura registrada: nenhum mês é confiável
+        banco.upsert('mudancas', [issue('OFBI-29', '2026-05-05T10:00:00.000-0300')])
+        assert gerar_paginas.carregar_por_mes('mudancas', banco)[1] is None
+
+        banco.registrar_cobertura('mudancas', datetime(2026, 4, 1, tzinfo=FUSO), datetime(2026, 7, 1, tzinfo=FUSO))
+        banco.importar_json('mudancas', gerar_paginas.DATASETS['mudancas']['snapshot'])
+        saida = raiz / 'relatorios'
+        gerar('mudancas', str(saida), banco, agora=AGORA)
+    finally:
+        banco.fechar()
+
+    # Lacuna entre a cobertura anterior (até 01/07) e a janela do snapshot (desde 21/07): vale só a nova
+    assert arquivos(saida) == ['mudancas-2026-08.html', 'mudancas-2026-09.html', 'mudancas-2026-10.html',
+                               'mudancas-comparativo.html']
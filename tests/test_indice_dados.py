@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do índice em memória e da paginação por cursor
+Central de Serviços - Open Finance Brasil
+"""
+import json
+
+import pytest
+
+import indice_dados
+from indice_dados import IndiceDataset, codificar_cursor, decodificar_cursor, parse_data_filtro
+
+
+def item(n, status='Aberto', summary=''):
+    return {'key': f'OFBI-{n}', 'created': f'2026-07-{n:02d}T10:00:00.000-0300',
+            'status': status, 'summary': summary}
+
+
+@pytest.fixture
+def gravar(tmp_path, monkeypatch):
+    monkeypatch.setattr(indice_dados, 'INTERVALO_VERIFICACAO', 0)
+    caminho = tmp_path / 'dados-incidentes.json'
+
+    def gravar(itens, ultima_atualizacao='2026-07-31T00:00:00'):
+        caminho.write_text(json.dumps({'ultima_atualizacao': ultima_atualizacao, 'incidentes': itens,
+                                       'total': len(itens)}), encoding='utf-8')
+        return str(caminho)
+    return gravar
+
+
+def paginar(indice, **parametros):
+    chaves, cursor = [], None
+    while True:
+        resultado = indice.buscar(cursor=cursor, **parametros)
+        chaves += [i['key'] for i in resultado['itens']]
+        cursor = resultado['proximo_cursor']
+        if cursor is None:
+            return chaves, resultado['total']
+
+
+def test_cursor_percorre_todos_os_itens_sem_repetir(gravar):
+    indice = IndiceDataset(gravar([item(n) for n in range(1, 26)]), 'incidentes')
+
+    chaves, total = paginar(indice, limite=7)
+    assert total == 25
+    assert chaves == [f'OFBI-{n}' for n in range(25, 0, -1)]
+
+
+def test_cursor_com_filtros_e_intervalo(gravar):
+    itens = [item(n, 'Resolvido' if n % 2 else 'Aberto', 'falha pix' if n % 3 == 0 else 'lentidao')
+             for n in range(1, 31)]
+    indice = IndiceDataset(gravar(itens), 'incidentes')
+
+    chaves, total = paginar(indice, limite=2, status=['Resolvido'], q='pix',
+                            desde=parse_data_filtro('2026-07-05'), ate=parse_data_filtro('2026-07-28'))
+    assert chaves == ['OFBI-27', 'OFBI-21', 'OFBI-15', 'OFBI-9']
+    assert total == 4
+
+
+def test_cursor_continua_valido_apos_recarga(gravar):
+    caminho = gravar([item(n) for n in range(1, 11)])
+    indice = IndiceDataset(caminho, 'incidentes')
+    primeira = indice.buscar(limite=4)
+
+    # Itens novos entram no topo; a próxima página segue de onde parou
+    gravar([item(n) for n in range(1, 13)])
+    segunda = indice.buscar(limite=4, cursor=primeira['proximo_cursor'])
+    assert [i['key'] for i in segunda['itens']] == ['OFBI-6', 'OFBI-5', 'OFBI-4', 'OFBI-3']
+
+
+@pytest.mark.parametrize('posicao', [[1, 2], ['2026-07-01', None], ['a', 'b', 'c'], {'a': 1}, 'texto'])
+def test_cursor_forjado_e_rejeitado(posicao):
+    with pytest.raises(ValueError):
+        decodificar_cursor(codificar_cursor(posicao))
+
+
+def test_cursor_invalido_e_rejeitado():
+    with pytest.raises(ValueError):
+        decodificar_cursor('não é base64')
+
+
+def test_ultima_atualizacao_acompanha_arquivo_sem_mudanca(gravar):
+    itens = [item(1)]
+    indice = IndiceDataset(gravar(itens, '2026-07-31T00:00:00'), 'incidentes')
+    indice.recarregar_se_mudou()
+    versao = indice.versao
+
+    # Tamanho diferente: a assinatura (mtime, tamanho) muda mesmo no mesmo tick do relógio
+    gravar(itens, '2026-08-01T00:00:00.000')
+    resultado = indice.buscar()
+    assert resultado['versao'] == versao
+    assert resultado['ultima_atualizacao'] == '2026-08-01T00:00:00.000'
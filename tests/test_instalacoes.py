@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Testes dos backends de instalações do Atlassian Connect
+Central de Serviços - Open Finance Brasil
+"""
+import pytest
+
+from instalacoes import InstalacaoStore, InstalacaoStoreCache, MemoriaInstalacaoStore, SQLiteInstalacaoStore
+
+
+def instalacao(client_key, base_url='https://ofb.atlassian.net', segredo='s'):
+    return {'clientKey': client_key, 'baseUrl': base_url, 'sharedSecret': segredo, 'publicKey': None}
+
+
+def test_backend_incompleto_falha_ao_instanciar():
+    class SoLeitura(InstalacaoStore):
+        def get(self, client_key):
+            return None
+
+    with pytest.raises(TypeError):
+        SoLeitura()
+
+
+@pytest.fixture(params=['memoria', 'sqlite', 'cache'])
+def store(request, tmp_path):
+    if request.param == 'memoria':
+        return MemoriaInstalacaoStore()
+    sqlite = SQLiteInstalacaoStore(str(tmp_path / 'installations.db'))
+    return sqlite if request.param == 'sqlite' else InstalacaoStoreCache(sqlite)
+
+
+def test_salvar_consultar_e_remover(store):
+    store.salvar(instalacao('a'))
+    store.salvar(instalacao('b', 'https://outro.atlassian.net'))
+
+    assert store.get('a')['sharedSecret'] == 's'
+    assert store.get_por_base_url('https://outro.atlassian.net')['clientKey'] == 'b'
+    assert 'a' in store and len(store) == 2
+
+    store.salvar(instalacao('a', segredo='novo'))
+    assert store.get('a')['sharedSecret'] == 'novo'
+
+    assert store.remover('a') is True
+    assert store.remover('a') is False
+    assert store.get('a') is None
+    assert store.get_por_base_url('https://ofb.atlassian.net') is None
+    assert len(store) == 1
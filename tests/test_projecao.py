@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da projeção das respostas de busca do Jira
+Central de Serviços - Open Finance Brasil
+"""
+import pytest
+
+import projecao
+from sync_incidentes import normalizar_incidente
+from sync_mudancas import normalizar_mudanca
+
+
+def paragrafo(*nos):
+    return {'type': 'paragraph', 'content': list(nos)}
+
+
+def texto(valor):
+    return {'type': 'text', 'text': valor}
+
+
+DOCUMENTO = {'type': 'doc', 'version': 1, 'content': [
+    {'type': 'heading', 'attrs': {'level': 2}, 'content': [texto('Contexto')]},
+    paragrafo(texto('Falha no '), {'type': 'mention', 'attrs': {'id': '1', 'text': '@Ana'}},
+              texto(' '), {'type': 'hardBreak'}, texto('ver '),
+              {'type': 'inlineCard', 'attrs': {'url': 'https://status.exemplo'}}),
+    {'type': 'bulletList', 'content': [
+        {'type': 'listItem', 'content': [paragrafo(texto('item 1'))]},
+        {'type': 'listItem', 'content': [paragrafo(texto('item 2'))]},
+    ]},
+    paragrafo(),
+    paragrafo(),
+    paragrafo(texto('Fim')),
+]}
+
+USUARIO = {'accountId': 'abc', 'displayName': 'Ana', 'emailAddress': 'ana@exemplo',
+           'avatarUrls': {'48x48': 'https://avatar'}, 'self': 'https://api/user'}
+
+
+def incidente(key='OFBI-1', **fields):
+    return {'id': '10', 'key': key, 'self': 'https://api/issue/10', 'expand': 'names', 'fields': {
+        'summary': 'Falha no PIX',
+        'status': {'name': 'Em atendimento', 'self': 'https://api/status', 'iconUrl': 'https://icone'},
+        'priority': {'name': 'High', 'iconUrl': 'https://icone'},
+        'assignee': USUARIO,
+        'reporter': USUARIO,
+        'created': '2026-07-01T10:00:00.000-0300',
+        'updated': '2026-07-01T11:00:00.000-0300',
+        'resolutiondate': None,
+        'labels': ['pix'],
+        'description': DOCUMENTO,
+        'customfield_10238': {'value': 'PIX', 'id': '1', 'self': 'https://api/option'},
+        'customfield_10248': {'value': 'Alto'},
+        'customfield_10096': {'ongoingCycle': {'breached': True, 'breachTime': {'jira': '2026-07-02T10:00:00.000-0300'},
+                                               'elapsedTime': {'friendly': '1h'}, 'remainingTime': {'friendly': '-2h'}}},
+        **fields,
+    }}
+
+
+def test_adf_vira_texto_simples():
+    assert projecao.texto_adf(DOCUMENTO, 0) == (
+        'Contexto\nFalha no @Ana\nver https://status.exemplo\nitem 1\nitem 2\nFim'
+    )
+
+
+def test_texto_adf_de_string_e_vazio():
+    assert projecao.texto_adf('descrição v2', 0) == 'descrição v2'
+    assert projecao.texto_adf(None) == ''
+
+
+def test_truncamento():
+    assert projecao.truncar('abcdef  ghij', 8) == 'abcdef…'
+    assert projecao.truncar('abc', 3) == 'abc'
+    assert projecao.truncar('abcdef', 0) == 'abcdef'
+    assert projecao.texto_adf(DOCUMENTO, 12) == 'Contexto\nFal…'
+
+
+def test_limite_negativo_e_recusado():
+    with pytest.raises(ValueError):
+        projecao.truncar('abcdef', -5)
+    with pytest.raises(ValueError):
+        projecao.texto_adf(DOCUMENTO, -1)
+
+
+def test_documento_longo_para_de_percorrer(monkeypatch):
+    visitados = []
+    texto_no = projecao._texto_no
+
+    def contar(no):
+        visitados.append(no)
+        return texto_no(no)
+    monkeypatch.setattr(projecao, '_texto_no', contar)
+
+    documento = {'type': 'doc', 'content': [paragrafo(texto('x' * 10)) for _ in range(1000)]}
+    assert len(projecao.texto_adf(documento, 20)) == 21
+    assert len(visitados) < 20
+
+
+def test_formato_reduzido_mantem_estrutura_do_jira():
+    reduzida = projecao.projetar_issue(incidente(), 'reduzido', 10)
+
+    assert reduzida['key'] == 'OFBI-1'
+    assert 'self' not in reduzida and 'expand' not in reduzida
+    assert reduzida['fields']['status'] == {'name': 'Em atendimento'}
+    assert reduzida['fields']['assignee'] == {'accountId': 'abc', 'displayName': 'Ana', 'emailAddress': 'ana@exemplo'}
+    assert reduzida['fields']['description'] == 'Contexto\nF…'
+
+
+def test_formato_compacto_igual_ao_exportador():
+    issue = incidente()
+    compacta = projecao.projetar_issue(issue, 'compacto', 0)
+    exportado = normalizar_incidente(issue)
+
+    assert {campo: compacta[campo] for campo in exportado} == exportado
+    assert compacta['description'].startswith('Contexto')
+
+
+def test_formato_compacto_aplica_time_solucionador():
+    compacta = projecao.compactar_issue(incidente('OFBI-4933'))
+    assert compacta['assignee'] == 'Arquitetura'
+    assert projecao.compactar_issue(incidente(assignee=None))['assignee'] == 'Sem responsável'
+
+
+def test_formato_compacto_infere_categoria_das_labels():
+    mudanca = {'key': 'OFBI-2', 'fields': {
+        'summary': 'Janela de manutenção', 'status': {'name': 'Aprovada'}, 'priority': {'name': 'Medium'},
+        'assignee': USUARIO, 'reporter': USUARIO, 'created': '2026-07-01T10:00:00.000-0300',
+        'updated': '2026-07-01T10:00:00.000-0300', 'labels': ['tipo:emergencial'],
+        'customfield_11073': False, 'customfield_11106': None,
+    }}
+    compacta = projecao.compactar_issue(mudanca)
+
+    assert compacta['categoria'] == 'Emergencial'
+    assert {campo: compacta[campo] for campo in normalizar_mudanca(mudanca)} == normalizar_mudanca(mudanca)
+
+
+def test_formato_jira_e_busca():
+    corpo = {'issues': [incidente()], 'isLast': True, 'nextPageToken': 't', 'expand': 'schema', 'names': {}}
+
+    assert projecao.projetar_busca(corpo, 'jira') is corpo
+    projetado = projecao.projetar_busca(corpo, 'compacto')
+    assert set(projetado) == {'issues', 'isLast', 'nextPageToken'}
+    assert projetado['issues'][0]['sistema_afetado'] == 'PIX'
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da publicação versionada (manifesto e deltas)
+Central de Serviços - Open Finance Brasil
+"""
+import os
+import gzip
+import json
+
+import publicacao
+from publicacao import PublicacaoStream, carregar_manifesto, publicar_json
+
+
+def snapshot(itens, ultima_atualizacao='2026-07-31T00:00:00'):
+    return {'ultima_atualizacao': ultima_atualizacao, 'incidentes': itens, 'total': len(itens)}
+
+
+def item(key, status='Aberto'):
+    return {'key': key, 'status': status}
+
+
+def ler_delta(tmp_path, versao):
+    with open(tmp_path / 'deltas' / 'dados-incidentes' / f'{versao}.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def publicar_stream(caminho, dados):
+    with PublicacaoStream(str(caminho), 'incidentes', {'ultima_atualizacao': dados['ultima_atualizacao']}) as pub:
+        pub.escrever_todos(dados['incidentes'])
+        return pub.concluir()
+
+
+def test_delta_entre_versoes(tmp_path):
+    caminho = str(tmp_path / 'dados-incidentes.json')
+    assert publicar_json(caminho, snapshot([item('OFBI-1'), item('OFBI-2')]), chave_lista='incidentes')
+    assert carregar_manifesto(caminho)['versao'] == 1
+    assert not os.path.exists(tmp_path / 'deltas' / 'dados-incidentes' / '1.json')
+
+    assert publicar_json(caminho, snapshot([item('OFBI-1', 'Resolvido'), item('OFBI-3')]), chave_lista='incidentes')
+    manifesto = carregar_manifesto(caminho)
+    assert manifesto['versao'] == 2
+    assert manifesto['deltas'] == {'diretorio': 'deltas/dados-incidentes/', 'primeiro': 2}
+    assert ler_delta(tmp_path, 2) == {
+        'de': 1, 'para': 2,
+        'adicionados': [item('OFBI-3')],
+        'alterados': [item('OFBI-1', 'Resolvido')],
+        'removidos': ['OFBI-2'],
+    }
+
+
+def test_sem_mudanca_nao_publica_nova_versao(tmp_path):
+    caminho = str(tmp_path / 'dados-incidentes.json')
+    publicar_json(caminho, snapshot([item('OFBI-1')]), chave_lista='incidentes')
+
+    # Só o campo volátil mudou
+    assert not publicar_json(caminho, snapshot([item('OFBI-1')], '2026-08-01T00:00:00'), chave_lista='incidentes')
+    assert carregar_manifesto(caminho)['versao'] == 1
+
+
+def test_deltas_antigos_sao_removidos(tmp_path, monkeypatch):
+    monkeypatch.setattr(publicacao, 'DELTAS_MAX', 3)
+    caminho = str(tmp_path / 'dados-incidentes.json')
+    for versao in range(1, 7):
+        publicar_json(caminho, snapshot([item(f'OFBI-{n}') for n in range(versao)]), chave_lista='incidentes')
+
+    assert sorted(os.listdir(tmp_path / 'deltas' / 'dados-incidentes')) == ['4.json', '5.json', '6.json']
+    assert carregar_manifesto(caminho)['deltas']['primeiro'] == 4
+
+
+def test_stream_publica_os_mesmos_arquivos(tmp_path):
+    dados = snapshot([item('OFBI-2'), item('OFBI-1')])
+    direto = tmp_path / 'direto'
+    stream = tmp_path / 'stream'
+    direto.mkdir()
+    stream.mkdir()
+
+    publicar_json(str(direto / 'dados-incidentes.json'), dados, chave_lista='incidentes')
+    assert publicar_stream(stream / 'dados-incidentes.json', dados)
+
+    for nome in ('dados-incidentes.json', 'dados-incidentes.min.json'):
+        assert (direto / nome).read_bytes() == (stream / nome).read_bytes()
+    assert carregar_manifesto(str(direto / 'dados-incidentes.json'))['hash'] == \
+        carregar_manifesto(str(stream / 'dados-incidentes.json'))['hash']
+    assert gzip.decompress((stream / 'dados-incidentes.min.json.gz').read_bytes()) == \
+        (stream / 'dados-incidentes.min.json').read_bytes()
+
+    # O hash do stream reconhece o mesmo conteúdo publicado pelo outro caminho
+    assert not publicar_stream(direto / 'dados-incidentes.json', dados)
+
+
+def test_stream_grava_delta(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    publicar_stream(caminho, snapshot([item('OFBI-2'), item('OFBI-1')]))
+    assert publicar_stream(caminho, snapshot([item('OFBI-3'), item('OFBI-1', 'Resolvido')]))
+
+    assert ler_delta(tmp_path, 2) == {
+        'de': 1, 'para': 2,
+        'adicionados': [item('OFBI-3')],
+        'alterados': [item('OFBI-1', 'Resolvido')],
+        'removidos': ['OFBI-2'],
+    }
+
+
+def test_stream_interrompido_mantem_publicacao(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    publicar_stream(caminho, snapshot([item('OFBI-1')]))
+    antes = caminho.read_bytes()
+
+    try:
+        with PublicacaoStream(str(caminho), 'incidentes') as pub:
+            pub.escrever(item('OFBI-2'))
+            raise RuntimeError('falha no meio da exportação')
+    except RuntimeError:
+        pass
+
+    assert caminho.read_bytes() == antes
+    assert not [nome for nome in os.listdir(tmp_path) if nome.endswith('.tmp')]
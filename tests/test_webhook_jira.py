@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da ingestão de webhooks (mescla com debounce nos snapshots)
+Central de Serviços - Open Finance Brasil
+"""
+import os
+from datetime import datetime, timedelta
+
+from fluxo_json import iterar_itens
+from publicacao import PublicacaoStream, carregar_manifesto
+from webhook_jira import EscritorDebounce, IngestorWebhook
+
+
+def data_jira(dias_atras):
+    data = datetime.now().astimezone() - timedelta(days=dias_atras)
+    return data.strftime('%Y-%m-%dT%H:%M:%S.000%z')
+
+
+def incidente(key, dias_atras, summary=''):
+    return {'key': key, 'summary': summary, 'created': data_jira(dias_atras)}
+
+
+def publicar(caminho, chave_lista, itens):
+    with PublicacaoStream(str(caminho), chave_lista, {'ultima_atualizacao': 'x'}) as publicacao:
+        publicacao.escrever_todos(itens)
+        publicacao.concluir()
+
+
+def escritor(caminho, chave_lista='incidentes', filtro=None):
+    # Atraso longo: os testes descarregam manualmente, sem depender do timer
+    return EscritorDebounce(str(caminho), chave_lista, atraso=60, atraso_maximo=60, filtro=filtro)
+
+
+def evento(tipo_evento, key, tipo_issue, dias_atras=1, changelog=None):
+    corpo = {
+        'webhookEvent': tipo_evento,
+        'issue': {
+            'key': key,
+            'fields': {
+                'project': {'key': 'OFBI'},
+                'issuetype': {'name': tipo_issue},
+                'summary': key,
+                'created': data_jira(dias_atras),
+                'updated': data_jira(dias_atras),
+            },
+        },
+    }
+    if changelog:
+        corpo['changelog'] = {'items': changelog}
+    return corpo
+
+
+def test_mescla_alteracoes_e_exclusoes_em_ordem(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    publicar(caminho, 'incidentes', [incidente('OFBI-3', 1), incidente('OFBI-2', 2), incidente('OFBI-1', 3)])
+
+    e = escritor(caminho)
+    e.enfileirar('OFBI-2', incidente('OFBI-2', 2, 'alterado'))
+    e.enfileirar('OFBI-4', incidente('OFBI-4', 0))
+    e.enfileirar('OFBI-1', None)
+    assert e.descarregar() is True
+
+    itens = list(iterar_itens(str(caminho), 'incidentes'))
+    assert [i['key'] for i in itens] == ['OFBI-4', 'OFBI-3', 'OFBI-2']
+    assert itens[2]['summary'] == 'alterado'
+
+
+def test_rajada_vira_uma_gravacao(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    publicar(caminho, 'incidentes', [incidente('OFBI-1', 1)])
+    versao = carregar_manifesto(str(caminho))['versao']
+
+    e = escritor(caminho)
+    for n in range(5):
+        e.enfileirar('OFBI-1', incidente('OFBI-1', 1, f'versao {n}'))
+    assert e.descarregar() is True
+    assert e.descarregar() is False
+
+    assert carregar_manifesto(str(caminho))['versao'] == versao + 1
+    assert [i['summary'] for i in iterar_itens(str(caminho), 'incidentes')] == ['versao 4']
+
+
+def test_snapshot_ilegivel_mantem_alteracoes_na_fila(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    publicar(caminho, 'incidentes', [incidente('OFBI-1', 1)])
+    truncado = caminho.read_bytes()[:-20]
+    caminho.write_bytes(truncado)
+
+    e = escritor(caminho)
+    e.enfileirar('OFBI-2', incidente('OFBI-2', 0))
+    assert e.descarregar() is False
+
+    assert caminho.read_bytes() == truncado
+    assert 'OFBI-2' in e._pendentes
+    e._timer.cancel()
+
+
+def test_snapshot_publicado_ausente_nao_vira_lista_vazia(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+    publicar(caminho, 'incidentes', [incidente('OFBI-1', 1)])
+    os.remove(caminho)
+
+    e = escritor(caminho)
+    e.enfileirar('OFBI-2', incidente('OFBI-2', 0))
+    assert e.descarregar() is False
+    assert not caminho.exists()
+    e._timer.cancel()
+
+
+def test_primeira_publicacao_sem_snapshot(tmp_path):
+    caminho = tmp_path / 'dados-incidentes.json'
+
+    e = escritor(caminho)
+    e.enfileirar('OFBI-1', incidente('OFBI-1', 0))
+    assert e.descarregar() is True
+    assert [i['key'] for i in iterar_itens(str(caminho), 'incidentes')] == ['OFBI-1']
+
+
+def test_filtro_remove_itens_fora_da_janela(tmp_path):
+    caminho = tmp_path / 'dados-mudancas.json'
+    publicar(caminho, 'mudancas', [incidente('OFBI-2', 1), incidente('OFBI-1', 5)])
+
+    e = escritor(caminho, 'mudancas', filtro=lambda item: item['key'] != 'OFBI-1')
+    e.enfileirar('OFBI-3', incidente('OFBI-3', 0))
+    assert e.descarregar() is True
+    assert [i['key'] for i in iterar_itens(str(caminho), 'mudancas')] == ['OFBI-3', 'OFBI-2']
+
+
+def ingestor(dados_dir):
+    ingestor = IngestorWebhook(str(dados_dir))
+    for e in ingestor.escritores.values():
+        e.atraso = e.atraso_maximo = 60
+    return ingestor
+
+
+def test_troca_de_tipo_move_issue_entre_snapshots(tmp_path):
+    publicar(tmp_path / 'dados-incidentes.json', 'incidentes', [incidente('OFBI-1', 1), incidente('OFBI-2', 2)])
+    publicar(tmp_path / 'dados-mudancas.json', 'mudancas', [])
+
+    ing = ingestor(tmp_path)
+    troca = [{'field': 'issuetype', 'fromString': 'Incidente', 'toString': 'Mudança'}]
+    assert ing.processar(evento('jira:issue_updated', 'OFBI-1', 'Mudança', changelog=troca)) == 'mudancas'
+    ing.descarregar()
+
+    assert [i['key'] for i in iterar_itens(str(tmp_path / 'dados-incidentes.json'), 'incidentes')] == ['OFBI-2']
+    assert [i['key'] for i in iterar_itens(str(tmp_path / 'dados-mudancas.json'), 'mudancas')] == ['OFBI-1']
+
+
+def test_mudanca_antiga_nao_entra_no_snapshot(tmp_path):
+    publicar(tmp_path / 'dados-mudancas.json', 'mudancas', [])
+
+    ing = ingestor(tmp_path)
+    assert ing.processar(evento('jira:issue_created', 'OFBI-9', 'Mudança', dias_atras=200)) == 'mudancas'
+    assert ing.processar(evento('jira:issue_created', 'OFBI-10', 'Mudança', dias_atras=1)) == 'mudancas'
+    ing.descarregar()
+
+    assert [i['key'] for i in iterar_itens(str(tmp_path / 'dados-mudancas.json'), 'mudancas')] == ['OFBI-10']
+
+
+def test_ignora_outros_projetos_e_tipos(tmp_path):
+    ing = ingestor(tmp_path)
+    outro_projeto = evento('jira:issue_created', 'ABC-1', 'Incidente')
+    outro_projeto['issue']['fields']['project']['key'] = 'ABC'
+    assert ing.processar(outro_projeto) is None
+    assert ing.processar(evento('jira:issue_created', 'OFBI-1', 'Tarefa')) is None
+    assert not any(e._pendentes for e in ing.escritores.values())
@@ -1,9 +1,12 @@
 import os
-import requests
 from requests.auth import HTTPBasicAuth
-import json
-from datetime import datetime
+from datetime import datetime, timezone
 import sys
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+
+import jira_client
+from publicacao import publicar_json
 
 # Carregar variáveis de ambiente (localmente usa .env, no GitHub Actions usa Secrets)
 try:
@@ -16,80 +19,92 @@ JIRA_URL = os.getenv("JIRA_URL")
 JIRA_EMAIL = os.getenv("JIRA_EMAIL")
 JIRA_TOKEN = os.getenv("JIRA_API_TOKEN")
 
-if not JIRA_URL or not JIRA_EMAIL or not JIRA_TOKEN:
-    print("Erro: Credenciais do Jira não configuradas.")
-    sys.exit(1)
+# Limite de itens no feed final (Jira + Confluence)
+MAX_ITEMS = int(os.getenv("NEWS_MAX_ITEMS", "15"))
+
+# Itens sem data vão para o fim do feed
+DATA_MINIMA = datetime.min.replace(tzinfo=timezone.utc)
+
+# Buscar APENAS Mudanças em aberto (removido Incidentes a pedido do usuário)
+# Mudanças: statusCategory != Done
+FILTRO_JIRA = 'issuetype = "[System] Mudança" AND statusCategory != Done'
+TIPO_JIRA = "[System] Mudança"
+MAX_ITEMS_JIRA = 10
+CAMPOS_JIRA = ["summary", "status", "issuetype", "updated", "created", "priority"]
+
+def jira_news_aberta(issue):
+    # Mesmo critério de FILTRO_JIRA, aplicado a uma issue já buscada
+    fields = issue.get('fields', {})
+    status_category = ((fields.get('status') or {}).get('statusCategory') or {}).get('key')
+    return (fields.get('issuetype') or {}).get('name') == TIPO_JIRA and status_category != 'done'
 
 def fetch_jira_news():
     print("Conectando ao Jira...")
     auth = HTTPBasicAuth(JIRA_EMAIL, JIRA_TOKEN)
     headers = {"Accept": "application/json"}
     
-    # Buscar APENAS Mudanças em aberto (removido Incidentes a pedido do usuário)
-    # Mudanças: statusCategory != Done
-    jql = 'project = OFBI AND issuetype = "[System] Mudança" AND statusCategory != Done ORDER BY updated DESC'
+    jql = f'project = OFBI AND {FILTRO_JIRA} ORDER BY updated DESC'
     
     url = f"{JIRA_URL}/rest/api/3/search/jql"
     params = {
         "jql": jql,
-        "maxResults": 10,
-        "fields": "summary,status,issuetype,updated,created,priority"
+        "maxResults": MAX_ITEMS_JIRA,
+        "fields": ",".join(CAMPOS_JIRA)
     }
     
-    response = requests.get(url, headers=headers, auth=auth, params=params)
+    response = jira_client.get(url, headers=headers, auth=auth, params=params)
     
     if response.status_code != 200:
         print(f"Erro na API do Jira: {response.status_code} - {response.text}")
         return []
         
-    issues = response.json().get('issues', [])
-    news_items = []
+    return [jira_news_item(issue) for issue in response.json().get('issues', [])]
+
+def jira_news_item(issue):
+    fields = issue.get('fields', {})
     
-    for issue in issues:
-        fields = issue.get('fields', {})
-        
-        # Mapeamento de Tipo
-        issue_type = fields.get('issuetype', {}).get('name', '')
-        
-        tag_class = "tag-servico" # Default
-        if "Mudança" in issue_type:
-            tag_class = "tag-mudanca"
-        elif "Incidente" in issue_type:
-            tag_class = "tag-incidente"
-            
-        # Mapeamento de Status para Cor
-        status_name = fields.get('status', {}).get('name', '')
-        status_dot = "dot-info" # Default (Azul)
-        
-        if status_name in ["Concluído", "Resolvido", "Fechado", "Implementado"]:
-            status_dot = "dot-success" # Verde
-        elif status_name in ["Monitorando", "Em progresso", "Em análise", "Aguardando"]:
-            status_dot = "dot-warning" # Laranja/Amarelo
-        
-        # Formatar Data
-        date_str = fields.get('updated', '')
-        formatted_date = ""
-        if date_str:
-            try:
-                dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
-                formatted_date = dt.strftime("%d/%m/%Y %H:%M")
-            except:
-                formatted_date = date_str[:10]
-        
-        item = {
-            "source": "Jira",
-            "key": issue.get('key'),
-            "title": f"{issue.get('key')} - {fields.get('summary')}",
-            "type_name": issue_type.replace("[System] ", ""), # Remove prefixo feio se existir
-            "tag_class": tag_class,
-            "status_name": status_name,
-            "status_dot": status_dot,
-            "date": formatted_date,
-            "url": f"{JIRA_URL}/browse/{issue.get('key')}"
-        }
-        news_items.append(item)
+    # Mapeamento de Tipo
+    issue_type = fields.get('issuetype', {}).get('name', '')
+    
+    tag_class = "tag-servico" # Default
+    if "Mudança" in issue_type:
+        tag_class = "tag-mudanca"
+    elif "Incidente" in issue_type:
+        tag_class = "tag-incidente"
         
-    return news_items
+    # Mapeamento de Status para Cor
+    status_name = fields.get('status', {}).get('name', '')
+    status_dot = "dot-info" # Default (Azul)
+    
+    if status_name in ["Concluído", "Resolvido", "Fechado", "Implementado"]:
+        status_dot = "dot-success" # Verde
+    elif status_name in ["Monitorando", "Em progresso", "Em análise", "Aguardando"]:
+        status_dot = "dot-warning" # Laranja/Amarelo
+    
+    # Formatar Data
+    date_str = fields.get('updated', '')
+    formatted_date = ""
+    dt = DATA_MINIMA
+    if date_str:
+        try:
+            dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
+            formatted_date = dt.strftime("%d/%m/%Y %H:%M")
+        except:
+            formatted_date = date_str[:10]
+    
+    item = {
+        "source": "Jira",
+        "key": issue.get('key'),
+        "title": f"{issue.get('key')} - {fields.get('summary')}",
+        "type_name": issue_type.replace("[System] ", ""), # Remove prefixo feio se existir
+        "tag_class": tag_class,
+        "status_name": status_name,
+        "status_dot": status_dot,
+        "date": formatted_date,
+        "url": f"{JIRA_URL}/browse/{issue.get('key')}",
+        "_dt": dt # Uso interno (ordenação); não vai para o JSON
+    }
+    return item
 
 def fetch_confluence_news():
     print("Conectando ao Confluence...")
@@ -116,14 +131,14 @@ def fetch_confluence_news():
         "expand": "metadata.labels,history"
     }
     
-    response = requests.get(url, headers=headers, auth=auth, params=params)
+    response = jira_client.get(url, headers=headers, auth=auth, params=params)
     
     if response.status_code != 200:
         # Tentar sem /wiki se falhar (algumas instances personalizadas)
         print(f"Erro no Confluence ({url}): {response.status_code}. Tentando sem /wiki...")
         confluence_url = base_url
         url = f"{confluence_url}/rest/api/content/search"
-        response = requests.get(url, headers=headers, auth=auth, params=params)
+        response = jira_client.get(url, headers=headers, auth=auth, params=params)
         
         if response.status_code != 200:
             print(f"Erro persistente no Confluence: {response.status_code} - {response.text}")
@@ -140,6 +155,7 @@ def fetch_confluence_news():
         # Data de criação
         date_str = page.get('history', {}).get('createdDate', '')
         formatted_date = ""
+        dt = DATA_MINIMA
         if date_str:
             try:
                 dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
@@ -156,27 +172,44 @@ def fetch_confluence_news():
             "status_name": "Publicado",
             "status_dot": "dot-info",
             "date": formatted_date,
-            "url": full_url
+            "url": full_url,
+            "_dt": dt # Uso interno (ordenação); não vai para o JSON
         }
         news_items.append(item)
         
     return news_items
 
+def merge_by_date(*sources, limit=MAX_ITEMS):
+    # Merge k-way das fontes (cada uma ordenada da mais recente para a mais antiga)
+    ordered = [sorted(items, key=lambda i: i["_dt"], reverse=True) for items in sources]
+    merged = heapq.merge(*ordered, key=lambda i: i["_dt"], reverse=True)
+    return [{k: v for k, v in item.items() if k != "_dt"} for _, item in zip(range(limit), merged)]
+
+def publicar_feed(jira_items, confluence_items, output_file="news_data.json"):
+    # Unir e ordenar por data (mais recentes primeiro), limitado a MAX_ITEMS
+    all_items = merge_by_date(jira_items, confluence_items)
+
+    if not publicar_json(output_file, all_items):
+        print(f"Sem alterações no feed ({len(all_items)} itens).")
+        return
+
+    print(f"Sucesso! {len(all_items)} itens salvos em {output_file} (Jira: {len(jira_items)}, Confluence: {len(confluence_items)}).")
+
 def main():
+    if not JIRA_URL or not JIRA_EMAIL or not JIRA_TOKEN:
+        print("Erro: Credenciais do Jira não configuradas.")
+        sys.exit(1)
+
     print("Iniciando atualização do Feed de Notícias...")
-    
-    jira_items = fetch_jira_news()
-    confluence_items = fetch_confluence_news()
-    
-    # Unir e ordenar por data
-    # (simplificado: concatena, idealmente parsear data para sort preciso se formato for igual)
-    all_items = jira_items + confluence_items
-    
-    output_file = "news_data.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_items, f, indent=2, ensure_ascii=False)
-        
-    print(f"Sucesso! {len(all_items)} itens salvos em {output_file} (Jira: {len(jira_items)}, Confluence: {len(confluence_items)}).")
+
+    # Jira e Confluence são independentes: buscar em paralelo
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        jira_future = executor.submit(fetch_jira_news)
+        confluence_future = executor.submit(fetch_confluence_news)
+        jira_items = jira_future.result()
+        confluence_items = confluence_future.result()
+
+    publicar_feed(jira_items, confluence_items)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,12 @@
 import os
-import requests
 from requests.auth import HTTPBasicAuth
 import json
 import sys
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import jira_client
+from publicacao import publicar_json
 
 # Carregar variáveis de ambiente
 try:
@@ -19,74 +23,230 @@ if not JIRA_URL or not JIRA_EMAIL or not JIRA_TOKEN:
     print("Erro: Credenciais do Jira não configuradas.")
     sys.exit(1)
 
+# Consultas de última atualização executadas em paralelo
+MAX_WORKERS = int(os.getenv("SPACES_MAX_WORKERS", "8"))
+# Timeout (conexão, leitura) de cada consulta CQL por espaço
+TIMEOUT_CONSULTA = (5, 15)
+# Tamanho da página na listagem de espaços
+LIMITE_PAGINA_ESPACOS = 50
+# Espaços por consulta CQL em lote (mantém a URL dentro dos limites)
+LOTE_ESPACOS = 25
+# Tamanho da página e máximo de páginas percorridas por lote; espaços ainda sem
+# resultado depois disso (pouco ativos) caem na consulta individual
+LIMITE_PAGINA_CONTEUDO = 50
+MAX_PAGINAS_LOTE = 5
+
+OUTPUT_FILE = "spaces_data.json"
+
 def get_confluence_url(jira_url):
     base_url = jira_url.replace(jira_url.split('/')[-1], "") if jira_url.endswith('/') else jira_url
     if "atlassian.net" in base_url:
         return f"https://{base_url.split('//')[1].split('.')[0]}.atlassian.net/wiki"
     return f"{base_url}/wiki"
 
+def parse_confluence_date(date_str):
+    # Datas do Confluence: 2025-05-10T14:22:33.123Z
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f%z")
+    except (TypeError, ValueError):
+        return None
+
+def content_item(item, confluence_url):
+    return {
+        "title": item.get('title'),
+        "url": f"{confluence_url}{item.get('_links', {}).get('webui')}",
+        "modified": item.get('version', {}).get('when')
+    }
+
 def fetch_latest_content(space_key, confluence_url, auth, headers):
     # Buscar última página ou blogpost modificado no espaço
     cql = f'space = "{space_key}" AND type in (page,blogpost) order by lastModified desc'
     url = f"{confluence_url}/rest/api/content/search"
     params = {
         "cql": cql,
-        "limit": 1
+        "limit": 1,
+        "expand": "version"
     }
     try:
-        response = requests.get(url, headers=headers, auth=auth, params=params)
+        response = jira_client.get(url, headers=headers, auth=auth, params=params, timeout=TIMEOUT_CONSULTA)
         if response.status_code == 200:
             results = response.json().get('results', [])
             if results:
-                item = results[0]
-                return {
-                    "title": item.get('title'),
-                    "url": f"{confluence_url}{item.get('_links', {}).get('webui')}"
-                }
+                return content_item(results[0], confluence_url)
     except:
         pass
     return None
 
+def fetch_latest_batch(space_keys, confluence_url, auth, headers):
+    # Uma única consulta para vários espaços, ordenada por lastModified desc:
+    # o primeiro resultado de cada espaço é o mais recente dele.
+    # Retorna ({key: item}, espaços não resolvidos dentro de MAX_PAGINAS_LOTE)
+    keys_cql = ",".join(f'"{key}"' for key in space_keys)
+    cql = f'space in ({keys_cql}) AND type in (page,blogpost) order by lastModified desc'
+    url = f"{confluence_url}/rest/api/content/search"
+    params = {
+        "cql": cql,
+        "limit": LIMITE_PAGINA_CONTEUDO,
+        "expand": "space,version"
+    }
+    latest = {}
+    pending = set(space_keys)
+
+    try:
+        for _ in range(MAX_PAGINAS_LOTE):
+            response = jira_client.get(url, headers=headers, auth=auth, params=params, timeout=TIMEOUT_CONSULTA)
+            if response.status_code != 200:
+                return latest, pending
+
+            data = response.json()
+            for item in data.get('results', []):
+                key = item.get('space', {}).get('key')
+                if key in pending:
+                    latest[key] = content_item(item, confluence_url)
+                    pending.discard(key)
+
+            links = data.get('_links', {})
+            if not pending or not links.get('next'):
+                # Sem próxima página: os espaços restantes não têm conteúdo
+                return latest, set()
+
+            # O link "next" já carrega o cursor e a CQL
+            url = f"{links.get('base', confluence_url)}{links['next']}"
+            params = None
+    except Exception as e:
+        print(f"Erro na consulta em lote: {e}")
+
+    return latest, pending
+
+def fetch_latest_by_space(space_keys, confluence_url, auth, headers):
+    # N espaços viram ceil(N / LOTE_ESPACOS) consultas em lote (em paralelo);
+    # só espaços não resolvidos no lote recebem consulta individual
+    batches = [space_keys[i:i + LOTE_ESPACOS] for i in range(0, len(space_keys), LOTE_ESPACOS)]
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        latest = {}
+        pending = []
+        for batch_latest, batch_pending in executor.map(
+            lambda batch: fetch_latest_batch(batch, confluence_url, auth, headers), batches
+        ):
+            latest.update(batch_latest)
+            pending.extend(batch_pending)
+
+        if pending:
+            print(f"Consultando individualmente {len(pending)} espaços...")
+            for key, item in zip(pending, executor.map(
+                lambda key: fetch_latest_content(key, confluence_url, auth, headers), pending
+            )):
+                latest[key] = item
+
+    return latest
+
+def load_previous_items(output_file=OUTPUT_FILE):
+    try:
+        with open(output_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+def reuse_previous_latest(space_keys, previous, confluence_url, auth, headers):
+    # Se nenhum conteúdo de espaço global foi modificado depois da publicação
+    # mais recente já registrada, as últimas publicações continuam válidas.
+    # Retorna {key: item} reaproveitado, ou None se for preciso consultar.
+    if not previous or sorted(i.get('key') for i in previous) != sorted(space_keys):
+        return None
+
+    dates = [parse_confluence_date(i.get('latest_modified')) for i in previous]
+    dates = [d for d in dates if d]
+    if not dates:
+        return None
+
+    url = f"{confluence_url}/rest/api/content/search"
+    params = {
+        "cql": 'space.type = global AND type in (page,blogpost) order by lastModified desc',
+        "limit": 1,
+        "expand": "version"
+    }
+    try:
+        response = jira_client.get(url, headers=headers, auth=auth, params=params, timeout=TIMEOUT_CONSULTA)
+        if response.status_code != 200:
+            return None
+        results = response.json().get('results', [])
+    except Exception:
+        return None
+
+    newest = parse_confluence_date(results[0].get('version', {}).get('when')) if results else None
+    if newest is None or newest > max(dates):
+        return None
+
+    latest = {}
+    for i in previous:
+        if i.get('latest_modified'):
+            latest[i['key']] = {"title": i['latest_title'], "url": i['latest_url'], "modified": i['latest_modified']}
+    return latest
+
+def list_spaces(confluence_url, auth, headers):
+    # Percorre todas as páginas de espaços globais (start/limit)
+    url = f"{confluence_url}/rest/api/space"
+    results = []
+    start = 0
+
+    while True:
+        params = {
+            "start": start,
+            "limit": LIMITE_PAGINA_ESPACOS,
+            "type": "global",
+            "expand": "icon,description.plain"
+        }
+        response = jira_client.get(url, headers=headers, auth=auth, params=params)
+        if response.status_code != 200:
+            return response, results
+
+        data = response.json()
+        page = data.get('results', [])
+        results.extend(page)
+
+        if not page or not data.get('_links', {}).get('next'):
+            return response, results
+        start += len(page)
+
 def fetch_spaces():
     print("Conectando ao Confluence para buscar espaços...")
     confluence_url = get_confluence_url(JIRA_URL)
-    url = f"{confluence_url}/rest/api/space"
-    
+
     auth = HTTPBasicAuth(JIRA_EMAIL, JIRA_TOKEN)
     headers = {"Accept": "application/json"}
-    
-    params = {
-        "limit": 10, # Reduzido para 10 para evitar timeout nas sub-queries
-        "type": "global",
-        "expand": "icon,description.plain"
-    }
-    
+
     try:
-        response = requests.get(url, headers=headers, auth=auth, params=params)
-        
+        response, results = list_spaces(confluence_url, auth, headers)
+
         # Fallback se /wiki não existir
         if response.status_code == 404:
              confluence_url = JIRA_URL.rstrip('/')
-             url = f"{confluence_url}/rest/api/space"
-             response = requests.get(url, headers=headers, auth=auth, params=params)
+             response, results = list_spaces(confluence_url, auth, headers)
 
         if response.status_code != 200:
             print(f"Erro ao buscar espaços: {response.status_code} - {response.text}")
             return []
 
-        data = response.json()
-        results = data.get('results', [])
-        spaces_items = []
-        
         print(f"Encontrados {len(results)} espaços. Buscando últimas atualizações...")
-        
+
+        keys = [space.get('key') for space in results]
+        latest_by_key = reuse_previous_latest(keys, load_previous_items(), confluence_url, auth, headers)
+        if latest_by_key is not None:
+            print("Nenhum conteúdo modificado desde a última execução. Reaproveitando últimas publicações.")
+        else:
+            latest_by_key = fetch_latest_by_space(keys, confluence_url, auth, headers)
+
+        spaces_items = []
+
         for space in results:
+            latest = latest_by_key.get(space.get('key'))
             name = space.get('name')
             key = space.get('key')
             webui = space.get('_links', {}).get('webui')
             full_url = f"{confluence_url}{webui}"
             description = space.get('description', {}).get('plain', {}).get('value', '')
-            
+
             # Limpar descrição (pegar primeira frase ou limitar chars)
             if description:
                 description = description.split('\n')[0][:100] + "..." if len(description) > 100 else description
@@ -96,9 +256,6 @@ def fetch_spaces():
             # Tentar pegar ícone se disponível, senão usar padrão
             icon_path = space.get('icon', {}).get('path', '')
             icon_url = f"{confluence_url}{icon_path}" if icon_path else ""
-            
-            # Buscar última atualização
-            latest = fetch_latest_content(key, confluence_url, auth, headers)
 
             item = {
                 "name": name,
@@ -107,11 +264,12 @@ def fetch_spaces():
                 "icon": icon_url,
                 "description": description,
                 "latest_title": latest['title'] if latest else "Nenhuma publicação recente",
-                "latest_url": latest['url'] if latest else full_url
+                "latest_url": latest['url'] if latest else full_url,
+                "latest_modified": latest['modified'] if latest else None
             }
             spaces_items.append(item)
             print(f"Processado: {name}")
-            
+
         return spaces_items
 
     except Exception as e:
@@ -121,10 +279,11 @@ def fetch_spaces():
 def main():
     items = fetch_spaces()
     
-    output_file = "spaces_data.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=2, ensure_ascii=False)
-        
+    output_file = OUTPUT_FILE
+    if not publicar_json(output_file, items):
+        print(f"Sem alterações nos espaços ({len(items)} itens).")
+        return
+
     print(f"Sucesso! {len(items)} espaços salvos em {output_file}.")
 
 if __name__ == "__main__":
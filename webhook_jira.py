@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Ingestão de webhooks do Jira nos snapshots publicados
+Central de Serviços - Open Finance Brasil
+
+Eventos jira:issue_created / issue_updated / issue_deleted recebidos pelo
+servidor Atlassian Connect são convertidos para o formato dos snapshots e
+aplicados em dados-incidentes.json / dados-mudancas.json por um escritor com
+debounce: rajadas de eventos viram uma única gravação. O snapshot é lido e
+regravado em stream (fluxo_json / PublicacaoStream), como na sincronização.
+"""
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: sem lock entre processos (servidor de desenvolvimento)
+
+from fluxo_json import iterar_itens
+from publicacao import PublicacaoStream, carregar_manifesto
+from sync_incidentes import TIPOS_INCIDENTE, normalizar_incidente, mesclar_stream
+from sync_mudancas import TIPOS_MUDANCA, normalizar_mudanca, na_janela
+
+PROJETO = 'OFBI'
+
+# Espera após o último evento antes de gravar, e espera máxima desde o primeiro
+ATRASO_DEBOUNCE = float(os.environ.get('WEBHOOK_DEBOUNCE', '2'))
+ATRASO_MAXIMO = float(os.environ.get('WEBHOOK_DEBOUNCE_MAX', '10'))
+
+EVENTOS_ALTERACAO = {'jira:issue_created', 'jira:issue_updated'}
+EVENTO_EXCLUSAO = 'jira:issue_deleted'
+
+
+class EscritorDebounce:
+    """
+    Acumula alterações por `key` (item novo ou None para remover) e as aplica
+    no snapshot `caminho` de uma vez, ATRASO_DEBOUNCE segundos após o último
+    evento (no máximo ATRASO_MAXIMO após o primeiro evento pendente).
+    `filtro(item)`, se definido, decide quais itens ficam no snapshot (ex.: a
+    janela de 90 dias das mudanças), como na exportação completa.
+    """
+
+    def __init__(self, caminho, chave_lista, atraso=ATRASO_DEBOUNCE, atraso_maximo=ATRASO_MAXIMO, filtro=None):
+        self.caminho = caminho
+        self.chave_lista = chave_lista
+        self.atraso = atraso
+        self.atraso_maximo = atraso_maximo
+        self.filtro = filtro
+        self._pendentes = {}
+        self._primeiro_em = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _agendar(self):
+        # Deve ser chamado com o lock adquirido
+        agora = datetime.now().timestamp()
+        if self._primeiro_em is None:
+            self._primeiro_em = agora
+        espera = min(self.atraso, max(0.0, self._primeiro_em + self.atraso_maximo - agora))
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(espera, self.descarregar)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def enfileirar(self, key, item):
+        with self._lock:
+            self._pendentes[key] = item
+            self._agendar()
+
+    def _devolver(self, pendentes):
+        """Recoloca alterações não aplicadas na fila, sem sobrepor eventos mais novos."""
+        with self._lock:
+            for key, item in pendentes.items():
+                self._pendentes.setdefault(key, item)
+            self._agendar()
+
+    def _existentes(self):
+        """
+        Itens atuais do snapshot. Sem o arquivo e sem manifesto o dataset ainda
+        não foi publicado (lista vazia); com manifesto, a ausência é tratada
+        como erro de leitura, para nunca publicar só os itens do webhook.
+        """
+        if not os.path.exists(self.caminho) and not carregar_manifesto(self.caminho):
+            return iter(())
+        return iterar_itens(self.caminho, self.chave_lista)
+
+    def descarregar(self):
+        """Aplica as alterações pendentes no snapshot. Retorna True se gravou."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._primeiro_em = None
+            self._timer = None
+        if not pendentes:
+            return False
+
+        # Lock de arquivo: vários workers podem receber webhooks ao mesmo tempo
+        with open(f'{self.caminho}.lock', 'w') as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            alterados = [item for item in pendentes.values()
+                         if item is not None and (self.filtro is None or self.filtro(item))]
+            # Excluídas, e alteradas que saíram do filtro, deixam o snapshot
+            removidos = set(pendentes) - {item['key'] for item in alterados}
+            try:
+                # Em caso de erro (arquivo truncado, sincronização regravando-o...)
+                # os temporários são descartados e o snapshot publicado fica intacto
+                with PublicacaoStream(self.caminho, self.chave_lista,
+                                      {'ultima_atualizacao': datetime.now().isoformat()}) as publicacao:
+                    existentes = (i for i in self._existentes() if i['key'] not in removidos)
+                    itens = mesclar_stream(existentes, alterados)
+                    if self.filtro is not None:
+                        itens = (i for i in itens if self.filtro(i))
+                    publicacao.escrever_todos(itens)
+                    gravou = publicacao.concluir()
+            except (OSError, ValueError) as e:
+                print(f"✗ Webhook: não foi possível ler {self.caminho} ({e}); "
+                      f"{len(pendentes)} alterações mantidas na fila")
+                self._devolver(pendentes)
+                return False
+
+        print(f"🔔 Webhook: {len(pendentes)} alterações aplicadas em {self.caminho}")
+        return gravou
+
+
+def tipo_alterado(evento):
+    """Se o changelog do evento registra troca do tipo da issue."""
+    itens = (evento.get('changelog') or {}).get('items') or []
+    return any(item.get('field') == 'issuetype' or item.get('fieldId') == 'issuetype' for item in itens)
+
+
+class IngestorWebhook:
+    """Direciona cada evento para o snapshot do tipo da issue."""
+
+    def __init__(self, dados_dir):
+        self.escritores = {
+            'incidentes': EscritorDebounce(os.path.join(dados_dir, 'dados-incidentes.json'), 'incidentes'),
+            'mudancas': EscritorDebounce(os.path.join(dados_dir, 'dados-mudancas.json'), 'mudancas',
+                                         filtro=na_janela),
+        }
+
+    def processar(self, evento):
+        """
+        Enfileira o evento. Retorna o dataset afetado, ou None se o evento for
+        ignorado (outro projeto, outro tipo de issue ou evento desconhecido).
+        Se o tipo da issue mudou (changelog), ela sai dos demais snapshots.
+        """
+        tipo_evento = evento.get('webhookEvent')
+        issue = evento.get('issue') or {}
+        fields = issue.get('fields') or {}
+        key = issue.get('key')
+
+        projeto = (fields.get('project') or {}).get('key')
+        if not key or (projeto and projeto != PROJETO):
+            return None
+
+        tipo_issue = (fields.get('issuetype') or {}).get('name')
+        if tipo_issue in TIPOS_INCIDENTE:
+            dataset, normalizar = 'incidentes', normalizar_incidente
+        elif tipo_issue in TIPOS_MUDANCA:
+            dataset, normalizar = 'mudancas', normalizar_mudanca
+        else:
+            dataset = None
+
+        if tipo_evento in EVENTOS_ALTERACAO and tipo_alterado(evento):
+            anteriores = [nome for nome in self.escritores if nome != dataset]
+            for nome in anteriores:
+                self.escritores[nome].enfileirar(key, None)
+            if dataset is None:
+                return ','.join(anteriores)
+
+        if dataset is None:
+            return None
+        if tipo_evento in EVENTOS_ALTERACAO:
+            self.escritores[dataset].enfileirar(key, normalizar(issue))
+        elif tipo_evento == EVENTO_EXCLUSAO:
+            self.escritores[dataset].enfileirar(key, None)
+        else:
+            return None
+        return dataset
+
+    def descarregar(self):
+        for escritor in self.escritores.values():
+            escritor.descarregar()